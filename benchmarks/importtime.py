@@ -0,0 +1,111 @@
+"""Профиль импорта (python -X importtime): во что обходится холодный старт модулей бота
+
+Для каждого модуля — отдельный процесс с чистым кэшем модулей: время запуска сверх пустого
+интерпретатора, время импорта (cumulative из -X importtime), доля собственного кода,
+побочные эффекты импорта (вывод в stdout, создание файла базы).
+
+Запуск:
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --output benchmarks/importtime_report.md
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = ["config", "database", "modules_correct.translators", "modules_correct.word_index", "workers", "bot"]
+OWN_PREFIXES = ("bot", "config", "database", "workers", "modules_correct")
+
+def run_import(target, runs):
+    """Запуски `import target`: (медиана времени запуска, мс; строки importtime последнего запуска; побочные эффекты)"""
+    walls = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            db_path = os.path.join(workdir, "importtime.db")
+            env = dict(os.environ, BOT_TOKEN=os.environ.get("BOT_TOKEN") or "123456:IMPORTTIME", DB_PATH=db_path)
+            command = [sys.executable, "-X", "importtime", "-c", f"import {target}" if target else "pass"]
+            
+            start = time.perf_counter()
+            result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+            walls.append((time.perf_counter() - start) * 1000)
+            
+            if result.returncode != 0:
+                raise SystemExit(f"import {target} завершился ошибкой:\n{result.stderr[-2000:]}")
+            effects = []
+            if result.stdout.strip():
+                effects.append("вывод: " + " / ".join(line.strip() for line in result.stdout.strip().splitlines()))
+            if os.path.exists(db_path):
+                effects.append("создан файл базы")
+    
+    return statistics.median(walls), parse_importtime(result.stderr), effects
+
+def parse_importtime(stderr):
+    """[(модуль, self мкс, cumulative мкс)] из вывода -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+def is_own(name):
+    return name.split('.')[0] in OWN_PREFIXES
+
+def build_report(runs, top):
+    """Текст отчёта в markdown"""
+    interpreter, _, _ = run_import(None, runs)
+    lines = [
+        "# Профиль импорта",
+        "",
+        f"Python {sys.version.split()[0]}, медиана {runs} запусков, пустой интерпретатор — {interpreter:.0f} мс.",
+        "",
+        "| модуль | старт сверх интерпретатора, мс | импорт, мс | свой код, мс | побочные эффекты |",
+        "|---|---:|---:|---:|---|",
+    ]
+    
+    profiles = {}
+    for target in TARGETS:
+        wall, rows, effects = run_import(target, runs)
+        profiles[target] = rows
+        cumulative = next((c for name, _, c in rows if name == target), 0)
+        own = sum(s for name, s, _ in rows if is_own(name))
+        lines.append(
+            f"| `{target}` | {wall - interpreter:.0f} | {cumulative / 1000:.1f} | {own / 1000:.1f} | "
+            f"{'; '.join(effects) or '—'} |"
+        )
+    
+    for target in ("bot", "database"):
+        rows = profiles[target]
+        lines += ["", f"## `import {target}`: самые дорогие модули (self)", "", "| модуль | self, мс | cumulative, мс |", "|---|---:|---:|"]
+        for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[1])[:top]:
+            lines.append(f"| `{name}` | {self_us / 1000:.1f} | {cumulative_us / 1000:.1f} |")
+        
+        own_rows = [row for row in rows if is_own(row[0])]
+        lines += ["", f"Свой код при `import {target}`:", "", "| модуль | self, мс |", "|---|---:|"]
+        for name, self_us, _ in sorted(own_rows, key=lambda row: -row[1])[:top]:
+            lines.append(f"| `{name}` | {self_us / 1000:.2f} |")
+    
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Профиль импорта модулей бота")
+    parser.add_argument("--runs", type=int, default=5, help="запусков на модуль")
+    parser.add_argument("--top", type=int, default=10, help="строк в списках самых дорогих модулей")
+    parser.add_argument("--output", help="сохранить отчёт в файл (markdown)")
+    args = parser.parse_args()
+    
+    report = build_report(args.runs, args.top)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"💾 Отчёт сохранён в {args.output}")
+
+if __name__ == "__main__":
+    main()
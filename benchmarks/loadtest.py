@@ -0,0 +1,557 @@
+"""Нагрузочный тест бота целиком: эмулятор Telegram Bot API и mock-переводчики/LLM
+
+Бот запускается отдельным процессом (bot.py или workers.py) с адресами внешних API,
+подменёнными на локальные серверы этого скрипта. Синтетические пользователи шлют
+поиск, сохранение, /stats и генерацию с заданной частотой; задержки считаются по трассам
+бота (TRACE_FILE), разбивка по БД — по его /metrics.
+
+Запуск:
+    python benchmarks/loadtest.py --rate 50 --duration 60 --users 1000
+    python benchmarks/loadtest.py --workers 4 --latency yandex=0.3 --errors yandex=0.1 --json report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from aiohttp import web, ClientSession
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOT_TOKEN = "123456:LOADTEST"
+
+# Задержка ответа (сек) и доля ошибок 500 по умолчанию; для openrouter — до первого токена
+DEFAULT_LATENCY = {"yandex": 0.15, "oxford": 0.4, "google": 0.1, "mymemory": 0.2, "openrouter": 0.3}
+DEFAULT_ERRORS = {"yandex": 0.02, "oxford": 0.05, "google": 0.02, "mymemory": 0.02, "openrouter": 0.02}
+DEFAULT_MIX = {"search": 70, "save": 15, "stats": 10, "generate": 5}
+
+# Задержка между токенами потока LLM, сек
+TOKEN_DELAY = 0.01
+
+# ===== ЭМУЛЯТОР TELEGRAM =====
+class FakeTelegram:
+    """Минимальный Bot API: очередь апдейтов для getUpdates и ответы на методы отправки"""
+    
+    def __init__(self):
+        self.updates = asyncio.Queue()
+        self.sent = {}  # update_id -> (вид запроса, время постановки)
+        self.calls = {}  # метод -> число вызовов
+        self.polling = asyncio.Event()
+        self.message_id = 0
+    
+    def push(self, update, kind):
+        self.sent[update['update_id']] = (kind, time.time())
+        self.updates.put_nowait(update)
+    
+    async def handle(self, request):
+        method = request.match_info['method']
+        params = dict(await request.post()) if request.can_read_body else {}
+        self.calls[method] = self.calls.get(method, 0) + 1
+        
+        if method == "getUpdates":
+            self.polling.set()
+            return web.json_response({"ok": True, "result": await self.get_updates(params)})
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": {"id": 123456, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"}})
+        if method in ("sendMessage", "editMessageText"):
+            return web.json_response({"ok": True, "result": self.make_message(params)})
+        return web.json_response({"ok": True, "result": True})
+    
+    async def get_updates(self, params):
+        """Long polling: ждём первый апдейт до timeout, затем забираем накопившиеся"""
+        limit = int(params.get('limit') or 100)
+        try:
+            first = await asyncio.wait_for(self.updates.get(), timeout=float(params.get('timeout') or 0) or 0.01)
+        except asyncio.TimeoutError:
+            return []
+        
+        batch = [first]
+        while len(batch) < limit and not self.updates.empty():
+            batch.append(self.updates.get_nowait())
+        return batch
+    
+    def make_message(self, params):
+        self.message_id += 1
+        chat_id = int(params.get('chat_id') or 0)
+        return {
+            "message_id": int(params.get('message_id') or self.message_id),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get('text', '')
+        }
+
+# ===== MOCK-ПЕРЕВОДЧИКИ И LLM =====
+class MockProviders:
+    """Yandex, Oxford, Google, MyMemory и OpenRouter с настраиваемой задержкой и ошибками"""
+    
+    def __init__(self, latency, errors, seed):
+        self.latency = latency
+        self.errors = errors
+        self.rng = random.Random(seed)
+        self.requests = {name: 0 for name in latency}
+        self.failures = {name: 0 for name in latency}
+        # Размер настоящей страницы Oxford — сотни КБ, нужные блоки в начале
+        self.oxford_padding = '<div class="filler">' + "lorem ipsum " * 8000 + "</div>"
+    
+    async def delay(self, name):
+        """Задержка ответа; True — ответить ошибкой"""
+        self.requests[name] += 1
+        await asyncio.sleep(self.latency[name] * self.rng.uniform(0.5, 1.5))
+        if self.rng.random() < self.errors[name]:
+            self.failures[name] += 1
+            return True
+        return False
+    
+    def error(self):
+        return web.Response(status=500, text="mock error")
+    
+    async def yandex(self, request):
+        if await self.delay("yandex"):
+            return self.error()
+        word = request.query.get('text', '')
+        return web.json_response({"def": [{
+            "text": word, "pos": "noun", "ts": "wɜːd",
+            "tr": [
+                {"text": f"{word}-перевод", "syn": [{"text": f"{word}-синоним"}],
+                 "ex": [{"text": f"a {word} example", "tr": [{"text": "пример"}]}]},
+                {"text": f"{word}-значение"}
+            ]
+        }]})
+    
+    async def oxford(self, request):
+        if await self.delay("oxford"):
+            return self.error()
+        word = request.match_info['word']
+        html = (
+            f'<html><body><h1 class="headword">{word}</h1><span class="pos">noun</span>'
+            f'<span class="phonetic">/wɜːd/</span><span class="def">a meaning of {word}</span>'
+            f'<span class="x">An example with {word}.</span>{self.oxford_padding}</body></html>'
+        )
+        return web.Response(text=html, content_type="text/html")
+    
+    async def google(self, request):
+        if await self.delay("google"):
+            return self.error()
+        word = request.query.get('q', '')
+        return web.json_response([[[f"{word}-перевод", word, None, None]]])
+    
+    async def mymemory(self, request):
+        if await self.delay("mymemory"):
+            return self.error()
+        word = request.query.get('q', '')
+        return web.json_response({"responseData": {"translatedText": f"{word}-перевод"}})
+    
+    async def openrouter(self, request):
+        payload = await request.json()
+        if await self.delay("openrouter"):
+            return self.error()
+        
+        sentences = [f"This is sentence number {i} for the load test." for i in range(1, 5)]
+        if not payload.get('stream'):
+            # Пакет из очереди генераций: JSON {id запроса: [предложения]}
+            prompt = payload['messages'][-1]['content']
+            request_ids = [line[4:].strip() for line in prompt.splitlines() if line.startswith("### ")]
+            content = json.dumps({request_id: sentences for request_id in request_ids}) if request_ids else "\n".join(sentences)
+            return web.json_response({
+                "choices": [{"message": {"content": content}}],
+                "usage": {"prompt_tokens": 60, "completion_tokens": 50}
+            })
+        
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for sentence in sentences:
+                for token in (sentence + "\n").split(" "):
+                    chunk = {"choices": [{"delta": {"content": token + " "}}]}
+                    await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    await asyncio.sleep(TOKEN_DELAY)
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            # Бот закрывает поток, получив нужное число предложений
+            pass
+        return response
+
+async def start_servers(telegram, providers):
+    """Эмулятор Telegram и mock-API на свободных портах. Возвращает (runners, env для бота)"""
+    tg_app = web.Application()
+    tg_app.router.add_post("/bot{token}/{method}", telegram.handle)
+    tg_app.router.add_get("/bot{token}/{method}", telegram.handle)
+    
+    api_app = web.Application()
+    api_app.router.add_get("/yandex/lookup", providers.yandex)
+    api_app.router.add_get("/oxford/{word}", providers.oxford)
+    api_app.router.add_get("/google/single", providers.google)
+    api_app.router.add_get("/mymemory/get", providers.mymemory)
+    api_app.router.add_post("/openrouter/chat/completions", providers.openrouter)
+    
+    runners = []
+    ports = []
+    for app in (tg_app, api_app):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        port = free_port()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        runners.append(runner)
+        ports.append(port)
+    
+    api = f"http://127.0.0.1:{ports[1]}"
+    env = {
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{ports[0]}",
+        "YANDEX_DICT_URL": f"{api}/yandex/lookup",
+        "OXFORD_URL": f"{api}/oxford/",
+        "GOOGLE_TRANSLATE_URL": f"{api}/google/single",
+        "MYMEMORY_URL": f"{api}/mymemory/get",
+        "OPENROUTER_URL": f"{api}/openrouter/chat/completions",
+    }
+    return runners, env
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# ===== ТРАФИК =====
+def load_vocabulary():
+    """Слова из локальных баз; вероятность — по закону Ципфа (популярные слова чаще)"""
+    words = set()
+    for name in ("word_forms.json", "synonyms.json"):
+        with open(os.path.join(ROOT, "data", name), encoding="utf-8") as f:
+            words.update(word for word in json.load(f) if word.isalpha())
+    words = sorted(words)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+def build_update(update_id, kind, user_id, word):
+    """Апдейт в формате Bot API для вида запроса"""
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    chat = {"id": user_id, "type": "private"}
+    now = int(time.time())
+    
+    if kind in ("search", "stats"):
+        text = word if kind == "search" else "/stats"
+        message = {"message_id": update_id, "date": now, "chat": chat, "from": user, "text": text}
+        if kind == "stats":
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        return {"update_id": update_id, "message": message}
+    
+    prefix = "save" if kind == "save" else "examples"
+    return {"update_id": update_id, "callback_query": {
+        "id": str(update_id), "from": user, "chat_instance": str(user_id), "data": f"{prefix}_{word}",
+        "message": {"message_id": update_id, "date": now, "chat": chat, "text": word}
+    }}
+
+async def warm_up(telegram, args, trace_path, timeout=120):
+    """По одному /stats на каждый воркер: нагрузка начинается, когда все процессы готовы"""
+    count = max(args.workers, 1)
+    for i in range(count):
+        telegram.push(build_update(i + 1, "stats", 1_000_000 + i, ""), "warmup")
+    
+    deadline = time.monotonic() + timeout
+    while len(read_traces(trace_path)) < count:
+        if time.monotonic() > deadline:
+            raise SystemExit("Воркеры бота не ответили на прогрев")
+        await asyncio.sleep(0.2)
+    
+    telegram.sent.clear()
+    return count
+
+async def run_traffic(telegram, args, rng, first_update_id=1):
+    """Открытая нагрузка: апдейты с постоянной частотой, независимо от скорости ответов"""
+    words, weights = load_vocabulary()
+    kinds, mix = zip(*args.mix.items())
+    total = int(args.rate * args.duration)
+    start = time.monotonic()
+    
+    for i in range(total):
+        delay = start + i / args.rate - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = rng.choices(kinds, mix)[0]
+        word = rng.choices(words, weights)[0]
+        user_id = 1_000_000 + rng.randrange(args.users)
+        telegram.push(build_update(first_update_id + i, kind, user_id, word), kind)
+    return total
+
+def seed_database(path, users):
+    """База с пользователями до запуска бота"""
+    os.environ["DB_PATH"] = path
+    sys.path.insert(0, ROOT)
+    from database import db
+    for user_id in range(1_000_000, 1_000_000 + users):
+        db.add_user(user_id, f"user{user_id}")
+    db.close()
+
+# ===== ЗАПУСК БОТА =====
+def start_bot(args, env, workdir):
+    """Бот отдельным процессом, вывод — в bot.log"""
+    bot_env = dict(os.environ, **env)
+    bot_env.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "BOT_MODE": "polling",
+        "OPENROUTER_API_KEY": "loadtest",
+        "DB_PATH": os.path.join(workdir, "loadtest.db"),
+        "TRACE_FILE": os.path.join(workdir, "traces.jsonl"),
+        "TRACE_SAMPLE_RATE": "1",
+        "SLOW_UPDATE_THRESHOLD": "3600",
+        "METRICS_HOST": "127.0.0.1",
+        "METRICS_PORT": str(args.metrics_port),
+        "WORKERS": str(args.workers or 1),
+    })
+    script = "workers.py" if args.workers else "bot.py"
+    log = open(os.path.join(workdir, "bot.log"), "w")
+    return subprocess.Popen([sys.executable, script], cwd=ROOT, env=bot_env, stdout=log, stderr=subprocess.STDOUT), log
+
+def stop_bot(process):
+    """Корректная остановка (SIGINT), при зависании — kill"""
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+async def scrape_metrics(ports):
+    """Текст /metrics всех процессов бота"""
+    texts = []
+    async with ClientSession() as session:
+        for port in ports:
+            try:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    texts.append(await response.text())
+            except Exception as e:
+                print(f"⚠️ /metrics на порту {port} недоступен: {e}")
+    return "\n".join(texts)
+
+def read_traces(path):
+    """update_id -> трасса"""
+    traces = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    trace = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                traces[trace['update_id']] = trace
+    return traces
+
+async def wait_for_drain(telegram, path, timeout):
+    """Ждём трассы всех отправленных апдейтов (или таймаут)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        traces = read_traces(path)
+        if all(update_id in traces for update_id in telegram.sent):
+            break
+        await asyncio.sleep(0.5)
+    return read_traces(path)
+
+# ===== ОТЧЁТ =====
+def percentile(values, q):
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)]
+
+METRIC_LINE = re.compile(r'^(\w+?)(_bucket|_sum|_count)?(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def parse_histograms(text, name):
+    """Гистограмма из текста Prometheus: {метки без le: {'buckets': {le: n}, 'sum', 'count'}}"""
+    result = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match or match.group(1) != name or not match.group(2):
+            continue
+        labels = dict(LABEL.findall(match.group(3) or ""))
+        le = labels.pop('le', None)
+        entry = result.setdefault(tuple(sorted(labels.items())), {'buckets': {}, 'sum': 0.0, 'count': 0})
+        value = float(match.group(4))
+        if match.group(2) == "_bucket":
+            bound = float("inf") if le == "+Inf" else float(le)
+            entry['buckets'][bound] = entry['buckets'].get(bound, 0) + value  # сумма по процессам
+        elif match.group(2) == "_sum":
+            entry['sum'] += value
+        else:
+            entry['count'] += int(value)
+    return result
+
+def histogram_quantile(entry, q):
+    """Оценка квантиля по корзинам (верхняя граница корзины)"""
+    target = q * entry['count']
+    for bound in sorted(entry['buckets']):
+        if entry['buckets'][bound] >= target:
+            return bound
+    return float("inf")
+
+def build_report(args, telegram, providers, traces, metrics_text, log_path, elapsed):
+    """Пропускная способность, p50/p95/p99 по видам запросов, разбивка времени и конкуренция за БД"""
+    by_kind = {}
+    queue_delays = []
+    breakdown = {}
+    for update_id, (kind, enqueued_at) in telegram.sent.items():
+        trace = traces.get(update_id)
+        if trace is None:
+            continue
+        total_ms = (trace['ts'] - enqueued_at) * 1000 + trace['ms']
+        by_kind.setdefault(kind, []).append(total_ms)
+        queue_delays.append((trace['ts'] - enqueued_at) * 1000)
+        for name, ms in trace['breakdown'].items():
+            breakdown[name] = breakdown.get(name, 0.0) + ms
+    
+    processed = sum(len(values) for values in by_kind.values())
+    all_latencies = [ms for values in by_kind.values() for ms in values]
+    
+    db_methods = []
+    for labels, entry in parse_histograms(metrics_text, "bot_db_query_seconds").items():
+        if entry['count']:
+            db_methods.append({
+                'method': dict(labels).get('method'),
+                'count': entry['count'],
+                'total_ms': round(entry['sum'] * 1000, 1),
+                'avg_ms': round(entry['sum'] / entry['count'] * 1000, 3),
+                'p95_ms_le': histogram_quantile(entry, 0.95) * 1000
+            })
+    db_methods.sort(key=lambda item: -item['total_ms'])
+    
+    lag = parse_histograms(metrics_text, "bot_event_loop_lag_seconds").get((), None)
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        locked = sum(1 for line in f if "database is locked" in line)
+    
+    return {
+        'config': {
+            'rate': args.rate, 'duration': args.duration, 'users': args.users, 'workers': args.workers,
+            'mix': args.mix, 'latency': args.latency, 'errors': args.errors, 'seed': args.seed
+        },
+        'sent': len(telegram.sent),
+        'processed': processed,
+        'throughput': round(processed / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            kind: {
+                'n': len(values),
+                'p50': round(percentile(values, 50), 1),
+                'p95': round(percentile(values, 95), 1),
+                'p99': round(percentile(values, 99), 1)
+            }
+            for kind, values in sorted(by_kind.items()) + [("all", all_latencies)]
+        },
+        'queue_ms': {'p50': round(percentile(queue_delays, 50), 1), 'p99': round(percentile(queue_delays, 99), 1)},
+        'breakdown_avg_ms': {name: round(ms / processed, 2) for name, ms in sorted(breakdown.items())} if processed else {},
+        'db': {
+            'methods': db_methods[:10],
+            'share_of_update_time': round(breakdown.get('db', 0.0) / sum(breakdown.values()), 3) if breakdown else 0.0,
+            'locked_errors': locked
+        },
+        'event_loop_lag_p99_ms': round(histogram_quantile(lag, 0.99) * 1000, 1) if lag and lag['count'] else None,
+        'bot_api_calls': dict(sorted(telegram.calls.items())),
+        'provider_requests': providers.requests,
+        'provider_failures': providers.failures
+    }
+
+def print_report(report):
+    config = report['config']
+    print(f"\n📊 Нагрузочный тест: {config['rate']} апд./с × {config['duration']} с, "
+          f"{config['users']} пользователей, воркеров: {config['workers'] or 'нет (bot.py)'}")
+    print(f"Отправлено {report['sent']}, обработано {report['processed']}, "
+          f"пропускная способность {report['throughput']} апд./с")
+    
+    print(f"\n{'вид':<10}{'n':>7}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}")
+    for kind, stats in report['latency_ms'].items():
+        print(f"{kind:<10}{stats['n']:>7}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}")
+    print(f"Ожидание в очереди getUpdates: p50 {report['queue_ms']['p50']} мс, p99 {report['queue_ms']['p99']} мс")
+    
+    print("\nСреднее время апдейта по видам, мс: " + ", ".join(f"{name} {ms}" for name, ms in report['breakdown_avg_ms'].items()))
+    
+    db = report['db']
+    print(f"\nБД: {db['share_of_update_time'] * 100:.1f}% времени апдейтов, ошибок 'database is locked': {db['locked_errors']}")
+    for item in db['methods']:
+        print(f"  {item['method']:<32}{item['count']:>8} вызовов, всего {item['total_ms']:>9} мс, "
+              f"в среднем {item['avg_ms']} мс, p95 ≤ {item['p95_ms_le']:g} мс")
+    
+    if report['event_loop_lag_p99_ms'] is not None:
+        print(f"Задержка цикла событий p99 ≤ {report['event_loop_lag_p99_ms']} мс")
+    print(f"Вызовы Bot API: {report['bot_api_calls']}")
+    print(f"Запросы к провайдерам: {report['provider_requests']}, ошибок: {report['provider_failures']}")
+
+# ===== ОСНОВНОЙ СЦЕНАРИЙ =====
+def parse_overrides(values, defaults):
+    """name=value,... поверх значений по умолчанию"""
+    result = dict(defaults)
+    for item in values or []:
+        for pair in item.split(','):
+            name, _, value = pair.partition('=')
+            if name not in result:
+                raise SystemExit(f"Неизвестное имя: {name} (есть {', '.join(result)})")
+            result[name] = float(value)
+    return result
+
+async def run(args):
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    seed_database(os.path.join(workdir, "loadtest.db"), args.users)
+    
+    telegram = FakeTelegram()
+    providers = MockProviders(args.latency, args.errors, args.seed)
+    runners, env = await start_servers(telegram, providers)
+    
+    process, log = start_bot(args, env, workdir)
+    try:
+        try:
+            await asyncio.wait_for(telegram.polling.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            raise SystemExit(f"Бот не начал опрос за 60 с, см. {log.name}")
+        
+        trace_path = os.path.join(workdir, "traces.jsonl")
+        warmup = await warm_up(telegram, args, trace_path)
+        
+        print(f"🚀 Бот запущен, нагрузка {args.rate} апд./с в течение {args.duration} с (рабочая папка {workdir})")
+        start = time.monotonic()
+        await run_traffic(telegram, args, rng, first_update_id=warmup + 1)
+        traces = await wait_for_drain(telegram, trace_path, args.drain_timeout)
+        elapsed = time.monotonic() - start
+        
+        ports = [args.metrics_port + i for i in range(args.workers)] if args.workers else [args.metrics_port]
+        metrics_text = await scrape_metrics(ports)
+    finally:
+        stop_bot(process)
+        log.close()
+        for runner in runners:
+            await runner.cleanup()
+    
+    report = build_report(args, telegram, providers, traces, metrics_text, log.name, elapsed)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Отчёт сохранён в {args.json}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бота с эмулятором Telegram и mock-API")
+    parser.add_argument("--rate", type=float, default=20, help="апдейтов в секунду")
+    parser.add_argument("--duration", type=float, default=30, help="длительность нагрузки, сек")
+    parser.add_argument("--users", type=int, default=1000, help="число пользователей")
+    parser.add_argument("--workers", type=int, default=0, help="запуск через workers.py с N воркерами")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="доли видов запросов: search=70,save=15,stats=10,generate=5")
+    parser.add_argument("--latency", action="append", help="задержка провайдера, сек: yandex=0.3,openrouter=1")
+    parser.add_argument("--errors", action="append", help="доля ошибок 500: oxford=0.2")
+    parser.add_argument("--seed", type=int, default=42, help="seed трафика и mock-API (воспроизводимость)")
+    parser.add_argument("--metrics-port", type=int, default=free_port(), help="порт /metrics бота")
+    parser.add_argument("--drain-timeout", type=float, default=30, help="сколько ждать обработки после нагрузки, сек")
+    parser.add_argument("--json", help="сохранить отчёт в JSON")
+    args = parser.parse_args()
+    
+    args.mix = parse_overrides([args.mix], {kind: 0 for kind in DEFAULT_MIX})
+    args.latency = parse_overrides(args.latency, DEFAULT_LATENCY)
+    args.errors = parse_overrides(args.errors, DEFAULT_ERRORS)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Микробенчмарки горячих функций с сохранёнными базовыми значениями
+
+Чистые функции (форматирование, разбор ответов переводчиков на сохранённых фикстурах,
+резервная генерация) и методы Database на заполненной базе реалистичного размера.
+Лучшее время вызова из нескольких замеров (меньше всего зависит от фоновой нагрузки)
+сравнивается с benchmarks/baseline.json: замедление больше допуска — код выхода 1.
+
+Запуск:
+    python benchmarks/microbench.py                   # сравнение с базовыми значениями
+    python benchmarks/microbench.py --only db.        # только методы базы
+    python benchmarks/microbench.py --save-baseline   # записать новые базовые значения
+    python benchmarks/microbench.py --users 10000 --words 500000   # база поменьше
+
+Словари заполняются синтетическим словарём из VOCABULARY_SIZE разных слов (частоты по Ципфу,
+во главе — слова из data/word_forms.json), чтобы выборки по словам и префиксам были как в жизни.
+
+Базовые значения зависят от машины: после смены железа их нужно перезаписать.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+DATA_DIR = os.path.join(HERE, ".data")  # заполненные базы (не в git)
+
+DEFAULT_USERS = 100_000
+DEFAULT_WORDS = 5_000_000
+DEFAULT_TOLERANCE = 0.3  # допустимое замедление лучшего времени, доля
+VOCABULARY_SIZE = 60_000  # разных слов в словарях и кэше переводов
+SEED_VERSION = 2  # увеличить при изменении заполнения: старые базы не переиспользуются
+
+SYLLABLES = [
+    "ba", "be", "bi", "bo", "bu", "ca", "ce", "co", "da", "de", "di", "do", "fa", "fe", "fi", "ga", "go",
+    "ha", "he", "hi", "ho", "ja", "ka", "ke", "la", "le", "li", "lo", "lu", "ma", "me", "mi", "mo", "na",
+    "ne", "ni", "no", "pa", "pe", "pi", "po", "ra", "re", "ri", "ro", "ru", "sa", "se", "si", "so", "ta",
+    "te", "ti", "to", "va", "ve", "vi", "wa", "we", "ya", "za", "str", "th", "ch", "sh", "pl", "gr", "tr",
+]
+ENDINGS = ["", "", "", "n", "r", "s", "t", "l", "nd", "ng", "er", "ed", "ing", "ly", "tion", "ness", "ment", "able"]
+
+# ===== ЗАПОЛНЕННАЯ БАЗА =====
+def make_vocabulary(rng, size):
+    """Синтетический словарь из size разных слов: сначала настоящие из word_forms.json, затем по слогам"""
+    with open(os.path.join(ROOT, "data", "word_forms.json"), encoding="utf-8") as f:
+        vocabulary = sorted(json.load(f))
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        word = "".join(rng.choices(SYLLABLES, k=rng.choice((1, 2, 2, 3, 3, 4)))) + rng.choice(ENDINGS)
+        if len(word) > 2 and word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+def seed_database(path, users, words, seed=42):
+    """База с users пользователями и words словами в словарях (распределение с длинным хвостом)"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng, VOCABULARY_SIZE)
+    # Частоты слов по Ципфу: частые слова у многих пользователей, длинный хвост редких
+    word_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    
+    user_ids = list(range(1, users + 1))
+    conn.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)", ((u, f"user{u}") for u in user_ids))
+    conn.executemany(
+        "INSERT INTO user_limits (user_id, date, searches_used, generations_used) VALUES (?, DATE('now'), ?, ?)",
+        ((u, rng.randrange(10), rng.randrange(5)) for u in user_ids[::3])
+    )
+    conn.executemany(
+        "INSERT INTO achievements (user_id, achievement_id, progress_current, progress_total) VALUES (?, ?, ?, ?)",
+        ((u, achievement, rng.randrange(10), 10) for u in user_ids[::2] for achievement in ("first_search", "word_collector"))
+    )
+    
+    # Несколько активных пользователей с большими словарями, большинство — с небольшими
+    weights = [1 / (rank ** 0.8) for rank in range(1, users + 1)]
+    categories = ["Без категории", "Работа", "Путешествия", "Еда"]
+    chunk = 200_000
+    for offset in range(0, words, chunk):
+        owners = rng.choices(user_ids, weights, k=min(chunk, words - offset))
+        chosen = rng.choices(vocabulary, cum_weights=word_weights, k=len(owners))
+        rows = []
+        for user_id, word in zip(owners, chosen):
+            day = rng.randrange(1, 29)
+            rows.append((user_id, word, f"перевод {word}", None, rng.choice(categories), f"2026-09-{day:02d}", rng.randrange(4)))
+        conn.executemany(
+            "INSERT INTO user_dictionary (user_id, word, translation, example, category, added_date, review_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        print(f"  слов: {offset + len(rows):,}/{words:,}", end="\r")
+    
+    conn.executemany(
+        "INSERT OR IGNORE INTO translation_cache (word, data, updated_at) VALUES (?, ?, ?)",
+        ((word, make_record(word).pack(), time.time()) for word in vocabulary)
+    )
+    conn.commit()
+    conn.close()
+    print()
+
+def make_record(word):
+    """Запись кэша переводов для слова"""
+    from modules_correct.translation_records import TranslationRecord
+    return TranslationRecord.from_dict({
+        "word": word,
+        "source": "Яндекс Переводчик",
+        "transcription": "",
+        "translations": [{"part_of_speech": "глаг.", "meanings": [f"перевод {word}"]}],
+        "examples": []
+    })
+
+def prepare_database(users, words):
+    """Путь к заполненной базе (создаётся один раз на набор размеров)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"bench_{users}_{words}_v{SEED_VERSION}.db")
+    os.environ["DB_PATH"] = path
+    
+    if not os.path.exists(path + ".done"):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        
+        sys.path.insert(0, ROOT)
+        from database import init_database
+        init_database()
+        
+        print(f"🌱 Заполняем базу: {users:,} пользователей, {words:,} слов...")
+        start = time.perf_counter()
+        seed_database(path, users, words)
+        open(path + ".done", "w").close()
+        print(f"   готово за {time.perf_counter() - start:.0f} с")
+    return path
+
+# ===== БЕНЧМАРКИ =====
+def collect_benchmarks(users):
+    """Имя -> функция без аргументов. Импорты после выбора DB_PATH"""
+    sys.path.insert(0, ROOT)
+    
+    from bot import format_translation_response
+    from database import db
+    from modules_correct.generator import parse_sentences, generate_fallback_sentences
+    from modules_correct.translators import get_russian_pos, parse_yandex_response, parse_oxford_html
+    from modules_correct.oxford_extractor import OxfordExtractor, OXFORD_CHUNK_SIZE
+    from modules_correct.dictionary import DictionaryManager
+    from modules_correct.limits import format_limits_message
+    from modules_correct.sentence_templates import get_template_bank
+    from modules_correct.word_index import word_index
+    
+    with open(os.path.join(FIXTURES, "yandex_run.json"), encoding="utf-8") as f:
+        yandex_response = json.load(f)
+    with open(os.path.join(FIXTURES, "oxford_run.html"), encoding="utf-8") as f:
+        oxford_html = f.read()
+    oxford_page = oxford_html.encode("utf-8")
+    oxford_chunks = [oxford_page[i:i + OXFORD_CHUNK_SIZE] for i in range(0, len(oxford_page), OXFORD_CHUNK_SIZE)]
+    
+    def stream_oxford():
+        extractor = OxfordExtractor()
+        for chunk in oxford_chunks:
+            if extractor.feed(chunk):
+                break
+        return extractor.result("run")
+    
+    translation = parse_yandex_response("run", yandex_response)
+    llm_text = (
+        "1. The children love to run in the park after school.\n"
+        "2. She decided to run a small bakery in her hometown.\n"
+        "3. Our servers run smoothly even under heavy load.\n"
+        "4. He had to run to catch the last train home.\n"
+    )
+    limits_data = {
+        action: {'used': used, 'max': top, 'remaining': top - used, 'percentage': used / top * 100}
+        for action, used, top in (("search", 4, 10), ("generate", 2, 5), ("fix", 0, 3))
+    }
+    get_template_bank()
+    word_index.load()
+    dictionary = DictionaryManager()
+    
+    # Пользователи с большим (первые id) и типичным словарём
+    heavy_user, typical_user = 1, users // 2
+    batch = list(range(1, users, max(users // 500, 1)))[:500]
+    writer_id = users + 1
+    db.add_user(writer_id, "bench_writer")
+    
+    return {
+        "format_translation_response": lambda: format_translation_response(translation),
+        "parse_sentences": lambda: parse_sentences(llm_text),
+        "generate_fallback_sentences": lambda: generate_fallback_sentences(["run", "beautiful"], "travel"),
+        "get_russian_pos": lambda: get_russian_pos("adjective"),
+        "format_limits_message": lambda: format_limits_message(limits_data),
+        "parse_yandex_response": lambda: parse_yandex_response("run", yandex_response),
+        "parse_oxford_html": lambda: parse_oxford_html("run", oxford_html),
+        "parse_oxford_html.stream_8k": stream_oxford,
+        "format_dictionary_for_display.heavy": lambda: dictionary.format_dictionary_for_display(heavy_user),
+        "format_dictionary_for_display.typical": lambda: dictionary.format_dictionary_for_display(typical_user),
+        "db.check_limit": lambda: db.check_limit(typical_user, "search"),
+        "db.increment_limit": lambda: db.increment_limit(writer_id, "search"),
+        "db.get_word_count": lambda: db.get_word_count(typical_user),
+        "db.get_user_words.heavy": lambda: db.get_user_words(heavy_user),
+        "db.get_user_words.typical": lambda: db.get_user_words(typical_user),
+        "db.get_achievements": lambda: db.get_achievements(typical_user),
+        "db.get_translation": lambda: db.get_translation("run"),
+        "db.get_reminder_data.500": lambda: db.get_reminder_data(batch),
+        "db.get_user_ids_page": lambda: db.get_user_ids_page(users // 2, 500),
+        "db.get_popular_words": lambda: db.get_popular_words(1000),
+        "db.add_word": lambda: db.add_word(writer_id, "run", "бежать"),
+        "word_index.search.short": lambda: word_index.search("ca"),
+        "word_index.search.long": lambda: word_index.search("cota"),
+    }
+
+def measure(func, repeat=5):
+    """Медиана и минимум времени одного вызова, мкс (число вызовов в замере — не меньше 0.2 с)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return statistics.median(times), min(times)
+
+# ===== СРАВНЕНИЕ С БАЗОВЫМИ ЗНАЧЕНИЯМИ =====
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_baseline(results, meta):
+    baseline = {
+        "meta": meta,
+        "benchmarks": {name: {"min_us": round(best, 3), "median_us": round(median, 3)} for name, (median, best) in results.items()}
+    }
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки горячих функций")
+    parser.add_argument("--only", help="только бенчмарки, имя которых начинается с этой строки")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--words", type=int, default=DEFAULT_WORDS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="допустимое замедление (0.3 = +30%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как базовые")
+    args = parser.parse_args()
+    
+    # bot.py создаёт Bot при импорте: нужен токен правильного вида (запросы не отправляются)
+    if not os.environ.get("BOT_TOKEN"):
+        os.environ["BOT_TOKEN"] = "123456:BENCH"
+    prepare_database(args.users, args.words)
+    benchmarks = collect_benchmarks(args.users)
+    if args.only:
+        benchmarks = {name: func for name, func in benchmarks.items() if name.startswith(args.only)}
+    
+    baseline = load_baseline()
+    reference = baseline.get("benchmarks", {})
+    meta = {"users": args.users, "words": args.words, "vocabulary": VOCABULARY_SIZE, "python": sys.version.split()[0]}
+    if baseline and any(baseline.get("meta", {}).get(key) != meta[key] for key in ("users", "words", "vocabulary")):
+        print(f"⚠️ Базовые значения записаны для другой базы: {baseline['meta']}")
+    
+    print(f"\n{'бенчмарк':<40}{'медиана, мкс':>14}{'мин, мкс':>12}{'база мин, мкс':>15}{'×':>7}")
+    results = {}
+    regressions = []
+    for name, func in benchmarks.items():
+        median, best = measure(func, repeat=args.repeat)
+        results[name] = (median, best)
+        
+        base = reference.get(name, {}).get("min_us")
+        ratio = best / base if base else None
+        mark = ""
+        if ratio is not None and ratio > 1 + args.tolerance:
+            regressions.append(name)
+            mark = " ❌"
+        print(f"{name:<40}{median:>14.2f}{best:>12.2f}{base if base is not None else '—':>15}"
+              f"{f'{ratio:.2f}' if ratio else '—':>7}{mark}")
+    
+    if args.save_baseline:
+        if args.only:
+            # Частичный прогон дополняет имеющиеся значения
+            merged = {name: (value["median_us"], value["min_us"]) for name, value in reference.items()}
+            merged.update(results)
+            results = merged
+        save_baseline(results, meta)
+        print(f"\n💾 Базовые значения сохранены в {os.path.relpath(BASELINE_PATH, ROOT)}")
+        return 0
+    
+    if regressions:
+        print(f"\n❌ Замедление больше {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ Регрессий нет")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
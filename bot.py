@@ -1,25 +1,62 @@
 import asyncio
+import html
 import logging
-from aiogram import Bot, Dispatcher, types, F
+from functools import lru_cache
+from aiogram import Bot, Dispatcher, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import Message, CallbackQuery, InlineQuery, InlineQueryResultArticle, InputTextMessageContent
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
-from config import BOT_TOKEN, ADMINS
-from database import db
-from modules.translators import get_word_translation
-from modules.generator import generate_sentences
-from modules.achievements import check_achievements
-from modules.limits import check_and_update_limit
+from config import BOT_TOKEN, TELEGRAM_API_URL, ADMINS, METRICS_HOST, METRICS_PORT, FREE_LIMITS, INLINE_CACHE_TIME, DEFAULT_TIMEZONE, MORNING_REMINDER_TIME, EVENING_SUMMARY_TIME, BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBAPP_HOST, WEBAPP_PORT
+from database import db, LIMIT_KEYS
+from modules_correct.translators import get_word_translation, get_cached_render, cache_render, translation_cache
+from modules_correct.generator import stream_sentences, generate_fallback_sentences
+from modules_correct.generation_queue import generation_batcher
+from modules_correct.sentence_templates import get_template_bank, UNKNOWN_POS
+from modules_correct.llm_backend import llm_backend
+from modules_correct.corrector import get_corrector, format_correction_message
+from modules_correct.fsm_storage import SQLiteStorage
+from modules_correct.achievements import check_achievements
+from modules_correct.limits import check_and_update_limit
+from modules_correct.dictionary import DictionaryManager
+from modules_correct.word_index import word_index
+from modules_correct.bootstrap import bootstrap, shutdown
+from modules_correct.activity import activity_counters
+from modules_correct.cache_warmer import cache_warmer
+from modules_correct.metrics import start_metrics_server, monitor_event_loop
+from modules_correct.middlewares import MetricsMiddleware, TracingMiddleware, TracingRequestMiddleware
+from modules_correct.notifications import NotificationManager
+from modules_correct.scheduler import is_valid_timezone
+from modules_correct.broadcast import Broadcast, resume_broadcasts, format_broadcast_stats
+from modules_correct.keyboards import (
+    BTN_SEARCH, BTN_GENERATOR, BTN_DICTIONARY, BTN_CHEATSHEETS, BTN_SYNONYMS, BTN_HELP, BTN_STATS,
+    BTN_SETTINGS, BTN_PREMIUM, BTN_BACK, MENU_TEXTS, CALLBACK_SAVE, CALLBACK_EXAMPLES, CALLBACK_FORMS,
+    CALLBACK_SYNONYMS, MAIN_MENU_KEYBOARD, BACK_TO_MENU_KEYBOARD, translation_actions_keyboard, parse_callback_data
+)
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Инициализация бота и диспетчера
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+bot = Bot(token=BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)))
+fsm_storage = SQLiteStorage()
+dp = Dispatcher(storage=fsm_storage)
+notification_manager = NotificationManager(bot)
+
+# Трасса на каждый апдейт (включая вызовы Bot API) и лог медленных
+dp.update.outer_middleware(TracingMiddleware())
+bot.session.middleware(TracingRequestMiddleware())
+
+# Время обработчиков по маршрутам
+dp.message.middleware(MetricsMiddleware("message"))
+dp.callback_query.middleware(MetricsMiddleware("callback_query"))
+dp.inline_query.middleware(MetricsMiddleware("inline_query"))
 
 # Состояния FSM
 class DictionaryState(StatesGroup):
@@ -34,41 +71,6 @@ class GeneratorState(StatesGroup):
     waiting_for_theme = State()
     waiting_for_format = State()
 
-# ===== КЛАВИАТУРЫ =====
-def main_menu_keyboard():
-    """Главное меню"""
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[
-            [KeyboardButton(text="🔍 Поиск слова")],
-            [KeyboardButton(text="✍️ Генератор"), KeyboardButton(text="📖 Мой словарь")],
-            [KeyboardButton(text="📝 Шпаргалки"), KeyboardButton(text="🔄 Синонимы")],
-            [KeyboardButton(text="✨ Помощь"), KeyboardButton(text="📊 Статистика")],
-            [KeyboardButton(text="⚙️ Настройки"), KeyboardButton(text="💎 Премиум")]
-        ],
-        resize_keyboard=True
-    )
-    return keyboard
-
-def back_to_menu_keyboard():
-    """Кнопка возврата в меню"""
-    keyboard = ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="↩️ В главное меню")]],
-        resize_keyboard=True
-    )
-    return keyboard
-
-def translation_actions_keyboard(word_data):
-    """Действия после перевода"""
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="💾 Сохранить в словарь", callback_data=f"save_{word_data['word']}")],
-            [InlineKeyboardButton(text="✨ Примеры от ИИ", callback_data=f"examples_{word_data['word']}")],
-            [InlineKeyboardButton(text="📝 Формы слова", callback_data=f"forms_{word_data['word']}")],
-            [InlineKeyboardButton(text="🔄 Синонимы", callback_data=f"synonyms_{word_data['word']}")]
-        ]
-    )
-    return keyboard
-
 # ===== КОМАНДЫ =====
 @dp.message(Command("start"))
 async def cmd_start(message: Message):
@@ -79,6 +81,10 @@ async def cmd_start(message: Message):
     # Добавляем пользователя в БД
     db.add_user(user_id, username)
     
+    # Утренние напоминания и вечерние сводки
+    if notification_manager.scheduler:
+        notification_manager.scheduler.add_user(user_id)
+    
     # Проверяем достижения
     await check_achievements(user_id, "daily_login")
     
@@ -102,7 +108,7 @@ async def cmd_start(message: Message):
 👇 Выберите действие:
     """
     
-    await message.answer(welcome_text, parse_mode="HTML", reply_markup=main_menu_keyboard())
+    await message.answer(welcome_text, parse_mode="HTML", reply_markup=MAIN_MENU_KEYBOARD)
 
 @dp.message(Command("help"))
 async def cmd_help(message: Message):
@@ -116,6 +122,8 @@ async def cmd_help(message: Message):
 /stats - Ваша статистика
 /words - Ваш словарь
 /limits - Ваши лимиты
+/fix текст - Исправить ошибки в тексте
+/timezone пояс - Часовой пояс для напоминаний
 
 <b>Быстрые действия:</b>
 Просто введите английское слово для перевода!
@@ -163,35 +171,201 @@ async def cmd_stats(message: Message):
     
     await message.answer(stats_text, parse_mode="HTML")
 
-# ===== ОБРАБОТКА ТЕКСТА (поиск слова) =====
-@dp.message(F.text == "🔍 Поиск слова")
-async def search_word_handler(message: Message):
+@dp.message(Command("fix"))
+async def cmd_fix(message: Message):
+    """Исправление ошибок в тексте"""
+    user_id = message.from_user.id
+    text = message.text.partition(' ')[2].strip()
+    
+    if not text:
+        await message.answer(
+            "✨ <b>Исправление текста</b>\n\n"
+            "Напишите текст после команды:\n"
+            "Пример: <code>/fix She have a apple</code>",
+            parse_mode="HTML"
+        )
+        return
+    
+    # Проверяем лимит
+    can_fix, used = await check_and_update_limit(user_id, "fix")
+    if not can_fix:
+        await message.answer(
+            f"🚫 <b>Лимит исчерпан!</b>\n\n"
+            f"Вы использовали {used}/{FREE_LIMITS['daily_fixes']} исправлений сегодня.\n\n"
+            f"💎 <b>Премиум</b> даёт безлимитный доступ!",
+            parse_mode="HTML"
+        )
+        return
+    
+    try:
+        result = await get_corrector().correct(text[:1000])
+        await message.answer(format_correction_message(result), parse_mode="HTML")
+    except Exception as e:
+        logger.error(f"Ошибка исправления: {e}")
+        await message.answer("⚠️ Произошла ошибка при исправлении текста. Попробуйте позже.")
+
+@dp.message(Command("timezone"))
+async def cmd_timezone(message: Message):
+    """Часовой пояс для напоминаний"""
+    user_id = message.from_user.id
+    timezone = message.text.partition(' ')[2].strip()
+    
+    if not timezone:
+        current = db.get_user_timezone(user_id) or DEFAULT_TIMEZONE
+        await message.answer(
+            f"🕐 <b>Ваш часовой пояс:</b> {current}\n\n"
+            f"Напоминание приходит в {MORNING_REMINDER_TIME}, сводка — в {EVENING_SUMMARY_TIME}.\n"
+            "Сменить: <code>/timezone Europe/London</code>",
+            parse_mode="HTML"
+        )
+        return
+    
+    if not is_valid_timezone(timezone):
+        await message.answer("⚠️ Неизвестный часовой пояс. Пример: <code>Asia/Yekaterinburg</code>", parse_mode="HTML")
+        return
+    
+    db.set_user_timezone(user_id, timezone)
+    if notification_manager.scheduler:
+        notification_manager.scheduler.set_timezone(user_id, timezone)
+    
+    await message.answer(f"✅ Часовой пояс: <b>{timezone}</b>", parse_mode="HTML")
+
+@dp.message(Command("broadcast"))
+async def cmd_broadcast(message: Message):
+    """Рассылка всем пользователям (только для админов)"""
+    if message.from_user.id not in ADMINS:
+        return
+    
+    text = message.html_text.partition(' ')[2].strip()
+    if not text:
+        await message.answer("📣 Использование: <code>/broadcast текст</code>", parse_mode="HTML")
+        return
+    
+    broadcast_id = f"admin-{message.message_id}-{message.date.timestamp():.0f}"
+    await message.answer(f"📣 Рассылка <code>{broadcast_id}</code> запущена", parse_mode="HTML")
+    asyncio.create_task(run_admin_broadcast(message, broadcast_id, text))
+
+async def run_admin_broadcast(message, broadcast_id, text):
+    """Рассылка в фоне с отчётом админу"""
+    try:
+        stats = await Broadcast(notification_manager.sender, broadcast_id, text).run()
+        await message.answer(f"📣 Рассылка завершена: {format_broadcast_stats(stats)}")
+    except Exception as e:
+        logger.error(f"Ошибка рассылки {broadcast_id}: {e}")
+        await message.answer(f"⚠️ Рассылка прервана, продолжится после перезапуска: {e}")
+
+@dp.message(Command("llmstats"))
+async def cmd_llm_stats(message: Message):
+    """Статистика LLM-моделей (только для админов)"""
+    if message.from_user.id not in ADMINS:
+        return
+    
+    await message.answer(f"🤖 <b>LLM-модели:</b>\n\n{html.escape(llm_backend.format_stats())}", parse_mode="HTML")
+
+# ===== КНОПКИ МЕНЮ =====
+async def search_word_handler(message: Message, state: FSMContext):
     """Обработчик поиска слова"""
+    await state.clear()
     await message.answer(
         "🔍 <b>Введите английское слово для перевода:</b>\n\n"
         "Пример: <code>run</code> или <code>beautiful</code>",
         parse_mode="HTML",
-        reply_markup=back_to_menu_keyboard()
+        reply_markup=BACK_TO_MENU_KEYBOARD
     )
 
-@dp.message(F.text == "✍️ Генератор")
-async def generator_handler(message: Message):
+async def generator_handler(message: Message, state: FSMContext):
     """Обработчик генератора"""
+    await state.set_state(GeneratorState.waiting_for_words)
     await message.answer(
         "✍️ <b>Генератор предложений</b>\n\n"
         "Введите слова через запятую (английские):\n"
         "Пример: <code>cat, sunny, window</code>",
         parse_mode="HTML",
-        reply_markup=back_to_menu_keyboard()
+        reply_markup=BACK_TO_MENU_KEYBOARD
+    )
+
+async def dictionary_handler(message: Message, state: FSMContext):
+    """Словарь пользователя"""
+    await state.clear()
+    await message.answer(DictionaryManager().format_dictionary_for_display(message.from_user.id), parse_mode="HTML")
+
+async def synonyms_menu_handler(message: Message, state: FSMContext):
+    """Подсказка по синонимам"""
+    await state.clear()
+    await message.answer(
+        "🔄 <b>Синонимы</b>\n\n"
+        "Найдите слово через поиск и нажмите «🔄 Синонимы» под переводом.",
+        parse_mode="HTML",
+        reply_markup=BACK_TO_MENU_KEYBOARD
     )
 
-@dp.message(F.text == "↩️ В главное меню")
-async def back_to_menu_handler(message: Message):
+async def in_development_handler(message: Message, state: FSMContext):
+    """Разделы, которые ещё не готовы"""
+    await state.clear()
+    await message.answer("🛠 Этот раздел в разработке. Загляните позже!")
+
+async def help_menu_handler(message: Message, state: FSMContext):
+    """Справка"""
+    await cmd_help(message)
+
+async def stats_menu_handler(message: Message, state: FSMContext):
+    """Статистика"""
+    await cmd_stats(message)
+
+async def back_to_menu_handler(message: Message, state: FSMContext):
     """Возврат в главное меню"""
+    await state.clear()
     await cmd_start(message)
 
+# Таблица маршрутизации: текст кнопки -> обработчик
+MENU_HANDLERS = {
+    BTN_SEARCH: search_word_handler,
+    BTN_GENERATOR: generator_handler,
+    BTN_DICTIONARY: dictionary_handler,
+    BTN_CHEATSHEETS: in_development_handler,
+    BTN_SYNONYMS: synonyms_menu_handler,
+    BTN_HELP: help_menu_handler,
+    BTN_STATS: stats_menu_handler,
+    BTN_SETTINGS: in_development_handler,
+    BTN_PREMIUM: in_development_handler,
+    BTN_BACK: back_to_menu_handler,
+}
+
+@dp.message(F.text.in_(MENU_TEXTS))
+async def menu_handler(message: Message, state: FSMContext):
+    """Кнопки главного меню (один поиск в словаре вместо цепочки фильтров)"""
+    await MENU_HANDLERS[message.text](message, state)
+
+@dp.message(GeneratorState.waiting_for_words, F.text, ~F.text.startswith('/'))
+async def generator_words_handler(message: Message, state: FSMContext):
+    """Генерация предложений из введённых слов"""
+    user_id = message.from_user.id
+    words = [w.strip() for w in message.text.split(',') if w.strip()]
+    
+    # Выходим из режима генерации сразу: при исчерпанном лимите следующие слова — снова поиск
+    await state.clear()
+    
+    # Проверяем лимит
+    can_generate, used = await check_and_update_limit(user_id, "generate")
+    if not can_generate:
+        await message.answer(
+            f"🚫 <b>Лимит исчерпан!</b>\n\n"
+            f"Вы использовали {used}/{FREE_LIMITS['daily_generations']} генераций сегодня.\n\n"
+            f"💎 <b>Премиум</b> даёт безлимитный доступ!",
+            parse_mode="HTML"
+        )
+        return
+    
+    activity_counters.record(user_id, "generations")
+    
+    try:
+        await send_streamed_sentences(message, words)
+    except Exception as e:
+        logger.error(f"Ошибка генерации: {e}")
+        await message.answer("⚠️ Произошла ошибка при генерации. Попробуйте позже.")
+
 # ===== ОСНОВНАЯ ОБРАБОТКА СЛОВ =====
-@dp.message(lambda message: message.text and not message.text.startswith('/') and not message.text in ["🔍 Поиск слова", "✍️ Генератор", "📖 Мой словарь", "📝 Шпаргалки", "🔄 Синонимы", "✨ Помощь", "📊 Статистика", "⚙️ Настройки", "💎 Премиум", "↩️ В главное меню"])
+@dp.message(F.text, ~F.text.startswith('/'))
 async def handle_word_input(message: Message):
     """Обработка ввода слова для перевода"""
     user_id = message.from_user.id
@@ -202,7 +376,7 @@ async def handle_word_input(message: Message):
     if not can_search:
         await message.answer(
             f"🚫 <b>Лимит исчерпан!</b>\n\n"
-            f"Вы использовали {used}/10 поисков сегодня.\n"
+            f"Вы использовали {used}/{FREE_LIMITS['daily_searches']} поисков сегодня.\n"
             f"Лимит обновится через: <b>{(24 - (used // 10))} часов</b>\n\n"
             f"💎 <b>Премиум</b> даёт безлимитный доступ!",
             parse_mode="HTML"
@@ -220,35 +394,211 @@ async def handle_word_input(message: Message):
             await message.answer(f"⚠️ Не удалось найти перевод для <b>{word}</b>", parse_mode="HTML")
             return
         
-        # Форматируем ответ
-        response = format_translation_response(translation_data)
+        # История поиска: по ней прогревается кэш популярных слов
+        cache_warmer.record(word)
+        
+        # Готовый ответ (из кэша для популярных слов)
+        response, keyboard = render_translation(word, translation_data)
         
         # Отправляем результат
-        await message.answer(response, parse_mode="HTML", reply_markup=translation_actions_keyboard(translation_data))
+        await message.answer(response, parse_mode="HTML", reply_markup=keyboard)
         
         # Удаляем сообщение "ищу"
         await wait_msg.delete()
         
         # Проверяем достижения
+        activity_counters.record(user_id, "searches")
         await check_achievements(user_id, "search")
-        
+    
     except Exception as e:
         logger.error(f"Ошибка перевода: {e}")
         await message.answer("⚠️ Произошла ошибка при поиске перевода. Попробуйте позже.")
 
+# ===== КНОПКИ ПОД ПЕРЕВОДОМ =====
+async def save_word_callback(callback: CallbackQuery, word):
+    """Сохранение слова в словарь"""
+    user_id = callback.from_user.id
+    
+    if db.get_word_count(user_id) >= FREE_LIMITS["max_words"]:
+        await callback.answer(f"🚫 В словаре уже {FREE_LIMITS['max_words']} слов — лимит бесплатного уровня", show_alert=True)
+        return
+    
+    translation_data = await get_word_translation(word)
+    if not translation_data or 'error' in translation_data:
+        await callback.answer("⚠️ Не удалось получить перевод", show_alert=True)
+        return
+    
+    examples = translation_data.get('examples', [])
+    example = examples[0].get('en') if examples else None
+    
+    if DictionaryManager().add_word_to_dictionary(user_id, translation_data, example):
+        await callback.answer(f"💾 «{word}» сохранено в словарь")
+        activity_counters.record(user_id, "saves")
+        await check_achievements(user_id, "save_word")
+    else:
+        await callback.answer(f"Не удалось сохранить «{word}» — возможно, оно уже есть в словаре", show_alert=True)
+
+async def examples_callback(callback: CallbackQuery, word):
+    """Примеры предложений со словом"""
+    can_generate, used = await check_and_update_limit(callback.from_user.id, "generate")
+    if not can_generate:
+        await callback.answer(f"🚫 Лимит генераций исчерпан ({used}/{FREE_LIMITS['daily_generations']})", show_alert=True)
+        return
+    
+    activity_counters.record(callback.from_user.id, "generations")
+    await callback.answer()
+    await send_batched_sentences(callback.message, [word])
+
+async def forms_callback(callback: CallbackQuery, word):
+    """Формы слова"""
+    fields = get_template_bank().word_fields(word)
+    await callback.answer()
+    await callback.message.answer(format_word_forms(fields), parse_mode="HTML")
+
+async def synonyms_callback(callback: CallbackQuery, word):
+    """Синонимы и антонимы"""
+    entry = get_synonyms().get(word)
+    await callback.answer()
+    
+    if not entry:
+        await callback.message.answer(f"🔄 Для <b>{html.escape(word)}</b> синонимов пока нет", parse_mode="HTML")
+        return
+    
+    text = f"🔄 <b>{html.escape(word.upper())}</b>\n\n"
+    text += f"✅ <b>Синонимы:</b> {html.escape(', '.join(entry.get('synonyms', [])) or '—')}\n"
+    text += f"❌ <b>Антонимы:</b> {html.escape(', '.join(entry.get('antonyms', [])) or '—')}"
+    await callback.message.answer(text, parse_mode="HTML")
+
+# Таблица маршрутизации: префикс callback_data -> обработчик
+CALLBACK_HANDLERS = {
+    CALLBACK_SAVE: save_word_callback,
+    CALLBACK_EXAMPLES: examples_callback,
+    CALLBACK_FORMS: forms_callback,
+    CALLBACK_SYNONYMS: synonyms_callback,
+}
+
+@dp.callback_query(F.data)
+async def callback_handler(callback: CallbackQuery):
+    """Кнопки под переводом"""
+    prefix, word = parse_callback_data(callback.data)
+    handler = CALLBACK_HANDLERS.get(prefix)
+    
+    if handler is None or not word:
+        # Пустое слово — id длинного слова, забытый после перезапуска
+        await callback.answer("⌛ Кнопка устарела — найдите слово заново" if handler else None)
+        return
+    
+    try:
+        await handler(callback, word)
+    except Exception as e:
+        logger.error(f"Ошибка обработки кнопки {callback.data}: {e}")
+        await callback.answer("⚠️ Произошла ошибка. Попробуйте позже.")
+
+# ===== INLINE-РЕЖИМ =====
+@dp.inline_query()
+async def inline_query_handler(inline_query: InlineQuery):
+    """Подсказки "@bot слово" в любом чате — только из локального индекса и кэша"""
+    results = []
+    
+    for i, (word, description) in enumerate(word_index.search(inline_query.query)):
+        results.append(InlineQueryResultArticle(
+            id=str(i),
+            title=word,
+            description=description or "Перевод слова",
+            input_message_content=InputTextMessageContent(message_text=render_inline_message(word, description), parse_mode="HTML")
+        ))
+    
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME)
+
+def render_inline_message(word, description):
+    """Полный перевод из кэша или краткий из индекса"""
+    entry = translation_cache.get(word)
+    if entry is not None:
+        return render_translation(word, entry[0].to_dict())[0]
+    
+    text = f"🔍 <b>{html.escape(word.upper())}</b>"
+    return f"{text}\n\n{html.escape(description)}" if description else text
+
 # ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
 async def get_limit_info(user_id, limit_type, get_used=False):
     """Получение информации о лимитах"""
     can_search, used = db.check_limit(user_id, limit_type)
     from config import FREE_LIMITS
     
-    limit = FREE_LIMITS.get(f"daily_{limit_type}s", 10)
+    limit = FREE_LIMITS.get(LIMIT_KEYS[limit_type], 10)
     
     if get_used:
         return f"{used}/{limit}"
     else:
         return f"{limit - used}/{limit}"
 
+async def send_streamed_sentences(message, words, theme=None, style="natural"):
+    """Генерация с постепенным обновлением сообщения по мере готовности предложений"""
+    header = f"✍️ <b>Предложения со словами:</b> {html.escape(', '.join(words))}\n\n"
+    reply = await message.answer(header + "⏳ Генерирую...", parse_mode="HTML")
+    
+    sentences = []
+    async for sentence in stream_sentences(words, theme, style):
+        sentences.append(sentence)
+        text = header + "\n".join(f"{i}. {html.escape(s)}" for i, s in enumerate(sentences, 1))
+        await reply.edit_text(text, parse_mode="HTML")
+    
+    return sentences
+
+async def send_batched_sentences(message, words, theme=None, style="natural"):
+    """Генерация через общую очередь (короткие запросы разных пользователей — одним вызовом модели)"""
+    header = f"✍️ <b>Предложения со словами:</b> {html.escape(', '.join(words))}\n\n"
+    result = await generation_batcher.generate(words, theme, style)
+    sentences = result.get("sentences") or result.get("fallback") or generate_fallback_sentences(words, theme, style)
+    
+    text = header + "\n".join(f"{i}. {html.escape(s)}" for i, s in enumerate(sentences, 1))
+    await message.answer(text, parse_mode="HTML")
+    return sentences
+
+@lru_cache(maxsize=1)
+def get_synonyms():
+    """Словарь синонимов (читается с диска один раз)"""
+    return db.load_synonyms()
+
+def format_word_forms(fields):
+    """Форматирование форм слова по части речи"""
+    pos = fields['pos']
+    
+    if pos == "verb":
+        forms = [
+            ("Past Simple", fields['past']),
+            ("Past Participle", fields['participle']),
+            ("-ing", fields['ing']),
+            ("he/she/it", fields['third'])
+        ]
+    elif pos == "adjective":
+        forms = [("Сравнительная", fields['comparative']), ("Превосходная", fields['superlative'])]
+    elif pos == "noun":
+        forms = [("Множественное число", fields['plural'])]
+    elif pos == UNKNOWN_POS:
+        return f"📝 <b>{html.escape(fields['word'].upper())}</b>\n\nЧасть речи неизвестна — формы не подобраны"
+    else:
+        forms = []
+    
+    text = f"📝 <b>{html.escape(fields['word'].upper())}</b> — <i>{pos}</i>\n\n"
+    if not forms:
+        return text + "Слово не изменяется"
+    return text + "\n".join(f"• {name}: {html.escape(value)}" for name, value in forms)
+
+# Версия шаблона ответа: увеличить при изменении format_translation_response
+TRANSLATION_TEMPLATE_VERSION = 1
+
+def render_translation(word, data):
+    """HTML ответа и клавиатура; для слов из кэша переводов — без повторного форматирования"""
+    key = (data.get('source', ''), TRANSLATION_TEMPLATE_VERSION)
+    rendered = get_cached_render(word, key)
+    
+    if rendered is None:
+        rendered = (format_translation_response(data), translation_actions_keyboard(data.get('word', word)))
+        cache_render(word, key, rendered)
+    
+    return rendered
+
 def format_translation_response(data):
     """Форматирование ответа с переводом"""
     word = data.get('word', '')
@@ -257,38 +607,92 @@ def format_translation_response(data):
     examples = data.get('examples', [])
     source = data.get('source', 'Неизвестно')
     
-    response = f"""
-🔍 <b>{word.upper()}</b> {f'[{transcription}]' if transcription else ''}
-
-🎯 <b>ЗНАЧЕНИЯ:</b>
-"""
+    parts = [f"\n🔍 <b>{word.upper()}</b> {f'[{transcription}]' if transcription else ''}\n\n🎯 <b>ЗНАЧЕНИЯ:</b>\n"]
     
     for i, trans in enumerate(translations[:10], 1):  # Ограничиваем 10 значениями
         part_of_speech = trans.get('part_of_speech', '')
         meanings = trans.get('meanings', [])
         if meanings:
-            response += f"{i}. <i>{part_of_speech}</i>: {', '.join(meanings[:3])}\n"
+            parts.append(f"{i}. <i>{part_of_speech}</i>: {', '.join(meanings[:3])}\n")
     
     if examples:
-        response += f"\n💡 <b>ПРИМЕРЫ:</b>\n"
+        parts.append("\n💡 <b>ПРИМЕРЫ:</b>\n")
         for i, ex in enumerate(examples[:3], 1):  # Первые 3 примера
-            response += f"{i}. {ex.get('en', '')}\n   <i>{ex.get('ru', '')}</i>\n"
+            parts.append(f"{i}. {ex.get('en', '')}\n   <i>{ex.get('ru', '')}</i>\n")
     
-    response += f"\n🔧 <b>Источник:</b> {source}"
+    parts.append(f"\n🔧 <b>Источник:</b> {source}")
     
-    return response
+    return "".join(parts)
 
 # ===== ЗАПУСК БОТА =====
+async def on_startup(bot: Bot):
+    """Подготовка общих ресурсов (для polling и webhook)"""
+    # База, банк шаблонов, индекс слов
+    bootstrap()
+    
+    # Фоновая очистка брошенных FSM-диалогов
+    asyncio.create_task(fsm_storage.run_cleanup())
+    
+    # Ежедневные уведомления и счётчики активности для вечерней сводки
+    await notification_manager.schedule_daily_notifications()
+    asyncio.create_task(activity_counters.run_flush())
+    
+    # Прогрев кэша популярными словами и их обновление до истечения
+    asyncio.create_task(cache_warmer.run())
+    
+    # Метрики: /metrics на локальном порту и задержка цикла событий
+    if METRICS_PORT:
+        await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        asyncio.create_task(monitor_event_loop())
+    
+    # Рассылки, прерванные перезапуском
+    asyncio.create_task(resume_broadcasts(notification_manager.sender))
+    
+    if BOT_MODE == "webhook":
+        await bot.set_webhook(
+            f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info(f"Webhook установлен: {WEBHOOK_URL}{WEBHOOK_PATH}")
+
+async def on_shutdown(bot: Bot):
+    """Освобождение общих ресурсов"""
+    await fsm_storage.close()
+    await shutdown()
+    logger.info("Бот остановлен")
+
+dp.startup.register(on_startup)
+dp.shutdown.register(on_shutdown)
+
 async def main():
-    """Основная функция запуска бота"""
+    """Основная функция запуска бота (long polling)"""
     logger.info("Запуск бота...")
     
-    # Инициализация базы данных
-    from database import init_database
-    init_database()
+    # Снимаем webhook, если бот раньше работал в режиме webhook
+    await bot.delete_webhook()
     
     # Запуск бота
     await dp.start_polling(bot)
 
+async def healthcheck(request):
+    """Проверка работоспособности для Railway"""
+    return web.Response(text="ok")
+
+def run_webhook():
+    """Запуск бота в режиме webhook (aiohttp-сервер)"""
+    logger.info(f"Запуск бота (webhook) на {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}...")
+    
+    app = web.Application()
+    app.router.add_get("/", healthcheck)
+    
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET or None).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    
+    web.run_app(app, host=WEBAPP_HOST, port=WEBAPP_PORT)
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(main())
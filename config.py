@@ -7,6 +7,17 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 ADMINS = [5762295959]  # Только ваш ID
 
+# ===== РЕЖИМ ЗАПУСКА =====
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # "polling" или "webhook"
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")  # Публичный адрес, например https://bot.up.railway.app
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("PORT", "8080"))  # Railway передаёт порт в PORT
+WORKERS = int(os.getenv("WORKERS", "1"))  # Процессов-воркеров (запуск через workers.py)
+POLL_RETRY_DELAY = 1  # Первая пауза после ошибки getUpdates во фронт-процессе, сек
+POLL_RETRY_MAX_DELAY = 60  # Пауза удваивается до этого предела
+
 # ===== API КЛЮЧИ =====
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN", "")
@@ -47,16 +58,81 @@ ACHIEVEMENTS_CONFIG = {
 # ===== ПЕРЕВОДЧИКИ =====
 TRANSLATOR_PRIORITY = ["yandex", "oxford", "google", "mymemory"]
 CACHE_DURATION = 3600
+CACHE_WARMUP_WORDS = 200  # Популярных слов (по истории поиска), которые держим в кэше с запуска
+CACHE_WARMUP_CONCURRENCY = 4  # Одновременных запросов к переводчикам при прогреве
+CACHE_REFRESH_AHEAD = 300  # За сколько секунд до истечения обновлять популярные слова
+CACHE_REFRESH_INTERVAL = 60  # Как часто проверять популярные слова, сек
+CACHE_FAILURE_BACKOFF = 300  # Пауза перед повтором слова, которое не перевёл ни один переводчик, сек
+CACHE_FAILURE_MAX_BACKOFF = 86400  # Пауза удваивается с каждой неудачей до этого предела
+
+# ===== ВНЕШНИЕ API =====
+# Адреса можно подменить (нагрузочный тест: benchmarks/loadtest.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+YANDEX_DICT_URL = os.getenv("YANDEX_DICT_URL", "https://dictionary.yandex.net/api/v1/dicservice.json/lookup")
+OXFORD_URL = os.getenv("OXFORD_URL", "https://www.oxfordlearnersdictionaries.com/definition/english/")
+GOOGLE_TRANSLATE_URL = os.getenv("GOOGLE_TRANSLATE_URL", "https://translate.googleapis.com/translate_a/single")
+MYMEMORY_URL = os.getenv("MYMEMORY_URL", "https://api.mymemory.translated.net/get")
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# ===== LLM =====
+# Модели по приоритету; при ошибках, таймаутах и превышении бюджета задержки — следующая
+LLM_MODELS = [
+    {"model": "openai/gpt-3.5-turbo", "url": OPENROUTER_URL, "timeout": 30},
+    {"model": "openai/gpt-4o-mini", "url": OPENROUTER_URL, "timeout": 20},
+    {"model": "meta-llama/llama-3.1-8b-instruct", "url": OPENROUTER_URL, "timeout": 15}
+]
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "10"))  # Одновременных запросов
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "5"))  # Запросов в секунду
+LLM_RATE_BURST = 10
+LLM_MAX_RETRIES = 2  # Повторов на модель при 429/5xx
+LLM_LATENCY_BUDGET = 12  # Бюджет на один ответ (все попытки), сек; меньше таймаутов моделей
+LLM_BREAKER_FAILURES = 3  # Ошибок/таймаутов подряд, после которых модель уходит в конец очереди
+LLM_BREAKER_COOLDOWN = 60  # На сколько секунд, потом снова пробуем в своём порядке
+
+# ===== ГЕНЕРАТОР =====
+GENERATION_CACHE_DURATION = 86400  # Кэш сгенерированных предложений, сек
+GENERATION_CACHE_SIZE = 2000  # Максимум ключей в кэше
+GENERATION_CACHE_VARIANTS = 3  # Вариантов на один набор слов
+GENERATION_BATCH_SIZE = 8  # Максимум запросов в одном пакетном вызове
+GENERATION_BATCH_WAIT = 0.2  # Сколько ждать попутные запросы, сек
+
+# ===== ИСПРАВЛЕНИЕ ТЕКСТА =====
+FIX_CACHE_SIZE = 5000  # Исправлений от LLM в кэше (по хэшу текста)
+
+# ===== УВЕДОМЛЕНИЯ =====
+DEFAULT_TIMEZONE = "Europe/Moscow"  # Для пользователей, не указавших свой
+MORNING_REMINDER_TIME = "09:00"  # Локальное время утреннего напоминания
+EVENING_SUMMARY_TIME = "21:00"  # Локальное время вечерней сводки
+NOTIFICATION_CATCHUP_WINDOW = 3 * 3600  # Пропущенное (бот был выключен) отправляется, если опоздание меньше, сек
+NOTIFICATION_CONCURRENCY = 20  # Одновременных отправок планировщика
+NOTIFICATION_BATCH_SIZE = 500  # Пользователей в одной пачке (данные собираются несколькими запросами на пачку)
+REVIEW_WORDS_IN_REMINDER = 5  # Слов для повторения в утреннем напоминании
+ACTIVITY_FLUSH_INTERVAL = 30  # Как часто счётчики активности за день пишутся в базу, сек
+BROADCAST_RATE = 25  # Сообщений в секунду на весь бот (лимит Telegram ~30); воркеры делят его поровну, рассылка берёт весь
+BROADCAST_BURST = 5  # Допустимый всплеск сверх среднего темпа
+BROADCAST_CONCURRENCY = 10  # Одновременных запросов sendMessage при рассылке
+BROADCAST_PAGE_SIZE = 500  # Получателей за один запрос к users (и между контрольными точками)
+BROADCAST_MAX_RETRIES = 3  # Повторов одного сообщения после 429 или сетевой ошибки
+
+# ===== INLINE-РЕЖИМ =====
+INLINE_RESULTS_LIMIT = 20  # Подсказок в ответе на inline-запрос
+INLINE_CACHE_TIME = 300  # Сколько Telegram кэширует ответ, сек
+INLINE_POPULAR_WORDS = 5000  # Популярных слов из словарей пользователей в индексе
+
+# ===== МЕТРИКИ =====
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Только локально
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))  # 0 — не запускать; воркер N слушает METRICS_PORT + N
+
+# ===== ТРАССИРОВКА =====
+SLOW_UPDATE_THRESHOLD = float(os.getenv("SLOW_UPDATE_THRESHOLD", "1.0"))  # Секунд: апдейты дольше — в лог с разбивкой
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))  # Доля трасс в TRACE_FILE (0 — не писать)
+TRACE_FILE = os.getenv("TRACE_FILE", "data/traces.jsonl")
 
 # ===== БАЗЫ ДАННЫХ =====
-DB_PATH = "data/database.db"
+DB_PATH = os.getenv("DB_PATH", "data/database.db")
 WORD_FORMS_PATH = "data/word_forms.json"
 SYNONYMS_PATH = "data/synonyms.json"
-
-print("✅ Конфиг загружен (без ключей в коде)")
-
-# ===== ПУТИ К МОДУЛЯМ =====
-# Используем modules_correct вместо modules
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), 'modules_correct'))
+TEMPLATES_PATH = "data/sentence_templates.json"
+CATEGORY_CACHE_SIZE = 1000  # Пользователей в LRU-кэше категорий
+FSM_STATE_TTL = 86400  # Через сколько секунд незавершённый диалог считается брошенным
+FSM_CLEANUP_INTERVAL = 3600  # Как часто удалять брошенные диалоги, сек
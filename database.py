@@ -1,14 +1,31 @@
 import sqlite3
 import json
 import os
+from collections import OrderedDict
 from datetime import datetime, date
-from config import DB_PATH, WORD_FORMS_PATH, SYNONYMS_PATH
+from modules_correct.metrics import instrument_methods
+from config import DB_PATH, WORD_FORMS_PATH, SYNONYMS_PATH, CATEGORY_CACHE_SIZE
 
-def init_database():
+# Тип лимита -> столбец user_limits
+LIMIT_COLUMNS = {
+    'search': 'searches_used',
+    'generate': 'generations_used',
+    'fix': 'fixes_used'
+}
+
+# Тип лимита -> ключ дневной нормы в FREE_LIMITS / PREMIUM_LIMITS
+LIMIT_KEYS = {
+    'search': 'daily_searches',
+    'generate': 'daily_generations',
+    'fix': 'daily_fixes'
+}
+
+def init_database(path=None):
     """Инициализация базы данных"""
-    os.makedirs("data", exist_ok=True)
+    path = path or DB_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(path)
     cursor = conn.cursor()
     
     # Таблица пользователей
@@ -89,15 +106,111 @@ def init_database():
     )
     ''')
     
+    # Настройки уведомлений (часовой пояс)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_settings (
+        user_id INTEGER PRIMARY KEY,
+        timezone TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id)
+    )
+    ''')
+    
+    # Состояние задач планировщика: следующий и последний запуск
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS notification_jobs (
+        user_id INTEGER,
+        kind TEXT NOT NULL,
+        next_run REAL,
+        last_run REAL,
+        PRIMARY KEY (user_id, kind)
+    )
+    ''')
+    
+    # Активность за день (местная дата пользователя), обновляется пачками
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS daily_activity (
+        user_id INTEGER,
+        date DATE,
+        searches INTEGER DEFAULT 0,
+        saves INTEGER DEFAULT 0,
+        reviews INTEGER DEFAULT 0,
+        generations INTEGER DEFAULT 0,
+        PRIMARY KEY (user_id, date)
+    )
+    ''')
+    
+    # Рассылки: текст, контрольная точка и счётчики
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        broadcast_id TEXT PRIMARY KEY,
+        text TEXT NOT NULL,
+        last_user_id INTEGER DEFAULT 0,
+        delivered INTEGER DEFAULT 0,
+        failed INTEGER DEFAULT 0,
+        blocked INTEGER DEFAULT 0,
+        started_at REAL,
+        finished_at REAL
+    )
+    ''')
+    
+    # Постоянный кэш переводов (компактная запись TranslationRecord.pack)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS translation_cache (
+        word TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        updated_at REAL
+    )
+    ''')
+    
+    # История поиска: сколько раз искали слово (для прогрева кэша переводов)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS word_lookups (
+        word TEXT PRIMARY KEY,
+        lookups INTEGER DEFAULT 0,
+        last_lookup REAL
+    )
+    ''')
+    
     conn.commit()
     conn.close()
     print("✅ База данных инициализирована")
 
 class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self.cursor = self.conn.cursor()
+    """Доступ к SQLite. Соединение открывается при первом запросе (или явно через connect)"""
+    
+    def __init__(self, path=None):
+        self.path = path or DB_PATH
+        self._conn = None
+        self._cursor = None
+        
+        # LRU-кэш категорий: user_id -> set(category_name)
+        self._category_cache = OrderedDict()
+    
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.connect()
+        return self._conn
+    
+    @property
+    def cursor(self):
+        if self._cursor is None:
+            self.connect()
+        return self._cursor
+    
+    def connect(self):
+        """Создание таблиц и открытие соединения (повторный вызов ничего не делает)"""
+        if self._conn is not None:
+            return
+        
+        init_database(self.path)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._cursor = self._conn.cursor()
+        
+        # WAL: несколько процессов-воркеров читают и пишут без взаимных блокировок
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
     
     # ===== ПОЛЬЗОВАТЕЛИ =====
     def add_user(self, user_id, username):
@@ -158,13 +271,13 @@ class Database:
         }
         
         used = limits.get(limit_type, 0)
-        allowed = FREE_LIMITS.get(f"daily_{limit_type}s", 10)
+        allowed = FREE_LIMITS.get(LIMIT_KEYS[limit_type], 10)
         
         return used < allowed, used
     
     def increment_limit(self, user_id, limit_type):
         """Увеличение счётчика лимита"""
-        column = f"{limit_type}s_used"
+        column = LIMIT_COLUMNS[limit_type]
         
         self.cursor.execute(f'''
             INSERT INTO user_limits (user_id, date, {column})
@@ -223,6 +336,16 @@ class Database:
         ''', (user_id,))
         return self.cursor.fetchone()['count']
     
+    def get_popular_words(self, limit=1000):
+        """Самые частые слова в словарях всех пользователей: [(слово, сколько раз)]"""
+        self.cursor.execute('''
+            SELECT LOWER(word) as word, COUNT(*) as count FROM user_dictionary
+            GROUP BY LOWER(word)
+            ORDER BY count DESC
+            LIMIT ?
+        ''', (limit,))
+        return [(row['word'], row['count']) for row in self.cursor.fetchall()]
+    
     # ===== КАТЕГОРИИ =====
     def add_category(self, user_id, category_name, color="#3498db"):
         """Добавление категории"""
@@ -232,10 +355,45 @@ class Database:
                 VALUES (?, ?, ?)
             ''', (user_id, category_name, color))
             self.conn.commit()
+            self._category_cache.pop(user_id, None)
             return True
         except sqlite3.IntegrityError:
             return False  # Категория уже существует
     
+    def ensure_category(self, user_id, category_name, color="#3498db"):
+        """Создание категории, если её ещё нет (повторные сохранения проверяются по LRU-кэшу)"""
+        names = self._category_names(user_id)
+        if category_name in names:
+            return
+        
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO user_categories (user_id, category_name, color)
+            VALUES (?, ?, ?)
+        ''', (user_id, category_name, color))
+        self.conn.commit()
+        names.add(category_name)
+    
+    def get_category_names(self, user_id):
+        """Множество названий категорий пользователя (через LRU-кэш)"""
+        return self._category_names(user_id)
+    
+    def _category_names(self, user_id):
+        """Названия категорий из LRU-кэша; при промахе — один SELECT и запись в кэш"""
+        names = self._category_cache.get(user_id)
+        if names is not None:
+            self._category_cache.move_to_end(user_id)
+            return names
+        
+        self.cursor.execute('''
+            SELECT category_name FROM user_categories
+            WHERE user_id = ?
+        ''', (user_id,))
+        names = {row['category_name'] for row in self.cursor.fetchall()}
+        self._category_cache[user_id] = names
+        if len(self._category_cache) > CATEGORY_CACHE_SIZE:
+            self._category_cache.popitem(last=False)
+        return names
+    
     def get_categories(self, user_id):
         """Получение категорий пользователя"""
         self.cursor.execute('''
@@ -252,6 +410,12 @@ class Database:
             WHERE id = ?
         ''', (new_category, word_id))
         self.conn.commit()
+        
+        # Сбрасываем кэш категорий владельца слова
+        self.cursor.execute('SELECT user_id FROM user_dictionary WHERE id = ?', (word_id,))
+        row = self.cursor.fetchone()
+        if row:
+            self._category_cache.pop(row['user_id'], None)
     
     # ===== ДОСТИЖЕНИЯ =====
     def update_achievement_progress(self, user_id, achievement_id, progress=1):
@@ -282,6 +446,220 @@ class Database:
         ''', (user_id,))
         return [dict(row) for row in self.cursor.fetchall()]
     
+    # ===== УВЕДОМЛЕНИЯ =====
+    def get_user_timezone(self, user_id):
+        """Часовой пояс пользователя (или None)"""
+        self.cursor.execute('SELECT timezone FROM user_settings WHERE user_id = ?', (user_id,))
+        row = self.cursor.fetchone()
+        return row['timezone'] if row else None
+    
+    def set_user_timezone(self, user_id, timezone):
+        """Сохранение часового пояса"""
+        self.cursor.execute('''
+            INSERT INTO user_settings (user_id, timezone) VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET timezone = excluded.timezone
+        ''', (user_id, timezone))
+        self.conn.commit()
+    
+    def get_reminder_data(self, user_ids, review_limit=5):
+        """Данные утреннего напоминания для пачки пользователей за 4 запроса
+        
+        Возвращает {user_id: {'word_count', 'achievements', 'searches_used', 'generations_used',
+        'fixes_used', 'words_added', 'review_words': [{'word', 'translation'}]}}
+        """
+        rows = {
+            user_id: {
+                'word_count': 0, 'achievements': 0, 'searches_used': 0, 'generations_used': 0,
+                'fixes_used': 0, 'words_added': 0, 'review_words': []
+            }
+            for user_id in user_ids
+        }
+        if not rows:
+            return rows
+        
+        placeholders = ','.join('?' * len(rows))
+        params = list(rows)
+        
+        self.cursor.execute(f'''
+            SELECT user_id, COUNT(*) as count FROM user_dictionary
+            WHERE user_id IN ({placeholders})
+            GROUP BY user_id
+        ''', params)
+        for row in self.cursor.fetchall():
+            rows[row['user_id']]['word_count'] = row['count']
+        
+        self.cursor.execute(f'''
+            SELECT user_id, COUNT(*) as count FROM achievements
+            WHERE is_completed AND user_id IN ({placeholders})
+            GROUP BY user_id
+        ''', params)
+        for row in self.cursor.fetchall():
+            rows[row['user_id']]['achievements'] = row['count']
+        
+        self.cursor.execute(f'''
+            SELECT user_id, searches_used, generations_used, fixes_used, words_added FROM user_limits
+            WHERE date = DATE('now') AND user_id IN ({placeholders})
+        ''', params)
+        for row in self.cursor.fetchall():
+            rows[row['user_id']].update({key: row[key] or 0 for key in ('searches_used', 'generations_used', 'fixes_used', 'words_added')})
+        
+        # Те же правила, что в DictionaryManager.get_words_for_review: старше 3 дней, меньше 3 повторений
+        self.cursor.execute(f'''
+            SELECT user_id, word, translation FROM (
+                SELECT user_id, word, translation,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY user_id
+                           ORDER BY (JULIANDAY(DATE('now')) - JULIANDAY(added_date)) * (3 - review_count) DESC
+                       ) as position
+                FROM user_dictionary
+                WHERE user_id IN ({placeholders})
+                AND added_date <= DATE('now', '-3 days') AND review_count < 3
+            )
+            WHERE position <= ?
+        ''', params + [review_limit])
+        for row in self.cursor.fetchall():
+            rows[row['user_id']]['review_words'].append({'word': row['word'], 'translation': row['translation']})
+        
+        return rows
+    
+    def get_notification_users(self):
+        """Все пользователи с часовыми поясами: [(user_id, timezone или None)]"""
+        self.cursor.execute('''
+            SELECT u.user_id, s.timezone FROM users u
+            LEFT JOIN user_settings s ON s.user_id = u.user_id
+        ''')
+        return [(row['user_id'], row['timezone']) for row in self.cursor.fetchall()]
+    
+    def get_notification_jobs(self):
+        """Сохранённые задачи: {(user_id, kind): next_run}"""
+        self.cursor.execute('SELECT user_id, kind, next_run FROM notification_jobs')
+        return {(row['user_id'], row['kind']): row['next_run'] for row in self.cursor.fetchall()}
+    
+    def save_notification_jobs(self, jobs):
+        """Сохранение пачки задач: [(user_id, kind, next_run, last_run)]"""
+        self.cursor.executemany('''
+            INSERT INTO notification_jobs (user_id, kind, next_run, last_run)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, kind) DO UPDATE SET
+            next_run = excluded.next_run,
+            last_run = COALESCE(excluded.last_run, last_run)
+        ''', jobs)
+        self.conn.commit()
+    
+    # ===== АКТИВНОСТЬ ЗА ДЕНЬ =====
+    def add_daily_activity(self, rows):
+        """Прибавление счётчиков пачкой: [(user_id, date, searches, saves, reviews, generations)]"""
+        self.cursor.executemany('''
+            INSERT INTO daily_activity (user_id, date, searches, saves, reviews, generations)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, date) DO UPDATE SET
+            searches = searches + excluded.searches,
+            saves = saves + excluded.saves,
+            reviews = reviews + excluded.reviews,
+            generations = generations + excluded.generations
+        ''', rows)
+        self.conn.commit()
+    
+    def get_daily_activity(self, dates):
+        """Активность пачки пользователей за их даты: {user_id: date} -> {user_id: {searches, saves, reviews, generations}}"""
+        result = {user_id: {'searches': 0, 'saves': 0, 'reviews': 0, 'generations': 0} for user_id in dates}
+        if not dates:
+            return result
+        
+        user_ids = list(dates)
+        days = sorted(set(dates.values()))
+        self.cursor.execute(f'''
+            SELECT user_id, date, searches, saves, reviews, generations FROM daily_activity
+            WHERE user_id IN ({','.join('?' * len(user_ids))}) AND date IN ({','.join('?' * len(days))})
+        ''', user_ids + days)
+        
+        for row in self.cursor.fetchall():
+            if dates[row['user_id']] == row['date']:
+                result[row['user_id']] = {key: row[key] for key in ('searches', 'saves', 'reviews', 'generations')}
+        return result
+    
+    # ===== РАССЫЛКИ =====
+    def get_user_ids_page(self, after_user_id=0, limit=500):
+        """Страница user_id по возрастанию (keyset-пагинация, без OFFSET)"""
+        self.cursor.execute('''
+            SELECT user_id FROM users
+            WHERE user_id > ?
+            ORDER BY user_id
+            LIMIT ?
+        ''', (after_user_id, limit))
+        return [row['user_id'] for row in self.cursor.fetchall()]
+    
+    def create_broadcast(self, broadcast_id, text, started_at):
+        """Новая рассылка (повторный вызов с тем же id ничего не меняет)"""
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO broadcasts (broadcast_id, text, started_at)
+            VALUES (?, ?, ?)
+        ''', (broadcast_id, text, started_at))
+        self.conn.commit()
+    
+    def get_broadcast(self, broadcast_id):
+        """Состояние рассылки (или None)"""
+        self.cursor.execute('SELECT * FROM broadcasts WHERE broadcast_id = ?', (broadcast_id,))
+        row = self.cursor.fetchone()
+        return dict(row) if row else None
+    
+    def get_unfinished_broadcasts(self):
+        """Прерванные рассылки"""
+        self.cursor.execute('SELECT * FROM broadcasts WHERE finished_at IS NULL ORDER BY started_at')
+        return [dict(row) for row in self.cursor.fetchall()]
+    
+    def save_broadcast_checkpoint(self, broadcast_id, last_user_id, delivered, failed, blocked, finished_at=None):
+        """Контрольная точка: все получатели до last_user_id обработаны"""
+        self.cursor.execute('''
+            UPDATE broadcasts
+            SET last_user_id = ?, delivered = ?, failed = ?, blocked = ?, finished_at = ?
+            WHERE broadcast_id = ?
+        ''', (last_user_id, delivered, failed, blocked, finished_at, broadcast_id))
+        self.conn.commit()
+    
+    # ===== КЭШ ПЕРЕВОДОВ =====
+    def save_translation(self, word, packed, updated_at):
+        """Сохранение упакованного перевода"""
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO translation_cache (word, data, updated_at)
+            VALUES (?, ?, ?)
+        ''', (word, packed, updated_at))
+        self.conn.commit()
+    
+    def get_translation(self, word):
+        """Упакованный перевод и время сохранения (или None)"""
+        self.cursor.execute('''
+            SELECT data, updated_at FROM translation_cache
+            WHERE word = ?
+        ''', (word,))
+        row = self.cursor.fetchone()
+        return (row['data'], row['updated_at']) if row else None
+    
+    def get_cached_translations(self):
+        """Все упакованные переводы: [(слово, данные)]"""
+        self.cursor.execute('SELECT word, data FROM translation_cache')
+        return [(row['word'], row['data']) for row in self.cursor.fetchall()]
+    
+    def add_word_lookups(self, rows):
+        """Прибавление счётчиков поиска пачкой: [(слово, сколько раз, время последнего)]"""
+        self.cursor.executemany('''
+            INSERT INTO word_lookups (word, lookups, last_lookup)
+            VALUES (?, ?, ?)
+            ON CONFLICT(word) DO UPDATE SET
+            lookups = lookups + excluded.lookups,
+            last_lookup = MAX(last_lookup, excluded.last_lookup)
+        ''', rows)
+        self.conn.commit()
+    
+    def get_top_lookups(self, limit):
+        """Самые часто искомые слова: [(слово, сколько раз)]"""
+        self.cursor.execute('''
+            SELECT word, lookups FROM word_lookups
+            ORDER BY lookups DESC
+            LIMIT ?
+        ''', (limit,))
+        return [(row['word'], row['lookups']) for row in self.cursor.fetchall()]
+    
     # ===== ЛОКАЛЬНЫЕ БАЗЫ (формы слов, синонимы) =====
     def load_word_forms(self):
         """Загрузка форм слов из JSON"""
@@ -298,11 +676,13 @@ class Database:
         return {}
     
     def close(self):
-        """Закрытие соединения"""
-        self.conn.close()
+        """Закрытие соединения (следующий запрос откроет новое)"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = self._cursor = None
 
-# Инициализация при импорте
-init_database()
+# Время каждого метода — в метрику bot_db_query_seconds
+instrument_methods(Database)
 
-# Глобальный экземпляр для использования
+# Глобальный экземпляр для использования (без соединения до первого запроса)
 db = Database()
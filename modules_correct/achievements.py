@@ -2,7 +2,9 @@ import asyncio
 from datetime import datetime, timedelta
 from database import db
 from config import ACHIEVEMENTS_CONFIG
+from modules_correct.tracing import traced
 
+@traced("achievements")
 async def check_achievements(user_id, action_type, count=1):
     """Проверка и обновление достижений"""
     updated_achievements = []
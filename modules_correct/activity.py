@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime
+from database import db
+from config import DEFAULT_TIMEZONE, ACTIVITY_FLUSH_INTERVAL
+from modules_correct.scheduler import get_zone
+
+# Действия и их счётчики в daily_activity
+ACTIVITY_ACTIONS = ("searches", "saves", "reviews", "generations")
+
+class ActivityCounters:
+    """Счётчики активности за день: в памяти на каждое действие, в базу — пачкой
+    
+    Ключ — (user_id, местная дата пользователя), чтобы вечерняя сводка считала "сегодня"
+    по его часовому поясу. Сводка читает одну строку daily_activity на пользователя.
+    """
+    
+    def __init__(self, zones=None):
+        self.pending = {}  # (user_id, дата) -> [searches, saves, reviews, generations]
+        self.zones = zones if zones is not None else {}  # user_id -> ZoneInfo (пояс не по умолчанию)
+    
+    def record(self, user_id, action, count=1):
+        """Учёт действия (без обращения к базе)"""
+        key = (user_id, self.local_date(user_id))
+        counters = self.pending.get(key)
+        if counters is None:
+            counters = self.pending[key] = [0] * len(ACTIVITY_ACTIONS)
+        counters[ACTIVITY_ACTIONS.index(action)] += count
+    
+    def local_date(self, user_id):
+        """Сегодняшняя дата в часовом поясе пользователя"""
+        zone = self.zones.get(user_id) or get_zone(DEFAULT_TIMEZONE)
+        return datetime.now(zone).date().isoformat()
+    
+    def flush(self):
+        """Запись накопленных приращений одним executemany"""
+        if not self.pending:
+            return 0
+        
+        pending, self.pending = self.pending, {}
+        try:
+            db.add_daily_activity([(user_id, day, *counters) for (user_id, day), counters in pending.items()])
+        except Exception as e:
+            # Не теряем счётчики: вернём их к новым
+            print(f"Ошибка записи активности: {e}")
+            for key, counters in pending.items():
+                current = self.pending.setdefault(key, [0] * len(ACTIVITY_ACTIONS))
+                for i, value in enumerate(counters):
+                    current[i] += value
+            return 0
+        return len(pending)
+    
+    def get_today(self, user_ids):
+        """Активность за сегодня (местное) для пачки пользователей: {user_id: {действие: число}}"""
+        self.flush()
+        dates = {user_id: self.local_date(user_id) for user_id in user_ids}
+        return db.get_daily_activity(dates)
+    
+    async def run_flush(self, interval=ACTIVITY_FLUSH_INTERVAL):
+        """Периодическая запись (запускается фоновой задачей)"""
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+# Глобальные счётчики
+activity_counters = ActivityCounters()
+
+# Тестирование
+def test_activity():
+    """Тестирование накопления и записи счётчиков"""
+    print("🧪 Тестируем счётчики активности...")
+    
+    counters = ActivityCounters()
+    for _ in range(3):
+        counters.record(123456, "searches")
+    counters.record(123456, "saves")
+    before = db.get_daily_activity({123456: counters.local_date(123456)})[123456]
+    
+    counters.record(123456, "searches")
+    flushed = counters.flush()
+    after = db.get_daily_activity({123456: counters.local_date(123456)})[123456]
+    
+    print(f"1. Записано строк: {flushed}, в памяти осталось: {len(counters.pending)}")
+    print(f"2. До: {before}, после: {after}")
+    
+    ok = after["searches"] - before["searches"] == 4 and after["saves"] - before["saves"] == 1
+    print(f"{'✅' if ok else '❌'} Счётчики активности готовы!")
+
+if __name__ == "__main__":
+    test_activity()
@@ -0,0 +1,24 @@
+from database import db
+from modules_correct.activity import activity_counters
+from modules_correct.cache_warmer import cache_warmer
+from modules_correct.http_client import close_sessions
+from modules_correct.sentence_templates import get_template_bank
+from modules_correct.word_index import word_index
+
+def bootstrap():
+    """Подготовка ресурсов процесса бота: импорт модулей их не создаёт"""
+    # База данных: таблицы и соединение
+    db.connect()
+    
+    # Банк шаблонов для резервных предложений
+    get_template_bank()
+    
+    # Индекс слов для inline-подсказок
+    word_index.load()
+
+async def shutdown():
+    """Освобождение ресурсов процесса: счётчики и история поиска в базу, HTTP-сессия, соединение"""
+    activity_counters.flush()
+    cache_warmer.flush()
+    await close_sessions()
+    db.close()
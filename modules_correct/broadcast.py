@@ -0,0 +1,208 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest, TelegramNetworkError
+from database import db
+from config import (
+    BROADCAST_RATE, BROADCAST_BURST, BROADCAST_CONCURRENCY, BROADCAST_PAGE_SIZE, BROADCAST_MAX_RETRIES
+)
+from modules_correct.rate_limit import TokenBucket
+
+# Итог отправки одного сообщения
+DELIVERED = "delivered"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+class MessageSender:
+    """Отправка сообщений в общем темпе бота: token bucket, паузы по retry_after, повторы"""
+    
+    def __init__(self, bot, rate=BROADCAST_RATE, burst=BROADCAST_BURST, max_retries=BROADCAST_MAX_RETRIES):
+        self.bot = bot
+        self.full_bucket = TokenBucket(rate, burst)
+        self.bucket = self.full_bucket
+        self.share_bucket = self.full_bucket
+        self.max_retries = max_retries
+        self.paused_until = 0.0  # после 429 паузу выдерживают все отправки
+    
+    def set_share(self, count):
+        """Доля общего темпа для одного из count процессов (лимит Telegram — на весь бот)"""
+        self.share_bucket = TokenBucket(BROADCAST_RATE / count, max(BROADCAST_BURST / count, 1))
+        self.bucket = self.share_bucket
+    
+    @contextmanager
+    def full_rate(self):
+        """Весь темп бота на время рассылки: она идёт в одном процессе, но всем пользователям
+        
+        Остальные воркеры в это время шлют только напоминания своей доли; редкие 429
+        от совпадений выдерживаются паузой по retry_after.
+        """
+        self.bucket = self.full_bucket
+        try:
+            yield
+        finally:
+            self.bucket = self.share_bucket
+    
+    async def send(self, chat_id, text, **kwargs):
+        """Отправка одного сообщения. Возвращает DELIVERED, BLOCKED или FAILED"""
+        for attempt in range(self.max_retries + 1):
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.bucket.acquire()
+            
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                return DELIVERED
+            except TelegramRetryAfter as e:
+                # Flood control: Telegram сам говорит, сколько ждать
+                self.paused_until = max(self.paused_until, time.monotonic() + e.retry_after)
+            except TelegramForbiddenError:
+                return BLOCKED
+            except TelegramBadRequest as e:
+                # "chat not found" и т.п. — повтор не поможет
+                print(f"Сообщение для {chat_id} не отправлено: {e}")
+                return FAILED
+            except TelegramNetworkError as e:
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                else:
+                    print(f"Сетевая ошибка при отправке {chat_id}: {e}")
+            except Exception as e:
+                print(f"Ошибка отправки {chat_id}: {e}")
+                return FAILED
+        
+        return FAILED
+
+class Broadcast:
+    """Рассылка всем пользователям с контрольными точками
+    
+    Получатели читаются из users страницами по возрастанию user_id. После каждой страницы
+    в broadcasts сохраняется последний user_id и счётчики, поэтому прерванная рассылка
+    продолжается с места остановки и никому не приходит дважды (кроме незавершённой страницы).
+    """
+    
+    def __init__(self, sender, broadcast_id, text, page_size=BROADCAST_PAGE_SIZE,
+                 concurrency=BROADCAST_CONCURRENCY, parse_mode="HTML"):
+        self.sender = sender
+        self.broadcast_id = broadcast_id
+        self.text = text
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.parse_mode = parse_mode
+        self.stats = {DELIVERED: 0, FAILED: 0, BLOCKED: 0}
+        self.elapsed = 0.0
+    
+    async def run(self):
+        """Отправка (или продолжение) рассылки. Возвращает статистику"""
+        db.create_broadcast(self.broadcast_id, self.text, time.time())
+        state = db.get_broadcast(self.broadcast_id)
+        self.text = state['text']
+        self.stats = {DELIVERED: state['delivered'], FAILED: state['failed'], BLOCKED: state['blocked']}
+        
+        if state['finished_at']:
+            return self.get_stats()
+        
+        last_user_id = state['last_user_id']
+        sent_before = sum(self.stats.values())
+        start = time.monotonic()
+        
+        with self.sender.full_rate():
+            while True:
+                user_ids = db.get_user_ids_page(last_user_id, self.page_size)
+                if not user_ids:
+                    break
+                
+                await self.send_page(user_ids)
+                last_user_id = user_ids[-1]
+                db.save_broadcast_checkpoint(
+                    self.broadcast_id, last_user_id, self.stats[DELIVERED], self.stats[FAILED], self.stats[BLOCKED]
+                )
+        
+        self.elapsed = time.monotonic() - start
+        db.save_broadcast_checkpoint(
+            self.broadcast_id, last_user_id, self.stats[DELIVERED], self.stats[FAILED], self.stats[BLOCKED],
+            finished_at=time.time()
+        )
+        
+        stats = self.get_stats(sum(self.stats.values()) - sent_before)
+        print(f"📣 Рассылка {self.broadcast_id}: {format_broadcast_stats(stats)}")
+        return stats
+    
+    async def send_page(self, user_ids):
+        """Страница получателей через фиксированный пул отправителей"""
+        queue = asyncio.Queue()
+        for user_id in user_ids:
+            queue.put_nowait(user_id)
+        
+        async def worker():
+            while not queue.empty():
+                user_id = queue.get_nowait()
+                result = await self.sender.send(user_id, self.text, parse_mode=self.parse_mode)
+                self.stats[result] += 1
+        
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(user_ids)))))
+    
+    def get_stats(self, sent_now=0):
+        """Счётчики и скорость текущего запуска"""
+        return {
+            **self.stats,
+            'elapsed': self.elapsed,
+            'throughput': sent_now / self.elapsed if self.elapsed else 0.0
+        }
+
+def format_broadcast_stats(stats):
+    """Статистика рассылки текстом"""
+    return (
+        f"доставлено {stats[DELIVERED]}, заблокировали бота {stats[BLOCKED]}, ошибок {stats[FAILED]}, "
+        f"{stats['elapsed']:.1f} с, {stats['throughput']:.1f} сообщ./с"
+    )
+
+async def resume_broadcasts(sender):
+    """Продолжение рассылок, прерванных перезапуском"""
+    for state in db.get_unfinished_broadcasts():
+        print(f"📣 Продолжаем рассылку {state['broadcast_id']} с user_id > {state['last_user_id']}")
+        await Broadcast(sender, state['broadcast_id'], state['text']).run()
+
+# Тестирование
+async def test_broadcast():
+    """Тестирование рассылки: 429, заблокированные пользователи, продолжение"""
+    print("🧪 Тестируем рассылку...")
+    
+    user_ids = list(range(900001, 900061))
+    for user_id in user_ids:
+        db.add_user(user_id, f"test_{user_id}")
+    
+    class TestBot:
+        def __init__(self):
+            self.sent = []
+            self.flooded = False
+        
+        async def send_message(self, chat_id, text, **kwargs):
+            if chat_id == 900040 and not self.flooded:
+                self.flooded = True
+                raise TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=1)
+            if chat_id % 7 == 0:
+                raise TelegramForbiddenError(method=None, message="bot was blocked by the user")
+            self.sent.append(chat_id)
+    
+    bot = TestBot()
+    sender = MessageSender(bot, rate=200, burst=10)
+    sender.set_share(4)  # как в воркере: рассылка всё равно идёт в полном темпе
+    broadcast_id = f"test-{int(time.time())}"
+    
+    # "Прерванная" рассылка: первые 30 получателей уже обработаны
+    db.create_broadcast(broadcast_id, "Hello!", time.time())
+    db.save_broadcast_checkpoint(broadcast_id, 900030, 0, 0, 0)
+    stats = await Broadcast(sender, broadcast_id, "Hello!", page_size=20).run()
+    
+    print(f"1. {format_broadcast_stats(stats)}")
+    print(f"2. Первый получатель после продолжения: {min(bot.sent)}")
+    
+    print(f"3. Темп рассылки: {stats['throughput']:.0f} сообщ./с, после неё: {sender.bucket.rate:g} сообщ./с")
+    
+    ok = (min(bot.sent) > 900030 and stats[BLOCKED] > 0 and db.get_broadcast(broadcast_id)['finished_at']
+          and sender.bucket is sender.share_bucket)
+    print(f"{'✅' if ok else '❌'} Рассылка готова!")
+
+if __name__ == "__main__":
+    asyncio.run(test_broadcast())
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from datetime import datetime
+from database import db
+from config import (
+    CACHE_DURATION, CACHE_WARMUP_WORDS, CACHE_WARMUP_CONCURRENCY, CACHE_REFRESH_AHEAD, CACHE_REFRESH_INTERVAL,
+    CACHE_FAILURE_BACKOFF, CACHE_FAILURE_MAX_BACKOFF
+)
+from modules_correct.translators import translation_cache, load_cached_translation, fetch_translation
+from modules_correct.metrics import CACHE_REFRESHES
+
+class CacheWarmer:
+    """Прогрев кэша переводов популярными словами и обновление до истечения
+    
+    История поиска копится в памяти и пишется в word_lookups пачкой. Проход берёт top-N слов
+    по истории и обновляет те, которых нет в памяти или которые истекут меньше чем через
+    refresh_ahead секунд: сначала из постоянного кэша (его мог обновить прошлый запуск),
+    иначе — у переводчиков, не больше concurrency запросов одновременно. Слово, которое
+    не перевёл ни один переводчик, повторяется не раньше чем через CACHE_FAILURE_BACKOFF
+    секунд, и пауза удваивается с каждой неудачей (до CACHE_FAILURE_MAX_BACKOFF).
+    Первый проход при запуске — прогрев, дальше — каждые CACHE_REFRESH_INTERVAL секунд.
+    С воркерами проходы делает один процесс, остальные только пишут историю (run_flush)
+    и берут обновлённые переводы из постоянного кэша.
+    """
+    
+    def __init__(self, limit=CACHE_WARMUP_WORDS, concurrency=CACHE_WARMUP_CONCURRENCY,
+                 refresh_ahead=CACHE_REFRESH_AHEAD, fetch=fetch_translation):
+        self.limit = limit
+        self.concurrency = concurrency
+        self.refresh_ahead = refresh_ahead
+        self.fetch = fetch
+        self.pending = {}  # слово -> [сколько раз искали, время последнего поиска]
+        self.failures = {}  # слово -> (неудач подряд, время следующей попытки)
+    
+    def record(self, word):
+        """Учёт поиска слова (без обращения к базе)"""
+        entry = self.pending.get(word)
+        if entry is None:
+            self.pending[word] = [1, time.time()]
+        else:
+            entry[0] += 1
+            entry[1] = time.time()
+    
+    def flush(self):
+        """Запись накопленной истории одним executemany"""
+        if not self.pending:
+            return 0
+        
+        pending, self.pending = self.pending, {}
+        try:
+            db.add_word_lookups([(word, count, last) for word, (count, last) in pending.items()])
+        except Exception as e:
+            # Не теряем историю: вернём её к новым поискам
+            print(f"Ошибка записи истории поиска: {e}")
+            for word, (count, last) in pending.items():
+                entry = self.pending.setdefault(word, [0, last])
+                entry[0] += count
+                entry[1] = max(entry[1], last)
+            return 0
+        return len(pending)
+    
+    def hot_words(self):
+        """Популярные слова по истории поиска"""
+        self.flush()
+        return [word for word, _ in db.get_top_lookups(self.limit)]
+    
+    def needs_refresh(self, word):
+        """Слова нет в памяти или оно скоро истечёт (и время повтора после неудачи прошло)"""
+        failure = self.failures.get(word)
+        if failure is not None and failure[1] > time.time():
+            return False
+        
+        entry = translation_cache.get(word)
+        if entry is None:
+            return True
+        return (datetime.now() - entry[1]).total_seconds() >= CACHE_DURATION - self.refresh_ahead
+    
+    async def refresh(self, word, semaphore):
+        """Обновление одного слова: 'cache', 'provider' или 'failed'"""
+        # Достаточно свежая запись постоянного кэша (обновил другой воркер или прошлый запуск)
+        if load_cached_translation(word, max_age=CACHE_DURATION - self.refresh_ahead) is not None:
+            return "cache"
+        
+        async with semaphore:
+            result = await self.fetch(word)
+        return "provider" if result is not None else "failed"
+    
+    async def run_once(self):
+        """Один проход по популярным словам: {результат: сколько слов}"""
+        words = [word for word in self.hot_words() if self.needs_refresh(word)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self.refresh(word, semaphore) for word in words), return_exceptions=True)
+        
+        stats = {}
+        for word, result in zip(words, results):
+            if isinstance(result, Exception):
+                print(f"Ошибка обновления кэша: {result}")
+                result = "failed"
+            self.record_result(word, result)
+            stats[result] = stats.get(result, 0) + 1
+            CACHE_REFRESHES.inc(result=result)
+        return stats
+    
+    def record_result(self, word, result):
+        """Неудача откладывает следующую попытку (экспоненциально), успех сбрасывает счётчик"""
+        if result != "failed":
+            self.failures.pop(word, None)
+            return
+        
+        count = self.failures.get(word, (0, 0))[0] + 1
+        delay = min(CACHE_FAILURE_BACKOFF * 2 ** (count - 1), CACHE_FAILURE_MAX_BACKOFF)
+        self.failures[word] = (count, time.time() + delay)
+    
+    async def run(self, interval=CACHE_REFRESH_INTERVAL):
+        """Прогрев при запуске и обновление до истечения (запускается фоновой задачей)"""
+        while True:
+            start = time.perf_counter()
+            try:
+                stats = await self.run_once()
+                if stats:
+                    print(f"🔥 Кэш переводов обновлён: {stats} за {time.perf_counter() - start:.1f} с")
+            except Exception as e:
+                print(f"Ошибка прогрева кэша: {e}")
+            await asyncio.sleep(interval)
+    
+    async def run_flush(self, interval=CACHE_REFRESH_INTERVAL):
+        """Только запись истории поиска (в процессах, которые не прогревают кэш)"""
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+# Глобальный прогрев кэша
+cache_warmer = CacheWarmer()
+
+# Тестирование
+async def test_cache_warmer():
+    """Тестирование прогрева с ограничением одновременных запросов"""
+    from modules_correct.translators import cache_translation
+    print("🧪 Тестируем прогрев кэша переводов...")
+    
+    active = 0
+    peak = 0
+    
+    async def fake_fetch(word):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        result = {"word": word, "source": "test", "transcription": "",
+                  "translations": [{"part_of_speech": "сущ.", "meanings": [f"перевод {word}"]}], "examples": []}
+        cache_translation(word, result)
+        return result
+    
+    words = [f"warmup{i}" for i in range(8)]
+    warmer = CacheWarmer(limit=len(words), concurrency=3, fetch=fake_fetch)
+    for i, word in enumerate(words):
+        for _ in range(i + 1):
+            warmer.record(word)
+    
+    first = await warmer.run_once()
+    print(f"1. Прогрев: {first}, одновременно не больше {peak}")
+    
+    second = await warmer.run_once()
+    print(f"2. Повторный проход (всё свежее): {second}")
+    
+    # Запись в памяти скоро истечёт, в базе — свежая (как после обновления другим воркером)
+    record, timestamp, rendered = translation_cache[words[0]]
+    translation_cache[words[0]] = (record, datetime.fromtimestamp(time.time() - CACHE_DURATION + 10), rendered)
+    third = await warmer.run_once()
+    print(f"3. Скоро истекает: {third}")
+    print(f"4. Популярные: {db.get_top_lookups(3)}")
+    
+    # Слово без перевода: повтор только после паузы, пауза растёт
+    async def failing_fetch(word):
+        return None
+    
+    failing = CacheWarmer(limit=1, fetch=failing_fetch)
+    for _ in range(20):
+        failing.record("qwzxunknown")
+    attempts = [await failing.run_once(), await failing.run_once()]
+    count, retry_at = failing.failures["qwzxunknown"]
+    failing.failures["qwzxunknown"] = (count, 0)  # пауза прошла
+    attempts.append(await failing.run_once())
+    backoff = failing.failures["qwzxunknown"][1] - time.time()
+    print(f"5. Неудачные проходы: {attempts}, следующая пауза {backoff:.0f} с")
+    
+    ok = (first.get("provider") == len(words) and peak <= 3 and not second and third == {"cache": 1}
+          and attempts == [{"failed": 1}, {}, {"failed": 1}] and backoff > CACHE_FAILURE_BACKOFF)
+    print(f"{'✅' if ok else '❌'} Прогрев кэша готов!")
+
+def run_test():
+    """Тест на временной базе: тестовые слова не попадают в историю и кэш бота"""
+    import os
+    import tempfile
+    
+    original = db.path
+    with tempfile.TemporaryDirectory() as workdir:
+        db.close()
+        db.path = os.path.join(workdir, "warmup.db")
+        try:
+            asyncio.run(test_cache_warmer())
+        finally:
+            db.close()
+            db.path = original
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,363 @@
+import asyncio
+import hashlib
+import html
+import json
+import os
+import re
+from collections import OrderedDict
+from config import WORD_FORMS_PATH, FIX_CACHE_SIZE
+from modules_correct.llm_backend import llm_backend
+from modules_correct.sentence_templates import make_past, make_plural, make_comparative, make_superlative
+
+FIX_SYSTEM_PROMPT = (
+    "You are an English teacher. Correct grammar, spelling and word usage in the user's text. "
+    "Keep the meaning and style. Return ONLY the corrected text, without explanations."
+)
+FIX_LIST_PROMPT = (
+    "You are an English teacher. Correct grammar, spelling and word usage in each numbered sentence. "
+    "Keep the meaning, style and numbering. Return ONLY the numbered corrected sentences, one per line."
+)
+
+# Слова, где артикль определяется звуком, а не буквой
+AN_EXCEPTIONS = {"hour", "hours", "honest", "honestly", "honor", "honour", "heir", "herb"}
+A_EXCEPTIONS = {"university", "unique", "unit", "united", "user", "useful", "usual", "usually", "one", "once", "european", "euro", "uniform", "union"}
+# Остальные слова на u читаются по-разному (an umbrella, a unicorn) — артикль не трогаем
+
+# Согласование "местоимение + be/have"
+AGREEMENT = {
+    ("i", "is"): "am", ("i", "are"): "am",
+    ("he", "are"): "is", ("she", "are"): "is", ("it", "are"): "is",
+    ("he", "am"): "is", ("she", "am"): "is", ("it", "am"): "is",
+    ("you", "is"): "are", ("we", "is"): "are", ("they", "is"): "are",
+    ("you", "am"): "are", ("we", "am"): "are", ("they", "am"): "are",
+    ("we", "was"): "were", ("you", "was"): "were", ("they", "was"): "were",
+    ("i", "has"): "have", ("you", "has"): "have", ("we", "has"): "have", ("they", "has"): "have",
+}
+
+# После этих слов he/she/it + инфинитив — норма: вопрос (did he go, has he run),
+# модальный глагол (can it go), конструкция (let it run) или часть подлежащего (the cat and it go)
+BASE_FORM_TRIGGERS = (r"do|does|did|has|have|had|is|are|was|were|can|could|will|would|shall|should|must|may|might"
+                      r"|let|help|make|made|watch|saw|see|to|and|or|nor")
+
+# Подлежащее из нескольких слов (you and I are) — согласование не проверяем
+COMPOUND_SUBJECT_RE = re.compile(r"\b(?:and|or|nor)\s+$", re.IGNORECASE)
+
+# Повторы, которые бывают правильными: he had had enough, that that is, what it is is
+ALLOWED_DOUBLES = {"had", "that", "is", "do", "did", "very", "so", "no", "bye", "ha", "knock"}
+
+# Предкомпилированные шаблоны
+ARTICLE_RE = re.compile(r"\b(a|an)(\s+)([A-Za-z]+)", re.IGNORECASE)
+AGREEMENT_RE = re.compile(r"\b(i|he|she|it|you|we|they)(\s+)(is|are|am|was|has)\b", re.IGNORECASE)
+DONT_RE = re.compile(r"\b(?:(and|or|nor)\s+)?(he|she|it)(\s+)don't\b", re.IGNORECASE)
+LOWER_I_RE = re.compile(r"\bi\b(?!\.[A-Za-z])")  # не i.e.
+DOUBLE_WORD_RE = re.compile(r"\b(\w+)(\s+)\1\b", re.IGNORECASE)
+SPACES_RE = re.compile(r"[ \t]{2,}")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+NUMBERED_LINE_RE = re.compile(r"^\s*(\d+)[.)]\s*(.+)$", re.MULTILINE)
+WORD_RE = re.compile(r"[A-Za-z']+")
+
+class TextCorrector:
+    """Исправление текста: быстрые локальные правила, остальное — LLM с кэшем"""
+    
+    def __init__(self, word_forms, backend=None, cache_size=FIX_CACHE_SIZE):
+        self.backend = backend or llm_backend
+        self.cache = OrderedDict()  # sha256 текста -> исправленный текст
+        self.cache_size = cache_size
+        self.wrong_forms = {}  # goed -> went, childs -> children
+        self.participles = {}  # went -> gone (после have/has/had)
+        self.third_person = {}  # go -> goes (после he/she/it)
+        self.build_rules(word_forms)
+        
+        self.wrong_forms_re = re.compile(r"\b(" + "|".join(map(re.escape, self.wrong_forms)) + r")\b", re.IGNORECASE) if self.wrong_forms else None
+        self.participle_re = re.compile(r"\b(have|has|had)(\s+)(" + "|".join(map(re.escape, self.participles)) + r")\b", re.IGNORECASE) if self.participles else None
+        self.third_person_re = re.compile(r"\b(?:(" + BASE_FORM_TRIGGERS + r")\s+)?(he|she|it)(\s+)(" + "|".join(map(re.escape, self.third_person)) + r")\b", re.IGNORECASE) if self.third_person else None
+    
+    @classmethod
+    def load(cls, word_forms_path=WORD_FORMS_PATH, backend=None):
+        """Загрузка правил из word_forms.json"""
+        word_forms = {}
+        if os.path.exists(word_forms_path):
+            with open(word_forms_path, 'r', encoding='utf-8') as f:
+                word_forms = json.load(f)
+        return cls(word_forms, backend)
+    
+    def build_rules(self, word_forms):
+        """Таблицы ошибочных форм по словарю форм слов"""
+        for word, info in word_forms.items():
+            word_type = info.get('type')
+            
+            if word_type == "verb":
+                forms = info.get('forms', {})
+                past = forms.get('past_simple', '')
+                participle = forms.get('past_participle', '')
+                third = forms.get('third_person', '')
+                
+                if info.get('irregular') and '/' not in past:
+                    regular_past = make_past(word)
+                    if regular_past != past:
+                        self.wrong_forms[regular_past] = past
+                    if past and participle and past != participle:
+                        self.participles[past] = participle
+                
+                if third and third != word and word != "be":
+                    self.third_person[word] = third
+            
+            elif word_type == "noun":
+                plural = info.get('plural')
+                regular_plural = make_plural(word)
+                if plural and plural != regular_plural:
+                    self.wrong_forms[regular_plural] = plural
+            
+            elif word_type == "adjective" and info.get('irregular'):
+                for wrong, right in ((make_comparative(word), info.get('comparative')),
+                                     (make_superlative(word), info.get('superlative'))):
+                    if right and wrong != right:
+                        self.wrong_forms[wrong] = right
+                if info.get('comparative'):
+                    self.wrong_forms[f"more {info['comparative']}"] = info['comparative']
+    
+    def apply_rules(self, text):
+        """Локальный проход правил. Возвращает (текст, список исправлений)"""
+        changes = []
+        
+        def record(wrong, right, rule):
+            if wrong != right:
+                changes.append((wrong, right, rule))
+            return right
+        
+        text = SPACES_RE.sub(" ", text.strip())
+        
+        if self.wrong_forms_re:
+            text = self.wrong_forms_re.sub(
+                lambda m: record(m.group(0), keep_case(m.group(0), self.wrong_forms[m.group(0).lower()]), "неправильная форма слова"),
+                text
+            )
+        
+        if self.participle_re:
+            text = self.participle_re.sub(
+                lambda m: m.group(1) + m.group(2) + record(m.group(3), keep_case(m.group(3), self.participles[m.group(3).lower()]), "после have/has/had нужна 3-я форма"),
+                text
+            )
+        
+        if self.third_person_re:
+            text = self.third_person_re.sub(
+                lambda m: m.group(0) if m.group(1) else m.group(2) + m.group(3) + record(m.group(4), keep_case(m.group(4), self.third_person[m.group(4).lower()]), "he/she/it: глагол с окончанием -s"),
+                text
+            )
+        
+        text = DONT_RE.sub(
+            lambda m: m.group(0) if m.group(1) else m.group(2) + m.group(3) + record("don't", "doesn't", "he/she/it: doesn't"),
+            text
+        )
+        
+        text = AGREEMENT_RE.sub(
+            lambda m: m.group(0) if COMPOUND_SUBJECT_RE.search(m.string, 0, m.start()) else m.group(1) + m.group(2) + record(
+                m.group(3),
+                keep_case(m.group(3), AGREEMENT.get((m.group(1).lower(), m.group(3).lower()), m.group(3).lower())),
+                "согласование подлежащего и сказуемого"
+            ),
+            text
+        )
+        
+        text = ARTICLE_RE.sub(lambda m: fix_article(m, record), text)
+        
+        text = DOUBLE_WORD_RE.sub(
+            lambda m: m.group(0) if m.group(1).lower() in ALLOWED_DOUBLES else record(m.group(0), m.group(1), "повтор слова"),
+            text
+        )
+        
+        text = LOWER_I_RE.sub(lambda m: record("i", "I", "местоимение I пишется с заглавной"), text)
+        
+        if text and text[0].islower():
+            text = record(text[0], text[0].upper(), "заглавная буква в начале") + text[1:]
+        
+        return text, changes
+    
+    async def correct(self, text, use_llm=True):
+        """Исправление текста по предложениям: правила, а LLM — только для остальных
+        
+        Предложение, где сработало правило, считается исправленным и в сеть не уходит.
+        Остальные проверяет LLM одним запросом; ответы кэшируются по предложению.
+        """
+        sentences = []
+        changes = []
+        residual = []  # номера предложений без срабатываний правил
+        for sentence in SENTENCE_SPLIT_RE.split(SPACES_RE.sub(" ", text.strip())):
+            fixed, sentence_changes = self.apply_rules(sentence)
+            if not sentence_changes and WORD_RE.search(fixed):
+                residual.append(len(sentences))
+            sentences.append(fixed)
+            changes.extend(sentence_changes)
+        
+        result = {
+            "original": text,
+            "corrected": " ".join(sentences),
+            "changes": changes,
+            "source": "rules"
+        }
+        
+        if not use_llm or not residual:
+            return result
+        
+        pending = []
+        for index in residual:
+            key = hashlib.sha256(sentences[index].encode('utf-8')).hexdigest()
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                sentences[index] = self.cache[key]
+                result["source"] = "cache"
+            else:
+                pending.append((index, key))
+        
+        if pending:
+            fixed = await self.ask_llm([sentences[index] for index, _ in pending])
+            if fixed:
+                for (index, key), sentence in zip(pending, fixed):
+                    self.cache[key] = sentence
+                    if len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+                    sentences[index] = sentence
+                result["source"] = "llm"
+        
+        result["corrected"] = " ".join(sentences)
+        return result
+    
+    async def ask_llm(self, sentences):
+        """Исправление предложений одним запросом к LLM. None при ошибке"""
+        if len(sentences) == 1:
+            messages = [{"role": "system", "content": FIX_SYSTEM_PROMPT}, {"role": "user", "content": sentences[0]}]
+        else:
+            numbered = "\n".join(f"{i}. {sentence}" for i, sentence in enumerate(sentences, 1))
+            messages = [{"role": "system", "content": FIX_LIST_PROMPT}, {"role": "user", "content": numbered}]
+        
+        length = sum(len(sentence) for sentence in sentences)
+        try:
+            llm_text = await self.backend.complete(messages, max_tokens=max(100, length // 2), temperature=0)
+        except Exception as e:
+            print(f"Ошибка исправления через LLM: {e}")
+            return None
+        
+        llm_text = llm_text.strip()
+        if not llm_text:
+            return None
+        if len(sentences) == 1:
+            return [llm_text]
+        
+        # Пропущенные в ответе номера оставляем как есть
+        answers = {int(number): line.strip() for number, line in NUMBERED_LINE_RE.findall(llm_text)}
+        return [answers.get(i) or sentence for i, sentence in enumerate(sentences, 1)]
+
+def keep_case(original, replacement):
+    """Сохраняем заглавную букву исходного слова"""
+    if original[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+def fix_article(match, record):
+    """a/an по первому звуку следующего слова. Неоднозначные случаи не трогаем"""
+    article, space, word = match.group(1), match.group(2), match.group(3)
+    lower = word.lower()
+    
+    # Аббревиатура (an MBA, a NATO) или заглавная A — возможно, это буква (plan A is, A is the first letter)
+    if word.isupper() or article == "A":
+        return match.group(0)
+    
+    if lower in AN_EXCEPTIONS:
+        needs_an = True
+    elif lower in A_EXCEPTIONS:
+        needs_an = False
+    elif lower[0] == "u":
+        return match.group(0)
+    else:
+        needs_an = lower[0] in "aeio"
+    
+    right = keep_case(article, "an" if needs_an else "a")
+    return record(article, right, "артикль a/an") + space + word
+
+def format_correction_message(result):
+    """Форматирование результата исправления"""
+    if result["corrected"] == result["original"].strip():
+        return f"✅ <b>Ошибок не найдено!</b>\n\n{html.escape(result['original'])}"
+    
+    message = f"✨ <b>ИСПРАВЛЕННЫЙ ТЕКСТ:</b>\n{html.escape(result['corrected'])}\n"
+    
+    if result["changes"]:
+        message += "\n📝 <b>Исправления:</b>\n"
+        for wrong, right, rule in result["changes"][:10]:
+            message += f"• <s>{html.escape(wrong)}</s> → <b>{html.escape(right)}</b> — {rule}\n"
+    
+    source = {"rules": "Правила", "llm": "ИИ", "cache": "ИИ (кэш)"}.get(result["source"], result["source"])
+    message += f"\n🔧 <b>Источник:</b> {source}"
+    return message
+
+# Корректор (загружается при первом обращении)
+_corrector = None
+
+def get_corrector():
+    """Глобальный корректор"""
+    global _corrector
+    if _corrector is None:
+        _corrector = TextCorrector.load()
+    return _corrector
+
+# Тестирование
+async def test_corrector():
+    """Тестирование локальных правил"""
+    print("🧪 Тестируем исправление текста...")
+    
+    corrector = get_corrector()
+    cases = [
+        "yesterday i goed to the park with two childs",
+        "She have a apple and he don't like it",
+        "They was happy because we has went home",
+        "This is an university and a hour later it was more better",
+        "he run fast and the the dog runned too",
+        "Did he go home? Let it run.",
+    ]
+    for text in cases:
+        result = await corrector.correct(text, use_llm=False)
+        print(f"\n• {text}\n  → {result['corrected']}")
+        for wrong, right, rule in result["changes"]:
+            print(f"    {wrong} → {right} ({rule})")
+    
+    # Правильный текст правила не меняют
+    correct_texts = [
+        "Has he run today?",
+        "He had had enough.",
+        "She is an MBA student and plan A is fine.",
+        "The cat and it go home. You and I are friends.",
+        "I said that that was an umbrella, not a unicorn.",
+        "A is the first letter, i.e. the start of the alphabet.",
+    ]
+    untouched = True
+    for text in correct_texts:
+        result = await corrector.correct(text, use_llm=False)
+        print(f"\n• {text}\n  → {result['corrected']}")
+        untouched = untouched and result["corrected"] == text and not result["changes"]
+    
+    # В LLM уходят только предложения, где правила ничего не нашли
+    class FakeBackend:
+        def __init__(self):
+            self.prompts = []
+        
+        async def complete(self, messages, **kwargs):
+            self.prompts.append(messages[-1]["content"])
+            return messages[-1]["content"].replace("like", "likes")
+    
+    backend = FakeBackend()
+    checker = TextCorrector.load(backend=backend)
+    rules_only = await checker.correct("i goed home yesterday. He run fast.")
+    mixed = await checker.correct("i goed home. She like cats. Tom like dogs.")
+    cached = await checker.correct("She like cats.")
+    print(f"\n• Только правила: {rules_only['corrected']} ({rules_only['source']})")
+    print(f"• Правила и LLM: {mixed['corrected']} ({mixed['source']}), запросы: {backend.prompts}")
+    print(f"• Повтор предложения: {cached['corrected']} ({cached['source']})")
+    
+    ok = (untouched and rules_only["source"] == "rules" and mixed["source"] == "llm"
+          and mixed["corrected"] == "I went home. She likes cats. Tom likes dogs."
+          and backend.prompts == ["1. She like cats.\n2. Tom like dogs."]
+          and cached["source"] == "cache" and cached["corrected"] == "She likes cats.")
+    print(f"\n{'✅' if ok else '❌'} Корректор готов!")
+
+if __name__ == "__main__":
+    asyncio.run(test_corrector())
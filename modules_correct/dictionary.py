@@ -1,4 +1,5 @@
 from database import db
+from modules_correct.activity import activity_counters
 from datetime import datetime, timedelta
 
 class DictionaryManager:
@@ -22,13 +23,9 @@ class DictionaryManager:
         if not category:
             category = "Без категории"
         
-        # Проверяем, существует ли категория
-        categories = self.db.get_categories(user_id)
-        category_exists = any(cat['category_name'] == category for cat in categories)
-        
-        if not category_exists and category != "Без категории":
-            # Создаём новую категорию
-            self.db.add_category(user_id, category)
+        # Создаём категорию, если её нет ("Без категории" создаётся в add_user)
+        if category != "Без категории":
+            self.db.ensure_category(user_id, category)
         
         # Добавляем слово
         success = self.db.add_word(
@@ -144,6 +141,9 @@ class DictionaryManager:
             WHERE id = ? AND user_id = ?
         ''', (word_id, user_id))
         self.db.conn.commit()
+        
+        if self.db.cursor.rowcount:
+            activity_counters.record(user_id, "reviews")
 
 def format_word_entry(word):
     """Форматирование записи слова"""
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import sqlite3
+import time
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage
+from config import DB_PATH, FSM_STATE_TTL, FSM_CLEANUP_INTERVAL
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище в SQLite с write-through кэшем в памяти
+    
+    Чтения идут из кэша, каждая запись сразу сохраняется в таблицу fsm_states,
+    поэтому состояние переживает перезапуск. Диалоги старше ttl считаются брошенными.
+    """
+    
+    def __init__(self, path=None, ttl=FSM_STATE_TTL):
+        self.path = path or DB_PATH
+        self.ttl = ttl
+        self.cache = {}  # ключ -> [state, data, updated_at]
+        self._conn = None
+    
+    @property
+    def conn(self):
+        """Соединение (открывается при первом обращении к состоянию)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS fsm_states (
+                    storage_key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT,
+                    updated_at REAL
+                )
+            ''')
+            self._conn.commit()
+        return self._conn
+    
+    async def set_state(self, key, state=None):
+        """Установка состояния"""
+        entry = self._load(key)
+        entry[0] = state.state if isinstance(state, State) else state
+        self._save(key, entry)
+    
+    async def get_state(self, key):
+        """Текущее состояние"""
+        return self._load(key)[0]
+    
+    async def set_data(self, key, data):
+        """Замена данных"""
+        entry = self._load(key)
+        entry[1] = dict(data)
+        self._save(key, entry)
+    
+    async def get_data(self, key):
+        """Текущие данные"""
+        return dict(self._load(key)[1])
+    
+    async def close(self):
+        """Закрытие соединения"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    def _load(self, key):
+        """Запись из кэша (при промахе — из базы)"""
+        storage_key = make_storage_key(key)
+        entry = self.cache.get(storage_key)
+        
+        if entry is None:
+            row = self.conn.execute(
+                'SELECT state, data, updated_at FROM fsm_states WHERE storage_key = ?', (storage_key,)
+            ).fetchone()
+            entry = [row[0], json.loads(row[1]) if row[1] else {}, row[2]] if row else [None, {}, time.time()]
+            self.cache[storage_key] = entry
+        
+        # Брошенный диалог — начинаем с чистого листа
+        if entry[0] is not None or entry[1]:
+            if time.time() - entry[2] > self.ttl:
+                entry[0], entry[1] = None, {}
+        
+        return entry
+    
+    def _save(self, key, entry):
+        """Write-through: кэш и база обновляются вместе"""
+        storage_key = make_storage_key(key)
+        entry[2] = time.time()
+        
+        if entry[0] is None and not entry[1]:
+            self.cache.pop(storage_key, None)
+            self.conn.execute('DELETE FROM fsm_states WHERE storage_key = ?', (storage_key,))
+        else:
+            self.cache[storage_key] = entry
+            self.conn.execute('''
+                INSERT INTO fsm_states (storage_key, state, data, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(storage_key) DO UPDATE SET
+                state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+            ''', (storage_key, entry[0], json.dumps(entry[1], ensure_ascii=False), entry[2]))
+        self.conn.commit()
+    
+    def cleanup(self):
+        """Удаление брошенных диалогов (старше ttl) из базы и кэша"""
+        expired_before = time.time() - self.ttl
+        cursor = self.conn.execute('DELETE FROM fsm_states WHERE updated_at < ?', (expired_before,))
+        self.conn.commit()
+        
+        for storage_key in [k for k, entry in self.cache.items() if entry[2] < expired_before]:
+            del self.cache[storage_key]
+        
+        return cursor.rowcount
+    
+    async def run_cleanup(self, interval=FSM_CLEANUP_INTERVAL):
+        """Периодическая очистка (запускается фоновой задачей)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = self.cleanup()
+                if removed:
+                    print(f"🧹 Удалено брошенных FSM-диалогов: {removed}")
+            except Exception as e:
+                print(f"Ошибка очистки FSM: {e}")
+
+def make_storage_key(key):
+    """Строковый ключ из StorageKey"""
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.business_connection_id or ''}:{key.destiny}"
+
+# Тестирование
+async def test_fsm_storage():
+    """Тестирование хранилища: запись, чтение после перезапуска, TTL"""
+    import os
+    import tempfile
+    from aiogram.fsm.storage.base import StorageKey
+    print("🧪 Тестируем FSM-хранилище...")
+    
+    path = os.path.join(tempfile.mkdtemp(), "fsm_test.db")
+    key = StorageKey(bot_id=1, chat_id=123456, user_id=123456)
+    
+    storage = SQLiteStorage(path)
+    await storage.set_state(key, "GeneratorState:waiting_for_words")
+    await storage.update_data(key, {"words": ["cat", "window"]})
+    await storage.close()
+    
+    # "Перезапуск": новый экземпляр с пустым кэшем
+    storage = SQLiteStorage(path)
+    state, data = await storage.get_state(key), await storage.get_data(key)
+    print(f"1. После перезапуска: {state}, {data}")
+    
+    storage.ttl = 0
+    await asyncio.sleep(0.01)
+    print(f"2. Брошенный диалог: {await storage.get_state(key)}, удалено строк: {storage.cleanup()}")
+    await storage.close()
+    
+    ok = state == "GeneratorState:waiting_for_words" and data == {"words": ["cat", "window"]}
+    print(f"{'✅' if ok else '❌'} FSM-хранилище готово!")
+
+if __name__ == "__main__":
+    asyncio.run(test_fsm_storage())
@@ -0,0 +1,210 @@
+import asyncio
+import json
+from config import GENERATION_BATCH_SIZE, GENERATION_BATCH_WAIT
+from modules_correct.generator import (
+    generate_sentences, build_prompt, build_messages, parse_sentence_line,
+    make_generation_key, get_cached_sentences, cache_sentences
+)
+from modules_correct.llm_backend import llm_backend
+from modules_correct.http_client import close_sessions
+
+class GenerationBatcher:
+    """Очередь генераций: собирает запросы за короткое окно и отправляет одним вызовом"""
+    
+    def __init__(self, max_batch_size=GENERATION_BATCH_SIZE, max_wait=GENERATION_BATCH_WAIT, backend=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.backend = backend or llm_backend
+        self.pending = []
+        self.batch_full = asyncio.Event()
+        self.flush_task = None
+        self.batch_tasks = set()  # пакеты в работе (ссылки, чтобы задачи не собрал GC)
+        self.next_id = 1
+    
+    async def generate(self, words, theme=None, style="natural"):
+        """То же, что generate_sentences, но через общую очередь"""
+        cached_sentences = get_cached_sentences(make_generation_key(words, theme, style))
+        if cached_sentences:
+            return make_result(words, theme, style, cached_sentences, cached=True)
+        
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append({
+            'id': f"r{self.next_id}",
+            'words': words,
+            'theme': theme,
+            'style': style,
+            'future': future
+        })
+        self.next_id += 1
+        
+        if len(self.pending) >= self.max_batch_size:
+            self.batch_full.set()
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush_after_wait())
+        
+        return await future
+    
+    async def _flush_after_wait(self):
+        """Ждём max_wait (или заполнения пакета) и отправляем накопленное"""
+        try:
+            await asyncio.wait_for(self.batch_full.wait(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        
+        # Каждый пакет — своя задача: следующий не ждёт ответа модели на предыдущий
+        while self.pending:
+            batch = self.pending[:self.max_batch_size]
+            self.pending = self.pending[self.max_batch_size:]
+            self.batch_full.clear()
+            task = asyncio.create_task(self._run_batch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+    
+    async def _run_batch(self, batch):
+        """Один вызов модели на весь пакет, с откатом на одиночные запросы"""
+        if len(batch) == 1:
+            await self._run_single(batch[0])
+            return
+        
+        results = {}
+        try:
+            messages = build_messages(build_batch_prompt(batch))
+            content = await self.backend.complete(messages, max_tokens=300 * len(batch))
+            results = parse_batch_response(content)
+        except Exception as e:
+            print(f"Ошибка пакетной генерации ({len(batch)} запросов): {e}")
+        
+        retry = []
+        for request in batch:
+            sentences = results.get(request['id'])
+            if not sentences:
+                retry.append(request)
+                continue
+            
+            cache_sentences(make_generation_key(request['words'], request['theme'], request['style']), sentences)
+            if not request['future'].done():
+                request['future'].set_result(
+                    make_result(request['words'], request['theme'], request['style'], sentences)
+                )
+        
+        # Что не удалось разобрать — отправляем по отдельности
+        if retry:
+            await asyncio.gather(*(self._run_single(request) for request in retry))
+    
+    async def _run_single(self, request):
+        """Обычный одиночный вызов generate_sentences"""
+        try:
+            result = await generate_sentences(request['words'], request['theme'], request['style'], backend=self.backend)
+        except Exception as e:
+            result = {"success": False, "error": str(e), "fallback": []}
+        if not request['future'].done():
+            request['future'].set_result(result)
+
+def build_batch_prompt(batch):
+    """Промпт с несколькими запросами, помеченными ID"""
+    prompt = (
+        "Answer several independent requests at once. "
+        "Return ONLY a JSON object that maps each request ID to a list of 3-4 English sentences.\n\n"
+    )
+    
+    for request in batch:
+        request_prompt = build_prompt(request['words'], request['theme'], request['style'])
+        # Инструкцию про формат ответа заменяет общий JSON-формат
+        request_prompt = request_prompt.split("\n\nProvide ONLY")[0]
+        prompt += f"### {request['id']}\n{request_prompt}\n\n"
+    
+    prompt += 'Example: {"r1": ["First sentence.", "Second sentence."], "r2": ["..."]}'
+    return prompt
+
+def parse_batch_response(content):
+    """Разбор JSON-ответа пакета: {id: [предложения]}"""
+    text = content.strip()
+    
+    # Модель может обернуть JSON в ```json ... ```
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("В ответе нет JSON-объекта")
+    
+    data = json.loads(text[start:end + 1])
+    
+    results = {}
+    for request_id, sentences in data.items():
+        if not isinstance(sentences, list):
+            continue
+        parsed = [parse_sentence_line(str(s)) for s in sentences]
+        parsed = [s for s in parsed if s]
+        if parsed:
+            results[request_id] = parsed[:4]
+    
+    return results
+
+def make_result(words, theme, style, sentences, cached=False):
+    """Результат в формате generate_sentences"""
+    result = {
+        "success": True,
+        "sentences": sentences,
+        "words_used": words if isinstance(words, list) else [words],
+        "theme": theme,
+        "style": style
+    }
+    if cached:
+        result["cached"] = True
+    return result
+
+# Глобальная очередь для использования
+generation_batcher = GenerationBatcher()
+
+# Тестирование
+async def test_generation_queue():
+    """Тестирование пакетной генерации на локальном mock-сервере"""
+    import time
+    from aiohttp import web
+    from modules_correct.llm_backend import LLMBackend
+    print("🧪 Тестируем очередь генераций...")
+    
+    calls = []
+    
+    async def chat_completions(request):
+        payload = await request.json()
+        prompt = payload['messages'][1]['content']
+        calls.append(prompt)
+        await asyncio.sleep(0.2)  # время ответа модели
+        ids = [line[4:] for line in prompt.split("\n") if line.startswith("### ")]
+        if ids:
+            content = json.dumps({request_id: [f"This is a sentence for request {request_id}."] for request_id in ids})
+        else:
+            content = "This is a sentence for a single request."
+        return web.json_response({"choices": [{"message": {"content": content}}]})
+    
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", chat_completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 8090).start()
+    
+    try:
+        backend = LLMBackend(models=[{"model": "mock/batch", "url": "http://127.0.0.1:8090/api/v1/chat/completions", "timeout": 10}])
+        batcher = GenerationBatcher(max_batch_size=4, max_wait=0.1, backend=backend)
+        word_sets = [["cat"], ["dog"], ["sun", "sky"], ["book"], ["tree"]]
+        start = time.perf_counter()
+        results = await asyncio.gather(*(batcher.generate(words) for words in word_sets))
+        elapsed = time.perf_counter() - start
+        
+        # Пакеты (4 + 1 запрос) идут параллельно: общее время ≈ один ответ модели
+        print(f"1. Запросов: {len(word_sets)}, вызовов API: {len(calls)}, за {elapsed * 1000:.0f} мс")
+        for words, result in zip(word_sets, results):
+            print(f"   {', '.join(words)}: {result['sentences']}")
+        
+        ok = all(r['success'] and r['sentences'] for r in results) and len(calls) == 2 and elapsed < 0.35
+        print(f"{'✅' if ok else '❌'} Пакетная генерация")
+    finally:
+        await close_sessions()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(test_generation_queue())
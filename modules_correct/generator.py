@@ -1,11 +1,137 @@
-import aiohttp
+import asyncio
 import json
-from config import OPENROUTER_API_KEY
+import re
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from config import GENERATION_CACHE_DURATION, GENERATION_CACHE_SIZE, GENERATION_CACHE_VARIANTS
+from modules_correct.llm_backend import llm_backend
+from modules_correct.http_client import close_sessions
+from modules_correct.sentence_templates import get_template_bank
+from modules_correct.metrics import GENERATION_SECONDS, CACHE_REQUESTS
 
-async def generate_sentences(words, theme=None, style="natural"):
-    """Генерация предложений через OpenRouter API"""
+SYSTEM_PROMPT = "You are an English language expert. Generate natural, grammatically correct English sentences."
+
+# Номер в начале строки ответа: "1.", "2)", "12. "
+NUMBER_PREFIX_RE = re.compile(r"^\d+[.)]\s*")
+
+# Кэш генераций: ключ -> {'variants': [[...], ...], 'created': datetime, 'next': int}
+generation_cache = OrderedDict()
+
+async def generate_sentences(words, theme=None, style="natural", fresh=False, backend=None):
+    """Генерация предложений через LLM-бэкенд (OpenRouter)
+    
+    fresh=True — запросить у модели новый вариант (он добавится в кэш)
+    """
+    
+    # Проверяем кэш
+    cache_key = make_generation_key(words, theme, style)
+    if not fresh:
+        cached_sentences = get_cached_sentences(cache_key)
+        if cached_sentences:
+            return {
+                "success": True,
+                "sentences": cached_sentences,
+                "words_used": words if isinstance(words, list) else [words],
+                "theme": theme,
+                "style": style,
+                "cached": True
+            }
+    
+    prompt = build_prompt(words, theme, style)
+    
+    start = time.perf_counter()
+    try:
+        content = await (backend or llm_backend).complete(build_messages(prompt))
+        GENERATION_SECONDS.observe(time.perf_counter() - start, mode="complete")
+    except Exception as e:
+        GENERATION_SECONDS.observe(time.perf_counter() - start, mode="error")
+        print(f"Error in generator: {e}")
+        
+        # Модель недоступна (при fresh=True): лучше уже сгенерированный вариант, чем шаблоны
+        cached_sentences = get_cached_sentences(cache_key)
+        if cached_sentences:
+            return {
+                "success": True,
+                "sentences": cached_sentences,
+                "words_used": words if isinstance(words, list) else [words],
+                "theme": theme,
+                "style": style,
+                "cached": True
+            }
+        return {
+            "success": False,
+            "error": str(e),
+            "fallback": generate_fallback_sentences(words, theme, style)
+        }
+    
+    # Парсим предложения
+    sentences = parse_sentences(content)
+    if sentences:
+        cache_sentences(cache_key, sentences[:4])
+    
+    return {
+        "success": True,
+        "sentences": sentences[:4],  # Ограничиваем 4 предложениями
+        "words_used": words if isinstance(words, list) else [words],
+        "theme": theme,
+        "style": style
+    }
+
+async def stream_sentences(words, theme=None, style="natural", backend=None):
+    """Потоковая генерация: отдаёт предложения по мере их готовности (SSE)"""
+    
+    cache_key = make_generation_key(words, theme, style)
+    cached_sentences = get_cached_sentences(cache_key)
+    if cached_sentences:
+        for sentence in cached_sentences:
+            yield sentence
+        return
     
-    # Подготовка промпта
+    sentences = []
+    start = time.perf_counter()
+    try:
+        messages = build_messages(build_prompt(words, theme, style))
+        buffer = ""
+        
+        # aclosing: при досрочном выходе поток закрывается сразу (и HTTP-ответ вместе с ним)
+        async with aclosing((backend or llm_backend).stream(messages)) as stream:
+            async for content in stream:
+                buffer += content
+                # Отдаём каждую завершённую строку
+                while '\n' in buffer and len(sentences) < 4:
+                    line, buffer = buffer.split('\n', 1)
+                    sentence = parse_sentence_line(line)
+                    if sentence:
+                        sentences.append(sentence)
+                        yield sentence
+                
+                if len(sentences) >= 4:
+                    break
+        
+        # Последняя строка без перевода строки
+        sentence = parse_sentence_line(buffer) if len(sentences) < 4 else None
+        if sentence:
+            sentences.append(sentence)
+            yield sentence
+    
+    except Exception as e:
+        print(f"Error in stream generator: {e}")
+    
+    GENERATION_SECONDS.observe(time.perf_counter() - start, mode="stream" if sentences else "fallback")
+    
+    if sentences:
+        cache_sentences(cache_key, sentences)
+    else:
+        # Модель недоступна: уже сгенерированный вариант, иначе шаблоны
+        fallback = get_cached_sentences(cache_key) or generate_fallback_sentences(words, theme, style)
+        for sentence in fallback:
+            yield sentence
+
+# ===== ПРОМПТ =====
+def build_prompt(words, theme=None, style="natural"):
+    """Промпт для генерации предложений"""
     words_text = ", ".join(words) if isinstance(words, list) else words
     
     prompt = f"""Generate 3-4 natural English sentences using these words: {words_text}"""
@@ -22,76 +148,65 @@ async def generate_sentences(words, theme=None, style="natural"):
     
     prompt += "\n\nProvide ONLY the sentences in English, each on a new line, without numbers or explanations."
     
-    try:
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://english-bot.com",  # Замените на ваш домен
-                "X-Title": "English Word Bot"
-            }
-            
-            payload = {
-                "model": "openai/gpt-3.5-turbo",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are an English language expert. Generate natural, grammatically correct English sentences."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.7,
-                "max_tokens": 300
-            }
-            
-            async with session.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            ) as response:
-                
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    if 'choices' in data and len(data['choices']) > 0:
-                        content = data['choices'][0]['message']['content']
-                        
-                        # Парсим предложения
-                        sentences = parse_sentences(content)
-                        
-                        return {
-                            "success": True,
-                            "sentences": sentences[:4],  # Ограничиваем 4 предложениями
-                            "words_used": words if isinstance(words, list) else [words],
-                            "theme": theme,
-                            "style": style
-                        }
-                    else:
-                        return {
-                            "success": False,
-                            "error": "No response from AI",
-                            "fallback": generate_fallback_sentences(words, theme)
-                        }
-                else:
-                    error_text = await response.text()
-                    print(f"OpenRouter error: {response.status} - {error_text}")
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status}",
-                        "fallback": generate_fallback_sentences(words, theme)
-                    }
-                    
-    except Exception as e:
-        print(f"Error in generator: {e}")
-        return {
-            "success": False,
-            "error": str(e),
-            "fallback": generate_fallback_sentences(words, theme)
+    return prompt
+
+def build_messages(prompt):
+    """Сообщения для /chat/completions"""
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
         }
+    ]
+
+# ===== КЭШ ГЕНЕРАЦИЙ =====
+def make_generation_key(words, theme=None, style="natural"):
+    """Ключ кэша: отсортированный набор слов, тема и стиль"""
+    word_list = words.split(',') if isinstance(words, str) else words
+    normalized = tuple(sorted({w.strip().lower() for w in word_list if w and w.strip()}))
+    return (normalized, (theme or '').strip().lower(), style or "natural")
+
+def get_cached_sentences(key):
+    """Следующий вариант из кэша (варианты выдаются по кругу)
+    
+    Повторный запрос всегда обслуживается из кэша, без обращения к модели. Новые варианты
+    (до GENERATION_CACHE_VARIANTS) добавляются только запросами с fresh=True.
+    """
+    entry = generation_cache.get(key)
+    if not entry:
+        CACHE_REQUESTS.inc(cache="generation", result="miss")
+        return None
+    
+    if datetime.now() - entry['created'] > timedelta(seconds=GENERATION_CACHE_DURATION):
+        del generation_cache[key]
+        CACHE_REQUESTS.inc(cache="generation", result="miss")
+        return None
+    
+    CACHE_REQUESTS.inc(cache="generation", result="hit")
+    generation_cache.move_to_end(key)
+    variants = entry['variants']
+    sentences = variants[entry['next'] % len(variants)]
+    entry['next'] += 1
+    return list(sentences)
+
+def cache_sentences(key, sentences):
+    """Сохранение варианта в кэш с вытеснением старых записей"""
+    entry = generation_cache.get(key)
+    if not entry or datetime.now() - entry['created'] > timedelta(seconds=GENERATION_CACHE_DURATION):
+        entry = {'variants': [], 'created': datetime.now(), 'next': 0}
+        generation_cache[key] = entry
+    
+    entry['variants'].append(list(sentences))
+    if len(entry['variants']) > GENERATION_CACHE_VARIANTS:
+        entry['variants'].pop(0)
+    
+    generation_cache.move_to_end(key)
+    while len(generation_cache) > GENERATION_CACHE_SIZE:
+        generation_cache.popitem(last=False)
 
 def parse_sentences(text):
     """Парсинг предложений из текста"""
@@ -101,15 +216,9 @@ def parse_sentences(text):
     lines = text.split('\n')
     
     for line in lines:
-        line = line.strip()
-        
-        # Удаляем номера (1., 2., etc)
-        if line and line[0].isdigit() and (line[1] == '.' or line[1] == ')' or line[2] == '.'):
-            line = line[line.find('.')+1:].strip() if '.' in line else line[2:].strip()
-        
-        # Проверяем, что это предложение (начинается с заглавной, заканчивается точкой)
-        if line and len(line) > 10 and line[0].isupper() and (line.endswith('.') or line.endswith('!') or line.endswith('?')):
-            sentences.append(line)
+        sentence = parse_sentence_line(line)
+        if sentence:
+            sentences.append(sentence)
     
     # Если не нашли нормальные предложения, возвращаем строки как есть
     if not sentences:
@@ -117,56 +226,27 @@ def parse_sentences(text):
     
     return sentences[:4]  # Ограничиваем 4 предложениями
 
-def generate_fallback_sentences(words, theme=None):
-    """Резервные шаблонные предложения"""
-    
-    if isinstance(words, str):
-        word_list = [words]
-    else:
-        word_list = words
+def parse_sentence_line(line):
+    """Предложение из одной строки ответа (None, если это не предложение)"""
+    line = line.strip()
     
-    sentences = []
-    
-    # Простые шаблоны
-    templates = [
-        f"I often use the word '{word_list[0]}' in my daily conversations.",
-        f"The word '{word_list[0]}' has an interesting meaning in English.",
-        f"You can find '{word_list[0]}' in many English books and articles.",
-        f"Learning the word '{word_list[0]}' will help you improve your vocabulary."
-    ]
+    # Удаляем номера (1., 2., etc); строка из одного номера ("1", "12.") даёт пустую строку
+    line = NUMBER_PREFIX_RE.sub('', line)
     
-    if len(word_list) > 1:
-        templates.extend([
-            f"I like to use both '{word_list[0]}' and '{word_list[1]}' in my writing.",
-            f"The words '{word_list[0]}' and '{word_list[1]}' often appear together.",
-            f"You can create interesting sentences with '{word_list[0]}' and '{word_list[1]}'."
-        ])
+    # Проверяем, что это предложение (начинается с заглавной, заканчивается точкой)
+    if line and len(line) > 10 and line[0].isupper() and (line.endswith('.') or line.endswith('!') or line.endswith('?')):
+        return line
+    return None
+
+def generate_fallback_sentences(words, theme=None, style="natural"):
+    """Резервные шаблонные предложения (банк шаблонов, без обращения к API)"""
     
-    if theme:
-        if "business" in theme.lower():
-            sentences = [
-                f"In business communications, the word '{word_list[0]}' is frequently used.",
-                f"Professional emails often include the term '{word_list[0]}'.",
-                f"The vocabulary word '{word_list[0]}' is essential for corporate environments."
-            ]
-        elif "travel" in theme.lower():
-            sentences = [
-                f"When traveling, you might need the word '{word_list[0]}' at the airport.",
-                f"'{word_list[0]}' is a useful word for tourists and travelers.",
-                f"Guidebooks often mention the word '{word_list[0]}' for travelers."
-            ]
-        elif "academic" in theme.lower():
-            sentences = [
-                f"Academic papers frequently use the term '{word_list[0]}'.",
-                f"Students should learn the word '{word_list[0]}' for their studies.",
-                f"The vocabulary word '{word_list[0]}' appears in many textbooks."
-            ]
-        else:
-            sentences = templates[:3]
+    if isinstance(words, str):
+        word_list = [w.strip() for w in words.split(',') if w.strip()]
     else:
-        sentences = templates[:3]
+        word_list = words
     
-    return sentences
+    return get_template_bank().generate(word_list, theme, style)
 
 async def test_generator():
     """Тестирование генератора"""
@@ -192,7 +272,98 @@ async def test_generator():
             print(f"  {i}. {sentence}")
     
     print("\n🎯 Генератор готов к работе!")
+    await close_sessions()
+
+async def start_mock_sse_server(sentences, token_delay=0.05, port=8089):
+    """Локальный mock OpenRouter: отдаёт ответ SSE-потоком по словам (для тестов без сети)"""
+    from aiohttp import web
+    
+    async def chat_completions(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        
+        for sentence in sentences:
+            for token in (sentence + "\n").split(" "):
+                chunk = {"choices": [{"delta": {"content": token + " "}}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                await asyncio.sleep(token_delay)
+        
+        await response.write(b"data: [DONE]\n\n")
+        return response
+    
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", chat_completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, f"http://127.0.0.1:{port}/api/v1/chat/completions"
+
+async def test_stream_generator():
+    """Тестирование потоковой генерации на локальном mock-сервере"""
+    import time
+    from modules_correct.llm_backend import LLMBackend
+    print("\n🧪 Тестируем потоковую генерацию...")
+    
+    mock_sentences = [
+        "The cat sat by the sunny window all morning.",
+        "A sunny window is the best spot for a sleepy cat.",
+        "My cat watches birds through the window on sunny days."
+    ]
+    runner, url = await start_mock_sse_server(mock_sentences)
+    backend = LLMBackend(models=[{"model": "mock/sse", "url": url, "timeout": 10}])
+    
+    try:
+        start = time.perf_counter()
+        first_at = None
+        received = []
+        async for sentence in stream_sentences(["cat", "sunny", "window"], "mock", backend=backend):
+            if first_at is None:
+                first_at = time.perf_counter() - start
+            received.append(sentence)
+            print(f"  {len(received)}. {sentence}")
+        total = time.perf_counter() - start
+        
+        print(f"⏱ Первое предложение: {first_at * 1000:.0f} мс, всего: {total * 1000:.0f} мс")
+        print(f"{'✅' if received == mock_sentences else '❌'} Получено предложений: {len(received)}")
+        
+        # Модель может прислать номер отдельной строкой
+        parsed = [parse_sentence_line(line) for line in ("1", "12.", "2)", "3) The cat sat by the window.")]
+        print(f"{'✅' if parsed == [None, None, None, 'The cat sat by the window.'] else '❌'} Строки-номера: {parsed}")
+    finally:
+        await close_sessions()
+        await runner.cleanup()
+
+async def test_generation_cache():
+    """Тестирование кэша: повтор без модели, новые варианты по fresh=True, ротация"""
+    print("\n🧪 Тестируем варианты в кэше генераций...")
+    words, theme = ["cache", "test"], "variants"
+    generation_cache.pop(make_generation_key(words, theme), None)
+    
+    class CountingBackend:
+        def __init__(self):
+            self.calls = 0
+        
+        async def complete(self, messages, **kwargs):
+            self.calls += 1
+            return f"Variant number {self.calls} of the sentences."
+    
+    backend = CountingBackend()
+    first = await generate_sentences(words, theme, backend=backend)
+    repeats = [await generate_sentences(words, theme, backend=backend) for _ in range(3)]
+    print(f"1. Первый запрос и 3 повтора: обращений к модели {backend.calls}")
+    
+    for _ in range(GENERATION_CACHE_VARIANTS - 1):
+        await generate_sentences(words, theme, fresh=True, backend=backend)
+    served = [(await generate_sentences(words, theme, backend=backend))["sentences"][0]
+              for _ in range(GENERATION_CACHE_VARIANTS * 2)]
+    print(f"2. После fresh=True: обращений {backend.calls}, выдано: {served[:GENERATION_CACHE_VARIANTS + 1]}")
+    
+    ok = (not first.get("cached") and all(r.get("cached") for r in repeats)
+          and backend.calls == GENERATION_CACHE_VARIANTS and len(set(served)) == GENERATION_CACHE_VARIANTS)
+    print(f"{'✅' if ok else '❌'} Повторы из кэша, варианты выдаются по кругу")
 
 if __name__ == "__main__":
-    import asyncio
+    asyncio.run(test_generation_cache())
     asyncio.run(test_generator())
+    asyncio.run(test_stream_generator())
@@ -0,0 +1,23 @@
+import asyncio
+
+# Общая сессия на цикл событий: loop -> aiohttp.ClientSession
+_sessions = {}
+
+def get_session():
+    """HTTP-сессия переводчиков и LLM: создаётся при первом запросе, соединения переиспользуются"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        import aiohttp  # тяжёлый импорт — только когда нужен первый запрос
+        
+        session = _sessions[loop] = aiohttp.ClientSession()
+        # Сессии завершившихся циклов (тесты через asyncio.run) больше не нужны
+        for other in [other for other in _sessions if other.is_closed()]:
+            del _sessions[other]
+    return session
+
+async def close_sessions():
+    """Закрытие сессии текущего цикла (при остановке бота)"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
@@ -0,0 +1,86 @@
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+
+# ===== КНОПКИ МЕНЮ =====
+BTN_SEARCH = "🔍 Поиск слова"
+BTN_GENERATOR = "✍️ Генератор"
+BTN_DICTIONARY = "📖 Мой словарь"
+BTN_CHEATSHEETS = "📝 Шпаргалки"
+BTN_SYNONYMS = "🔄 Синонимы"
+BTN_HELP = "✨ Помощь"
+BTN_STATS = "📊 Статистика"
+BTN_SETTINGS = "⚙️ Настройки"
+BTN_PREMIUM = "💎 Премиум"
+BTN_BACK = "↩️ В главное меню"
+
+MENU_TEXTS = frozenset([
+    BTN_SEARCH, BTN_GENERATOR, BTN_DICTIONARY, BTN_CHEATSHEETS, BTN_SYNONYMS,
+    BTN_HELP, BTN_STATS, BTN_SETTINGS, BTN_PREMIUM, BTN_BACK
+])
+
+# Префиксы callback_data у кнопок под переводом
+CALLBACK_SAVE = "save"
+CALLBACK_EXAMPLES = "examples"
+CALLBACK_FORMS = "forms"
+CALLBACK_SYNONYMS = "synonyms"
+
+# callback_data не длиннее 64 байт (иначе Telegram отклоняет весь ответ):
+# слова, которые не влезают с самым длинным префиксом, передаются коротким id
+CALLBACK_DATA_LIMIT = 64
+CALLBACK_WORD_LIMIT = CALLBACK_DATA_LIMIT - max(map(len, (CALLBACK_SAVE, CALLBACK_EXAMPLES, CALLBACK_FORMS, CALLBACK_SYNONYMS))) - 1
+LONG_WORD_MARK = "#"
+LONG_WORDS_SIZE = 4096
+
+# Короткий id -> длинное слово (в памяти процесса; после перезапуска кнопка устаревает)
+long_words = OrderedDict()
+
+# ===== ГОТОВЫЕ КЛАВИАТУРЫ =====
+# Создаются один раз при запуске и переиспользуются во всех ответах — не изменять!
+MAIN_MENU_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text=BTN_SEARCH)],
+        [KeyboardButton(text=BTN_GENERATOR), KeyboardButton(text=BTN_DICTIONARY)],
+        [KeyboardButton(text=BTN_CHEATSHEETS), KeyboardButton(text=BTN_SYNONYMS)],
+        [KeyboardButton(text=BTN_HELP), KeyboardButton(text=BTN_STATS)],
+        [KeyboardButton(text=BTN_SETTINGS), KeyboardButton(text=BTN_PREMIUM)]
+    ],
+    resize_keyboard=True
+)
+
+BACK_TO_MENU_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[[KeyboardButton(text=BTN_BACK)]],
+    resize_keyboard=True
+)
+
+def translation_actions_keyboard(word):
+    """Действия после перевода (одна клавиатура на слово)"""
+    if len(word.encode('utf-8')) <= CALLBACK_WORD_LIMIT and not word.startswith(LONG_WORD_MARK):
+        return actions_keyboard(word)
+    
+    key = LONG_WORD_MARK + hashlib.sha1(word.encode('utf-8')).hexdigest()[:16]
+    long_words[key] = word
+    long_words.move_to_end(key)
+    if len(long_words) > LONG_WORDS_SIZE:
+        long_words.popitem(last=False)
+    return actions_keyboard(key)
+
+@lru_cache(maxsize=4096)
+def actions_keyboard(word):
+    """Клавиатура действий для слова или короткого id, уже влезающего в callback_data"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="💾 Сохранить в словарь", callback_data=f"{CALLBACK_SAVE}_{word}")],
+            [InlineKeyboardButton(text="✨ Примеры от ИИ", callback_data=f"{CALLBACK_EXAMPLES}_{word}")],
+            [InlineKeyboardButton(text="📝 Формы слова", callback_data=f"{CALLBACK_FORMS}_{word}")],
+            [InlineKeyboardButton(text="🔄 Синонимы", callback_data=f"{CALLBACK_SYNONYMS}_{word}")]
+        ]
+    )
+
+def parse_callback_data(data):
+    """Разбор callback_data "prefix_word" -> (prefix, word). Устаревший id длинного слова — пустое слово"""
+    prefix, _, word = data.partition('_')
+    if word.startswith(LONG_WORD_MARK):
+        word = long_words.get(word, "")
+    return prefix, word
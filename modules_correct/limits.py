@@ -1,6 +1,7 @@
 from datetime import datetime, date
-from database import db
+from database import db, LIMIT_KEYS
 from config import FREE_LIMITS, PREMIUM_LIMITS
+from modules_correct.metrics import LIMIT_REJECTIONS
 
 async def check_and_update_limit(user_id, action_type):
     """
@@ -21,13 +22,14 @@ async def check_and_update_limit(user_id, action_type):
     can_proceed, used = db.check_limit(user_id, action_type)
     
     # Получаем максимальный лимит
-    max_limit_key = f"daily_{action_type}s"
-    max_limit = limits.get(max_limit_key, 10)
+    max_limit = limits.get(LIMIT_KEYS[action_type], 10)
     
     if can_proceed:
         # Увеличиваем счётчик
         db.increment_limit(user_id, action_type)
         used += 1  # Обновляем used после увеличения
+    else:
+        LIMIT_REJECTIONS.inc(action=action_type)
     
     return can_proceed, used
 
@@ -55,8 +57,7 @@ def get_todays_limits(user_id):
     # Формируем результат
     result = {}
     for action in ['search', 'generate', 'fix']:
-        max_key = f"daily_{action}s"
-        max_limit = limits.get(max_key, 10)
+        max_limit = limits.get(LIMIT_KEYS[action], 10)
         used = used_limits[action]
         
         result[action] = {
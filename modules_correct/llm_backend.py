@@ -0,0 +1,400 @@
+import asyncio
+import json
+import random
+import time
+from contextlib import aclosing, asynccontextmanager
+import aiohttp
+from config import (
+    OPENROUTER_API_KEY, LLM_MODELS, LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT, LLM_RATE_BURST,
+    LLM_MAX_RETRIES, LLM_LATENCY_BUDGET, LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN
+)
+from modules_correct.http_client import get_session, close_sessions
+from modules_correct.rate_limit import TokenBucket
+from modules_correct.tracing import add_span
+from modules_correct.metrics import LLM_SECONDS, LLM_REQUESTS, LLM_TOKENS
+
+class LLMError(Exception):
+    """Ошибка запроса к модели"""
+    
+    def __init__(self, message, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+class LLMBackend:
+    """Слой генерации: несколько моделей, общий семафор, rate limit, ретраи и статистика
+    
+    Предохранитель на модель: после breaker_failures ошибок или таймаутов подряд модель
+    на breaker_cooldown секунд уходит в конец очереди (запросы не платят за сломанную
+    основную модель). После паузы её снова пробуют первой; одна ошибка — снова пауза.
+    """
+    
+    def __init__(self, models=LLM_MODELS, max_concurrency=LLM_MAX_CONCURRENCY, rate=LLM_RATE_LIMIT,
+                 burst=LLM_RATE_BURST, max_retries=LLM_MAX_RETRIES, latency_budget=LLM_LATENCY_BUDGET,
+                 breaker_failures=LLM_BREAKER_FAILURES, breaker_cooldown=LLM_BREAKER_COOLDOWN):
+        self.models = models
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.latency_budget = latency_budget
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.stats = {
+            model['model']: {
+                'requests': 0,
+                'errors': 0,
+                'retries': 0,
+                'latency_total': 0.0,
+                'latency_avg': None,  # скользящее среднее, сек
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'failures': 0,  # ошибок подряд
+                'open_until': 0.0  # до какого момента (monotonic) модель в конце очереди
+            }
+            for model in models
+        }
+    
+    async def complete(self, messages, max_tokens=300, temperature=0.7, latency_budget=None):
+        """Ответ модели целиком (текст)"""
+        deadline = time.monotonic() + (latency_budget or self.latency_budget)
+        last_error = None
+        
+        for model in self.pick_models(latency_budget):
+            try:
+                return await self._with_retries(model, deadline, self._complete_once, messages, max_tokens, temperature)
+            except LLMError as e:
+                last_error = e
+                print(f"LLM {model['model']}: {e}")
+            if time.monotonic() >= deadline:
+                break
+        
+        raise last_error or LLMError("No models available")
+    
+    async def stream(self, messages, max_tokens=300, temperature=0.7, latency_budget=None):
+        """Ответ модели по частям (SSE). Переключение на другую модель — только до первого фрагмента"""
+        deadline = time.monotonic() + (latency_budget or self.latency_budget)
+        last_error = None
+        
+        for model in self.pick_models(latency_budget):
+            started = False
+            try:
+                async with aclosing(self._stream_with_retries(model, deadline, messages, max_tokens, temperature)) as chunks:
+                    async for chunk in chunks:
+                        started = True
+                        yield chunk
+                return
+            except LLMError as e:
+                if started:
+                    raise
+                last_error = e
+                print(f"LLM {model['model']}: {e}")
+            if time.monotonic() >= deadline:
+                break
+        
+        raise last_error or LLMError("No models available")
+    
+    def pick_models(self, latency_budget=None):
+        """Порядок моделей: из конфига; медленные для бюджета запроса — в конец, отключённые — в самый конец"""
+        budget = latency_budget or self.latency_budget
+        fast, slow, broken = [], [], []
+        for model in self.models:
+            stats = self.stats[model['model']]
+            if self.is_open(model):
+                broken.append(model)
+            elif stats['latency_avg'] is not None and stats['latency_avg'] > budget:
+                slow.append(model)
+            else:
+                fast.append(model)
+        return fast + slow + broken
+    
+    def is_open(self, model):
+        """Предохранитель сработал: модель временно в конце очереди"""
+        return self.stats[model['model']]['open_until'] > time.monotonic()
+    
+    async def _with_retries(self, model, deadline, request, *args):
+        """Повторы с экспоненциальной задержкой и джиттером на 429/5xx/таймаутах"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await request(model, deadline, *args)
+            except LLMError as e:
+                if not e.retryable or attempt == self.max_retries or self.is_open(model):
+                    raise
+                delay = self.backoff_delay(attempt, e.retry_after)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                self.stats[model['model']]['retries'] += 1
+                await asyncio.sleep(delay)
+    
+    async def _stream_with_retries(self, model, deadline, messages, max_tokens, temperature):
+        """Потоковый запрос с повторами до получения первого фрагмента"""
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                async with aclosing(self._stream_once(model, deadline, messages, max_tokens, temperature)) as chunks:
+                    async for chunk in chunks:
+                        started = True
+                        yield chunk
+                return
+            except LLMError as e:
+                if started or not e.retryable or attempt == self.max_retries or self.is_open(model):
+                    raise
+                delay = self.backoff_delay(attempt, e.retry_after)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                self.stats[model['model']]['retries'] += 1
+                await asyncio.sleep(delay)
+    
+    def backoff_delay(self, attempt, retry_after=None):
+        """Задержка перед повтором: Retry-After или 0.5 * 2^n со случайным джиттером"""
+        if retry_after:
+            return retry_after
+        return random.uniform(0, 0.5 * 2 ** attempt)
+    
+    async def _complete_once(self, model, deadline, messages, max_tokens, temperature):
+        """Один запрос к модели без потока"""
+        payload = build_payload(model, messages, max_tokens, temperature)
+        
+        async with self._slot():
+            start = time.monotonic()
+            try:
+                session = get_session()
+                async with session.post(model['url'], headers=build_headers(model), json=payload,
+                                        timeout=attempt_timeout(model, deadline)) as response:
+                    await check_response(response)
+                    data = await response.json()
+            except LLMError:
+                self.record(model, start, error=True)
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.record(model, start, error=True)
+                raise LLMError(f"Network error: {e!r}", retryable=True)
+        
+        if 'choices' not in data or not data['choices']:
+            self.record(model, start, error=True)
+            raise LLMError("No response from AI")
+        
+        self.record(model, start, usage=data.get('usage'))
+        return data['choices'][0]['message']['content']
+    
+    async def _stream_once(self, model, deadline, messages, max_tokens, temperature):
+        """Один потоковый запрос к модели"""
+        payload = build_payload(model, messages, max_tokens, temperature, stream=True)
+        usage = None
+        
+        async with self._slot():
+            start = time.monotonic()
+            try:
+                session = get_session()
+                async with session.post(model['url'], headers=build_headers(model), json=payload,
+                                        timeout=attempt_timeout(model, deadline)) as response:
+                    await check_response(response)
+                    
+                    async for raw_line in response.content:
+                        chunk = parse_sse_line(raw_line)
+                        if chunk is None:
+                            continue
+                        usage = chunk.get('usage') or usage
+                        content = get_delta_content(chunk)
+                        if content:
+                            yield content
+            except LLMError:
+                self.record(model, start, error=True)
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.record(model, start, error=True)
+                raise LLMError(f"Network error: {e!r}", retryable=True)
+        
+        self.record(model, start, usage=usage)
+    
+    @asynccontextmanager
+    async def _slot(self):
+        """Семафор + rate limit на каждый запрос"""
+        async with self.semaphore:
+            await self.bucket.acquire()
+            yield
+    
+    def record(self, model, start, usage=None, error=False):
+        """Учёт задержки и токенов по модели"""
+        stats = self.stats[model['model']]
+        latency = time.monotonic() - start
+        
+        stats['requests'] += 1
+        add_span(f"llm.{model['model']}", latency)
+        LLM_REQUESTS.inc(model=model['model'], result="error" if error else "ok")
+        if error:
+            stats['errors'] += 1
+            stats['failures'] += 1
+            if stats['failures'] >= self.breaker_failures:
+                stats['open_until'] = time.monotonic() + self.breaker_cooldown
+            return
+        
+        stats['failures'] = 0
+        LLM_SECONDS.observe(latency, model=model['model'])
+        stats['latency_total'] += latency
+        stats['latency_avg'] = latency if stats['latency_avg'] is None else 0.8 * stats['latency_avg'] + 0.2 * latency
+        if usage:
+            stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+            stats['completion_tokens'] += usage.get('completion_tokens', 0)
+            LLM_TOKENS.inc(usage.get('prompt_tokens', 0), model=model['model'], type="prompt")
+            LLM_TOKENS.inc(usage.get('completion_tokens', 0), model=model['model'], type="completion")
+    
+    def get_stats(self):
+        """Статистика по моделям"""
+        return {name: dict(stats) for name, stats in self.stats.items()}
+    
+    def format_stats(self):
+        """Статистика по моделям текстом (для логов и админа)"""
+        lines = []
+        for name, stats in self.stats.items():
+            latency = f"{stats['latency_avg'] * 1000:.0f} мс" if stats['latency_avg'] is not None else "—"
+            paused = stats['open_until'] - time.monotonic()
+            lines.append(
+                f"{name}: запросов {stats['requests']}, ошибок {stats['errors']}, повторов {stats['retries']}, "
+                f"задержка {latency}, токенов {stats['prompt_tokens']}+{stats['completion_tokens']}"
+                + (f", отключена ещё {paused:.0f} с" if paused > 0 else "")
+            )
+        return "\n".join(lines)
+
+# ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
+def build_headers(model):
+    """Заголовки запроса к провайдеру"""
+    return {
+        "Authorization": f"Bearer {model.get('api_key') or OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://english-bot.com",  # Замените на ваш домен
+        "X-Title": "English Word Bot"
+    }
+
+def build_payload(model, messages, max_tokens=300, temperature=0.7, stream=False):
+    """Тело запроса к /chat/completions"""
+    payload = {
+        "model": model['model'],
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    
+    if stream:
+        payload["stream"] = True
+    
+    return payload
+
+def attempt_timeout(model, deadline):
+    """Таймаут попытки: не больше таймаута модели и остатка бюджета"""
+    remaining = max(deadline - time.monotonic(), 0.1)
+    return aiohttp.ClientTimeout(total=min(model.get('timeout', 30), remaining))
+
+async def check_response(response):
+    """Ошибка по HTTP-статусу: 429 и 5xx можно повторить"""
+    if response.status == 200:
+        return
+    
+    error_text = await response.text()
+    retry_after = response.headers.get('Retry-After')
+    raise LLMError(
+        f"API error: {response.status} - {error_text[:200]}",
+        retryable=response.status == 429 or response.status >= 500,
+        retry_after=float(retry_after) if retry_after and retry_after.replace('.', '', 1).isdigit() else None
+    )
+
+def parse_sse_line(raw_line):
+    """JSON-фрагмент из строки SSE-потока (None для пустых строк, комментариев и [DONE])"""
+    line = raw_line.decode('utf-8').strip() if isinstance(raw_line, bytes) else raw_line.strip()
+    
+    # Пропускаем пустые строки, комментарии (": OPENROUTER PROCESSING") и [DONE]
+    if not line.startswith('data:'):
+        return None
+    data = line[5:].strip()
+    if not data or data == '[DONE]':
+        return None
+    
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        return None
+
+def get_delta_content(chunk):
+    """Текст из фрагмента потока"""
+    choices = chunk.get('choices') or []
+    if not choices:
+        return None
+    return choices[0].get('delta', {}).get('content')
+
+# Глобальный экземпляр для использования
+llm_backend = LLMBackend()
+
+# Тестирование
+async def test_llm_backend():
+    """Тестирование ретраев и переключения моделей на локальном mock-сервере"""
+    from aiohttp import web
+    print("🧪 Тестируем LLM-бэкенд...")
+    
+    attempts = {'flaky': 0}
+    
+    async def flaky(request):
+        # Первый ответ — 429, потом успех
+        attempts['flaky'] += 1
+        if attempts['flaky'] == 1:
+            return web.Response(status=429, headers={'Retry-After': '0.1'}, text="rate limited")
+        return web.json_response({
+            "choices": [{"message": {"content": "Hello from the flaky model."}}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 6}
+        })
+    
+    async def broken(request):
+        return web.Response(status=503, text="unavailable")
+    
+    async def hanging(request):
+        await asyncio.sleep(5)
+        return web.Response(status=503, text="too late")
+    
+    app = web.Application()
+    app.router.add_post("/flaky", flaky)
+    app.router.add_post("/broken", broken)
+    app.router.add_post("/hanging", hanging)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 8091).start()
+    
+    try:
+        backend = LLMBackend(
+            models=[
+                {"model": "mock/broken", "url": "http://127.0.0.1:8091/broken", "timeout": 5},
+                {"model": "mock/flaky", "url": "http://127.0.0.1:8091/flaky", "timeout": 5}
+            ],
+            max_concurrency=2, rate=20, burst=5, max_retries=1, latency_budget=10, breaker_failures=2
+        )
+        content = await backend.complete([{"role": "user", "content": "Hi"}])
+        print(f"1. Ответ: {content}")
+        
+        # Предохранитель: сломанная модель после 2 ошибок подряд больше не запрашивается первой
+        await backend.complete([{"role": "user", "content": "Hi again"}])
+        print(f"2. Статистика:\n{backend.format_stats()}")
+        
+        stats = backend.get_stats()
+        ok = content and stats['mock/broken']['errors'] == 2 and stats['mock/flaky']['retries'] == 1
+        print(f"{'✅' if ok else '❌'} Ретраи, переключение моделей и предохранитель")
+        
+        # Таймаут тоже считается ошибкой: зависшая модель уходит в конец очереди
+        backend = LLMBackend(
+            models=[
+                {"model": "mock/hanging", "url": "http://127.0.0.1:8091/hanging", "timeout": 0.3},
+                {"model": "mock/flaky", "url": "http://127.0.0.1:8091/flaky", "timeout": 5}
+            ],
+            rate=20, burst=5, max_retries=0, latency_budget=2, breaker_failures=1
+        )
+        timings = []
+        for _ in range(3):
+            start = time.monotonic()
+            await backend.complete([{"role": "user", "content": "Hi"}])
+            timings.append(time.monotonic() - start)
+        print(f"3. Время ответов: {', '.join(f'{t * 1000:.0f} мс' for t in timings)}")
+        
+        ok = backend.get_stats()['mock/hanging']['requests'] == 1 and max(timings[1:]) < 0.3
+        print(f"{'✅' if ok else '❌'} Таймауты учитываются предохранителем")
+    finally:
+        await close_sessions()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(test_llm_backend())
@@ -0,0 +1,240 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from modules_correct.tracing import add_span
+
+# Границы корзин гистограмм по умолчанию, сек
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Metric:
+    """Базовая метрика: значения по наборам меток"""
+    
+    kind = "untyped"
+    
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # кортеж значений меток -> значение
+        registry.append(self)
+    
+    def label_key(self, labels):
+        """Кортеж значений меток в порядке labelnames"""
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def format_labels(self, key, extra=()):
+        """{a="1",b="2"} для строки экспорта"""
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{self.format_labels(key)} {format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    """Монотонно растущий счётчик"""
+    
+    kind = "counter"
+    
+    def inc(self, value=1, **labels):
+        key = self.label_key(labels)
+        self.values[key] = self.values.get(key, 0) + value
+
+class Gauge(Metric):
+    """Текущее значение"""
+    
+    kind = "gauge"
+    
+    def set(self, value, **labels):
+        self.values[self.label_key(labels)] = value
+
+class Histogram(Metric):
+    """Гистограмма: счётчики по корзинам, сумма и количество (как в Prometheus)"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value, **labels):
+        key = self.label_key(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            # [счётчики по корзинам (+Inf последней), сумма, количество]
+            entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        """Замер блока: with HISTOGRAM.time(label=...)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                lines.append(f"{self.name}_bucket{self.format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self.format_labels(key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{self.format_labels(key)} {count}")
+        return lines
+
+def escape_label(value):
+    """Экранирование значения метки"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value):
+    """Число в формате экспорта"""
+    if isinstance(value, float):
+        return repr(value) if value != int(value) else str(int(value))
+    return str(value)
+
+# Все метрики процесса
+registry = []
+
+# ===== МЕТРИКИ =====
+TRANSLATOR_SECONDS = Histogram("bot_translator_seconds", "Latency of translation providers", ["provider"])
+TRANSLATOR_RESULTS = Counter("bot_translator_results_total", "Translation provider results", ["provider", "result"])
+CACHE_REQUESTS = Counter("bot_cache_requests_total", "Cache lookups", ["cache", "result"])
+CACHE_ENTRIES = Gauge("bot_cache_entries", "Entries held in in-memory caches", ["cache"])
+CACHE_REFRESHES = Counter("bot_cache_refreshes_total", "Popular words refreshed ahead of expiry", ["result"])
+DB_QUERY_SECONDS = Histogram(
+    "bot_db_query_seconds", "Time spent in Database methods", ["method"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+)
+LIMIT_REJECTIONS = Counter("bot_limit_rejections_total", "Actions rejected by daily limits", ["action"])
+GENERATION_SECONDS = Histogram("bot_generation_seconds", "Sentence generation latency", ["mode"])
+LLM_SECONDS = Histogram("bot_llm_request_seconds", "LLM request latency per model", ["model"])
+LLM_REQUESTS = Counter("bot_llm_requests_total", "LLM requests per model", ["model", "result"])
+LLM_TOKENS = Counter("bot_llm_tokens_total", "LLM token usage", ["model", "type"])
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Handler latency per aiogram route", ["event", "handler"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Handler exceptions per aiogram route", ["event", "handler"])
+EVENT_LOOP_LAG = Histogram(
+    "bot_event_loop_lag_seconds", "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+def render_metrics():
+    """Все метрики в текстовом формате Prometheus"""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def instrument_methods(cls, histogram=DB_QUERY_SECONDS):
+    """Замер времени всех публичных методов класса (для Database)"""
+    for name, method in list(vars(cls).items()):
+        if name.startswith('_') or not callable(method):
+            continue
+        setattr(cls, name, timed_method(method, histogram, name))
+    return cls
+
+# Глубина вложенных замеряемых вызовов в текущем потоке
+_timed_calls = threading.local()
+
+def timed_method(method, histogram, name):
+    """Обёртка метода с замером времени
+    
+    Учитывается только внешний вызов: метод, вызванный из другого замеряемого метода,
+    уже входит в его время и не считается второй раз.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        depth = getattr(_timed_calls, 'depth', 0)
+        if depth:
+            _timed_calls.depth = depth + 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                _timed_calls.depth = depth
+        
+        _timed_calls.depth = 1
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _timed_calls.depth = 0
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed, method=name)
+            add_span(f"db.{name}", elapsed)
+    return wrapper
+
+async def monitor_event_loop(interval=0.5):
+    """Задержка цикла событий: насколько позже запланированного просыпается sleep"""
+    import asyncio  # только в процессе бота: импорт метрик (через database) остаётся лёгким
+    
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - start - interval, 0.0))
+
+async def start_metrics_server(host, port):
+    """Локальный HTTP-эндпоинт /metrics"""
+    from aiohttp import web
+    
+    async def handle_metrics(request):
+        return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+    
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
+
+# Тестирование
+def test_metrics():
+    """Тестирование экспорта"""
+    print("🧪 Тестируем метрики...")
+    
+    CACHE_REQUESTS.inc(cache="translation", result="hit")
+    TRANSLATOR_SECONDS.observe(0.2, provider="yandex_translate")
+    with DB_QUERY_SECONDS.time(method="get_word_count"):
+        pass
+    
+    start = time.perf_counter()
+    for _ in range(100_000):
+        TRANSLATOR_SECONDS.observe(0.03, provider="yandex_translate")
+    print(f"1. observe(): {(time.perf_counter() - start) * 10:.2f} мкс")
+    
+    text = render_metrics()
+    print("2. " + "\n   ".join(line for line in text.splitlines() if "yandex" in line and "_bucket" not in line))
+    
+    # Вложенный вызов не учитывается второй раз
+    class Store:
+        def outer(self):
+            return self.inner()
+        
+        def inner(self):
+            return 1
+    
+    nested = Histogram("test_nested_seconds", "Nested calls test", ["method"])
+    instrument_methods(Store, nested)
+    Store().outer()
+    counted = sorted(key[0] for key in nested.values)
+    registry.remove(nested)
+    print(f"3. Учтённые вызовы: {counted}")
+    
+    ok = 'bot_cache_requests_total{cache="translation",result="hit"} 1' in text and counted == ["outer"]
+    print(f"{'✅' if ok else '❌'} Метрики готовы!")
+
+if __name__ == "__main__":
+    test_metrics()
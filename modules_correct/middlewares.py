@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import random
+import time
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from config import SLOW_UPDATE_THRESHOLD, TRACE_SAMPLE_RATE, TRACE_FILE
+from modules_correct.metrics import HANDLER_SECONDS, HANDLER_ERRORS
+from modules_correct.tracing import Trace, current_trace, add_span
+
+logger = logging.getLogger("tracing")
+
+class MetricsMiddleware(BaseMiddleware):
+    """Время обработчика по маршруту (имя функции-хэндлера)"""
+    
+    def __init__(self, event_name):
+        self.event_name = event_name
+    
+    async def __call__(self, handler, event, data):
+        handler_object = data.get('handler')
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        
+        trace = current_trace.get()
+        if trace is not None:
+            trace.handler = name
+        
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(event=self.event_name, handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, event=self.event_name, handler=name)
+
+class TracingMiddleware(BaseMiddleware):
+    """Трасса на каждый апдейт: лог медленных апдейтов и выборка трасс в JSONL
+    
+    Регистрируется как outer-middleware на dp.update, поэтому охватывает фильтры, FSM
+    и сам обработчик. Отрезки добавляют замеры БД, переводчиков, LLM и запросов к Telegram.
+    """
+    
+    def __init__(self, threshold=SLOW_UPDATE_THRESHOLD, sample_rate=TRACE_SAMPLE_RATE, path=TRACE_FILE):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.path = path
+    
+    async def __call__(self, handler, event, data):
+        user = getattr(event.event, 'from_user', None)
+        trace = Trace(update_id=event.update_id, update_type=event.event_type, user_id=user.id if user else None)
+        token = current_trace.set(trace)
+        try:
+            return await handler(event, data)
+        finally:
+            current_trace.reset(token)
+            trace.finish()
+            self.report(trace)
+    
+    def report(self, trace):
+        """Лог медленного апдейта и запись выборки"""
+        slow = trace.duration >= self.threshold
+        if slow:
+            summary = trace.to_dict()
+            summary.pop('spans')
+            logger.warning(f"Медленный апдейт: {json.dumps(summary, ensure_ascii=False)}")
+        
+        if self.sample_rate and (slow or random.random() < self.sample_rate):
+            self.write(trace)
+    
+    def write(self, trace):
+        """Строка JSONL с полной трассой"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"Ошибка записи трассы: {e}")
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Отрезок трассы на каждый вызов Bot API (bot.session.middleware)"""
+    
+    async def __call__(self, make_request, bot, method):
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            add_span(f"telegram.{type(method).__name__}", time.perf_counter() - start)
@@ -1,118 +1,75 @@
 import asyncio
+import html
 from datetime import datetime, time
 from database import db
+from config import FREE_LIMITS, NOTIFICATION_CONCURRENCY, REVIEW_WORDS_IN_REMINDER
 from modules_correct.achievements import check_achievements, format_achievement_message
+from modules_correct.scheduler import NotificationScheduler
+from modules_correct.broadcast import MessageSender, DELIVERED
+from modules_correct.activity import activity_counters
 
 class NotificationManager:
     def __init__(self, bot):
         self.bot = bot
+        self.sender = MessageSender(bot)  # общий темп отправки с рассылками
         self.scheduled_tasks = []
+        self.scheduler = None
     
     async def send_achievement_notification(self, user_id, achievement):
         """Отправка уведомления о достижении"""
         try:
             message = await format_achievement_message(achievement)
             
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="HTML"
-            )
+            if await self.sender.send(user_id, message, parse_mode="HTML") != DELIVERED:
+                return False
             
             print(f"✅ Отправлено уведомление о достижении пользователю {user_id}")
             return True
-            
+        
         except Exception as e:
             print(f"❌ Ошибка отправки уведомления: {e}")
             return False
     
     async def send_daily_reminder(self, user_id):
         """Ежедневное напоминание"""
+        return await self.send_daily_reminders([user_id]) == 1
+    
+    async def send_daily_reminders(self, user_ids):
+        """Утренние напоминания пачке пользователей: данные собираются за несколько запросов на всю пачку"""
         try:
-            # Получаем статистику пользователя
-            word_count = db.get_word_count(user_id)
-            achievements = db.get_achievements(user_id)
-            completed = len([a for a in achievements if a['is_completed']])
-            
-            # Получаем лимиты
-            from modules_correct.limits import get_todays_limits
-            limits = get_todays_limits(user_id)
-            
-            message = f"""
-🌅 <b>ДОБРОЕ УТРО!</b>
-
-📊 <b>Ваша статистика:</b>
-• Слов в словаре: {word_count}
-• Достижений: {completed}
-• Уровень: 🆓 Бесплатный
-
-🎯 <b>Цели на сегодня:</b>
-• Добавить 3 новых слова (0/3)
-• Сделать 5 поисков (0/5)
-• Повторить 5 старых слов (0/5)
-
-📈 <b>Лимиты сегодня:</b>
-🔍 Поисков: {limits['search']['remaining']}/{limits['search']['max']}
-✍️ Генераций: {limits['generate']['remaining']}/{limits['generate']['max']}
-✨ Исправлений: {limits['fix']['remaining']}/{limits['fix']['max']}
-
-💡 <b>Совет дня:</b>
-Сохраняйте слова с примерами — так они лучше запоминаются!
-
-📖 <b>Продолжайте учиться!</b>
-"""
-            
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="HTML"
-            )
-            
-            print(f"✅ Отправлено ежедневное напоминание пользователю {user_id}")
-            return True
-            
+            rows = db.get_reminder_data(user_ids, REVIEW_WORDS_IN_REMINDER)
+            activity = activity_counters.get_today(user_ids)
+            for user_id, row in rows.items():
+                row['reviews'] = activity[user_id]['reviews']
         except Exception as e:
-            print(f"❌ Ошибка отправки напоминания: {e}")
-            return False
+            print(f"❌ Ошибка подготовки напоминаний: {e}")
+            return 0
+        
+        delivered = await self.send_batch(user_ids, lambda user_id: format_daily_reminder(rows[user_id]))
+        print(f"✅ Ежедневные напоминания: {delivered}/{len(user_ids)}")
+        return delivered
+    
+    async def send_batch(self, user_ids, render, concurrency=NOTIFICATION_CONCURRENCY):
+        """Отправка пачке пользователей: render(user_id) -> текст. Возвращает число доставленных"""
+        queue = list(reversed(user_ids))
+        delivered = 0
+        
+        async def worker():
+            nonlocal delivered
+            while queue:
+                user_id = queue.pop()
+                try:
+                    if await self.sender.send(user_id, render(user_id), parse_mode="HTML") == DELIVERED:
+                        delivered += 1
+                except Exception as e:
+                    print(f"❌ Ошибка отправки пользователю {user_id}: {e}")
+        
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(user_ids)))))
+        return delivered
     
     async def send_evening_summary(self, user_id):
         """Вечерняя сводка"""
-        try:
-            # Получаем активность за день
-            # (можно добавить отслеживание в будущем)
-            
-            message = f"""
-🌙 <b>ВЕЧЕРНЯЯ СВОДКА</b>
-
-📅 <b>Сегодня вы:</b>
-• Добавили 0 новых слов
-• Сделали 0 поисков
-• Повторили 0 слов
-
-🏆 <b>Прогресс:</b>
-До следующего уровня: 3 достижения
-
-🎯 <b>Цели на завтра:</b>
-1. Добавить хотя бы 2 новых слова
-2. Повторить 3 старых слова
-3. Использовать генератор предложений
-
-💤 <b>Спокойной ночи и хорошего отдыха!</b>
-Завтра новые слова ждут вас!
-"""
-            
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="HTML"
-            )
-            
-            print(f"✅ Отправлена вечерняя сводка пользователю {user_id}")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Ошибка отправки сводки: {e}")
-            return False
+        return await self.send_evening_summaries([user_id]) == 1
     
     async def check_and_notify_achievements(self, user_id, action_type, count=1):
         """Проверка и отправка уведомлений о достижениях"""
@@ -123,11 +80,31 @@ class NotificationManager:
         
         return len(new_achievements)
     
-    async def schedule_daily_notifications(self):
-        """Планирование ежедневных уведомлений"""
-        # Пока просто заглушка
-        # В будущем можно добавить реальное планирование через asyncio.sleep
+    async def send_evening_summaries(self, user_ids):
+        """Вечерние сводки пачке пользователей: одна строка daily_activity на пользователя"""
+        try:
+            activity = activity_counters.get_today(user_ids)
+        except Exception as e:
+            print(f"❌ Ошибка подготовки сводок: {e}")
+            return 0
+        
+        delivered = await self.send_batch(user_ids, lambda user_id: format_evening_summary(activity[user_id]))
+        print(f"✅ Вечерние сводки: {delivered}/{len(user_ids)}")
+        return delivered
+    
+    async def schedule_daily_notifications(self, shard=None):
+        """Планирование ежедневных уведомлений (утро и вечер по местному времени пользователя)"""
+        self.scheduler = NotificationScheduler({
+            "morning": self.send_daily_reminders,
+            "evening": self.send_evening_summaries
+        }, shard=shard)
+        self.scheduler.load()
+        
+        # "Сегодня" в счётчиках активности — по тем же часовым поясам
+        activity_counters.zones = self.scheduler.timezones
+        self.scheduled_tasks.append(asyncio.create_task(self.scheduler.run()))
         print("⏰ Менеджер уведомлений инициализирован")
+        return self.scheduler
     
     async def send_word_reminder(self, user_id, words):
         """Напоминание о повторении слов"""
@@ -146,15 +123,70 @@ class NotificationManager:
         message += "\n📚 Повторяйте слова регулярно для лучшего запоминания!"
         
         try:
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="HTML"
-            )
-            print(f"✅ Отправлено напоминание о словах пользователю {user_id}")
+            if await self.sender.send(user_id, message, parse_mode="HTML") == DELIVERED:
+                print(f"✅ Отправлено напоминание о словах пользователю {user_id}")
         except Exception as e:
             print(f"❌ Ошибка отправки напоминания о словах: {e}")
 
+def format_daily_reminder(row):
+    """Текст утреннего напоминания из готовой строки get_reminder_data (плюс reviews — повторения за день)"""
+    limits = FREE_LIMITS  # Пока все бесплатные (см. limits.get_user_level)
+    
+    message = f"""
+🌅 <b>ДОБРОЕ УТРО!</b>
+
+📊 <b>Ваша статистика:</b>
+• Слов в словаре: {row['word_count']}
+• Достижений: {row['achievements']}
+• Уровень: 🆓 Бесплатный
+
+🎯 <b>Цели на сегодня:</b>
+• Добавить 3 новых слова ({min(row['words_added'], 3)}/3)
+• Сделать 5 поисков ({min(row['searches_used'], 5)}/5)
+• Повторить {REVIEW_WORDS_IN_REMINDER} старых слов ({min(row.get('reviews', 0), REVIEW_WORDS_IN_REMINDER)}/{REVIEW_WORDS_IN_REMINDER})
+
+📈 <b>Лимиты сегодня:</b>
+🔍 Поисков: {max(limits['daily_searches'] - row['searches_used'], 0)}/{limits['daily_searches']}
+✍️ Генераций: {max(limits['daily_generations'] - row['generations_used'], 0)}/{limits['daily_generations']}
+✨ Исправлений: {max(limits['daily_fixes'] - row['fixes_used'], 0)}/{limits['daily_fixes']}
+"""
+    
+    if row['review_words']:
+        message += "\n🔄 <b>Пора повторить:</b>\n"
+        for i, word in enumerate(row['review_words'], 1):
+            message += f"{i}. <b>{html.escape(word['word'])}</b> - {html.escape((word['translation'] or '')[:30])}\n"
+    
+    message += """
+💡 <b>Совет дня:</b>
+Сохраняйте слова с примерами — так они лучше запоминаются!
+
+📖 <b>Продолжайте учиться!</b>
+"""
+    return message
+
+def format_evening_summary(activity):
+    """Текст вечерней сводки из счётчиков за день"""
+    return f"""
+🌙 <b>ВЕЧЕРНЯЯ СВОДКА</b>
+
+📅 <b>Сегодня вы:</b>
+• Добавили {activity['saves']} новых слов
+• Сделали {activity['searches']} поисков
+• Повторили {activity['reviews']} слов
+• Сгенерировали предложения {activity['generations']} раз
+
+🏆 <b>Прогресс:</b>
+До следующего уровня: 3 достижения
+
+🎯 <b>Цели на завтра:</b>
+1. Добавить хотя бы 2 новых слова
+2. Повторить 3 старых слова
+3. Использовать генератор предложений
+
+💤 <b>Спокойной ночи и хорошего отдыха!</b>
+Завтра новые слова ждут вас!
+"""
+
 # Тестирование
 async def test_notifications():
     """Тестирование системы уведомлений"""
@@ -0,0 +1,153 @@
+import codecs
+import re
+
+# Нужные блоки страницы Oxford (скомпилированы один раз). Внутри блока нет '<' и переносов строк
+OXFORD_TRANSCRIPTION = re.compile(r'phon(?:etic)?">/([^/<\n]*)/')
+OXFORD_POS = re.compile(r'pos">([^<\n]*)<')
+OXFORD_DEFINITION = re.compile(r'def">([^<\n]*)<')
+OXFORD_EXAMPLE = re.compile(r'x">([^<\n]*)<')
+
+MAX_DEFINITIONS = 3  # первые 3 определения
+MAX_EXAMPLES = 3
+OXFORD_CHUNK_SIZE = 8192  # размер читаемого куска ответа, байт
+
+class OxfordExtractor:
+    """Потоковый разбор страницы Oxford: куски разбираются по мере получения
+    
+    Разбирается только текст до последнего '<' в буфере: каждый блок кончается на '<'
+    (транскрипция — на '/', перед '<'), поэтому совпадение не разрывается между кусками,
+    а разобранный текст сразу отбрасывается. Как только найдены часть речи, 3 определения
+    и 3 примера, feed() возвращает True — остаток страницы можно не скачивать.
+    Транскрипция стоит в шапке статьи, до определений.
+    """
+    
+    def __init__(self, encoding='utf-8'):
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self.buffer = ''  # неразобранный хвост (после последнего '<')
+        self.bytes_read = 0
+        self.transcription = None
+        self.pos = None
+        self.definitions = []
+        self.examples = []
+    
+    @property
+    def done(self):
+        """Все нужные блоки найдены"""
+        return (self.pos is not None and len(self.definitions) >= MAX_DEFINITIONS
+                and len(self.examples) >= MAX_EXAMPLES)
+    
+    def feed(self, chunk):
+        """Очередной кусок ответа (bytes или str). True — дальше читать не нужно"""
+        if isinstance(chunk, bytes):
+            self.bytes_read += len(chunk)
+            chunk = self.decoder.decode(chunk)
+        self.buffer += chunk
+        
+        end = self.buffer.rfind('<') + 1
+        if end:
+            self.scan(end)
+            self.buffer = self.buffer[end:]
+        return self.done
+    
+    def close(self):
+        """Конец ответа: разбор оставшегося хвоста"""
+        self.buffer += self.decoder.decode(b'', final=True)
+        self.scan(len(self.buffer))
+        self.buffer = ''
+    
+    def scan(self, end):
+        """Поиск блоков в buffer[:end]"""
+        text = self.buffer
+        if self.transcription is None:
+            match = OXFORD_TRANSCRIPTION.search(text, 0, end)
+            if match:
+                self.transcription = match.group(1)
+        
+        if self.pos is None:
+            match = OXFORD_POS.search(text, 0, end)
+            if match:
+                self.pos = match.group(1)
+        
+        for pattern, found, limit in ((OXFORD_DEFINITION, self.definitions, MAX_DEFINITIONS),
+                                      (OXFORD_EXAMPLE, self.examples, MAX_EXAMPLES)):
+            if len(found) >= limit:
+                continue
+            for match in pattern.finditer(text, 0, end):
+                found.append(match.group(1))
+                if len(found) >= limit:
+                    break
+    
+    def result(self, word):
+        """Перевод в общем формате. None, если определений нет"""
+        meanings = [text.strip() for text in self.definitions if text and len(text) < 100]  # Фильтруем длинные тексты
+        if not meanings:
+            return None
+        
+        examples = [{'en': text.strip(), 'ru': ''} for text in self.examples if text and len(text) < 200]  # Oxford не дает перевод
+        return {
+            "word": word,
+            "source": "Oxford Dictionary",
+            "translations": [{'part_of_speech': self.pos or 'сущ.', 'meanings': meanings}],
+            "examples": examples,
+            "transcription": self.transcription or ''
+        }
+
+def extract_oxford(word, html):
+    """Разбор уже загруженной страницы целиком"""
+    extractor = OxfordExtractor()
+    if not extractor.feed(html):
+        extractor.close()
+    return extractor.result(word)
+
+# Тестирование
+def test_oxford_extractor():
+    """Тестирование на сохранённых страницах из benchmarks/fixtures"""
+    import os
+    import time
+    print("🧪 Тестируем разбор страниц Oxford...")
+    
+    fixtures = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+    with open(os.path.join(fixtures, "oxford_run.html"), "rb") as f:
+        page = f.read()
+    with open(os.path.join(fixtures, "oxford_no_entry.html"), "rb") as f:
+        no_entry = f.read()
+    
+    expected = extract_oxford("run", page.decode('utf-8'))
+    print(f"1. Целиком: {expected['transcription']!r}, {expected['translations'][0]['part_of_speech']}, "
+          f"определений {len(expected['translations'][0]['meanings'])}, примеров {len(expected['examples'])}")
+    
+    # Любое разбиение на куски (в том числе посреди символа UTF-8) даёт тот же результат
+    same = True
+    for size in (1, 7, 100, 1000, OXFORD_CHUNK_SIZE, len(page)):
+        extractor = OxfordExtractor()
+        for offset in range(0, len(page), size):
+            if extractor.feed(page[offset:offset + size]):
+                break
+        else:
+            extractor.close()
+        same = same and extractor.result("run") == expected
+    print(f"2. Разбиения на куски совпадают: {same}")
+    
+    extractor = OxfordExtractor()
+    for offset in range(0, len(page), OXFORD_CHUNK_SIZE):
+        if extractor.feed(page[offset:offset + OXFORD_CHUNK_SIZE]):
+            break
+    print(f"3. Прочитано {extractor.bytes_read:,} из {len(page):,} байт ({extractor.bytes_read / len(page):.0%})")
+    
+    missing = extract_oxford("qwzx", no_entry.decode('utf-8'))
+    print(f"4. Страница без статьи: {missing}")
+    
+    start = time.perf_counter()
+    for _ in range(200):
+        extractor = OxfordExtractor()
+        for offset in range(0, len(page), OXFORD_CHUNK_SIZE):
+            if extractor.feed(page[offset:offset + OXFORD_CHUNK_SIZE]):
+                break
+    print(f"5. Потоковый разбор: {(time.perf_counter() - start) / 200 * 1e6:.0f} мкс на страницу")
+    
+    ok = (same and missing is None and expected['transcription'] == 'rʌn'
+          and extractor.bytes_read < len(page) / 2)
+    print(f"{'✅' if ok else '❌'} Разбор Oxford готов!")
+
+if __name__ == "__main__":
+    test_oxford_extractor()
@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """Ограничитель частоты запросов (token bucket)"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate  # токенов в секунду
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self, tokens=1):
+        """Ожидание свободного токена"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
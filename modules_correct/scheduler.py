@@ -0,0 +1,237 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from database import db
+from config import (
+    DEFAULT_TIMEZONE, MORNING_REMINDER_TIME, EVENING_SUMMARY_TIME, NOTIFICATION_CATCHUP_WINDOW,
+    NOTIFICATION_BATCH_SIZE
+)
+
+# Виды задач и локальное время отправки
+JOB_TIMES = {
+    "morning": MORNING_REMINDER_TIME,
+    "evening": EVENING_SUMMARY_TIME,
+}
+
+class NotificationScheduler:
+    """Планировщик ежедневных уведомлений на куче
+    
+    Одна фоновая задача на всех пользователей: куча (время, user_id, вид) и словарь актуальных
+    времён. Постановка и снятие — O(log n); устаревшие записи кучи пропускаются при извлечении.
+    Следующий запуск хранится в notification_jobs, поэтому после перезапуска видно, что пропущено.
+    """
+    
+    def __init__(self, handlers, shard=None, batch_size=NOTIFICATION_BATCH_SIZE,
+                 catchup_window=NOTIFICATION_CATCHUP_WINDOW):
+        self.handlers = handlers  # вид задачи -> async функция(user_ids) -> сколько доставлено
+        self.shard = shard  # (номер, всего): только user_id % всего == номер
+        self.batch_size = batch_size
+        self.catchup_window = catchup_window
+        self.heap = []
+        self.jobs = {}  # (user_id, вид) -> время следующего запуска
+        self.timezones = {}  # user_id -> ZoneInfo (только не по умолчанию)
+        self.wakeup = asyncio.Event()
+        self.stats = {'sent': 0, 'failed': 0, 'caught_up': 0, 'skipped': 0}
+    
+    def load(self, now=None):
+        """Восстановление задач из базы с решением по пропущенным запускам"""
+        now = now or time.time()
+        saved = db.get_notification_jobs()
+        changed = []
+        
+        for user_id, timezone in db.get_notification_users():
+            if not self.owns(user_id):
+                continue
+            if timezone:
+                self.timezones[user_id] = get_zone(timezone)
+            
+            for kind in self.handlers:
+                next_run = saved.get((user_id, kind))
+                
+                if next_run is None:
+                    next_run = self.next_run_time(user_id, kind, now)
+                    changed.append((user_id, kind, next_run, None))
+                elif next_run < now:
+                    if now - next_run <= self.catchup_window:
+                        # Опоздали ненамного — отправляем сейчас
+                        next_run = now
+                        self.stats['caught_up'] += 1
+                    else:
+                        # Слишком поздно (утреннее напоминание вечером не нужно) — ждём следующего дня
+                        next_run = self.next_run_time(user_id, kind, now)
+                        changed.append((user_id, kind, next_run, None))
+                        self.stats['skipped'] += 1
+                
+                self.jobs[(user_id, kind)] = next_run
+        
+        # Одна heapify на весь набор — O(n)
+        self.heap = [(run_at, user_id, kind) for (user_id, kind), run_at in self.jobs.items()]
+        heapq.heapify(self.heap)
+        
+        if changed:
+            db.save_notification_jobs(changed)
+        print(f"⏰ Планировщик: {len(self.jobs)} задач, догоняем {self.stats['caught_up']}, пропущено {self.stats['skipped']}")
+    
+    def owns(self, user_id):
+        """Пользователь из своей доли (в режиме воркеров)"""
+        return self.shard is None or user_id % self.shard[1] == self.shard[0]
+    
+    def add_user(self, user_id):
+        """Задачи для нового пользователя (повторный вызов ничего не меняет)"""
+        if not self.owns(user_id) or all((user_id, kind) in self.jobs for kind in self.handlers):
+            return
+        
+        now = time.time()
+        rows = []
+        for kind in self.handlers:
+            if (user_id, kind) not in self.jobs:
+                next_run = self.next_run_time(user_id, kind, now)
+                self.schedule(user_id, kind, next_run)
+                rows.append((user_id, kind, next_run, None))
+        db.save_notification_jobs(rows)
+    
+    def set_timezone(self, user_id, timezone):
+        """Смена часового пояса: перенос задач пользователя"""
+        self.timezones[user_id] = get_zone(timezone)
+        if not self.owns(user_id):
+            return
+        
+        now = time.time()
+        rows = []
+        for kind in self.handlers:
+            next_run = self.next_run_time(user_id, kind, now)
+            self.schedule(user_id, kind, next_run)
+            rows.append((user_id, kind, next_run, None))
+        db.save_notification_jobs(rows)
+    
+    def schedule(self, user_id, kind, run_at):
+        """Постановка задачи (старая запись в куче станет устаревшей)"""
+        self.jobs[(user_id, kind)] = run_at
+        heapq.heappush(self.heap, (run_at, user_id, kind))
+        
+        # Задача раньше текущего ожидания — будим цикл
+        if self.heap[0][0] == run_at:
+            self.wakeup.set()
+    
+    def next_run_time(self, user_id, kind, after):
+        """Ближайшее локальное ЧЧ:ММ пользователя после момента after (timestamp)"""
+        zone = self.timezones.get(user_id) or get_zone(DEFAULT_TIMEZONE)
+        hour, minute = map(int, JOB_TIMES[kind].split(':'))
+        
+        local = datetime.fromtimestamp(after, zone)
+        candidate = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate.timestamp() <= after:
+            # Следующий день по местному календарю (переход на летнее время учитывает ZoneInfo)
+            next_day = local.date() + timedelta(days=1)
+            candidate = datetime(next_day.year, next_day.month, next_day.day, hour, minute, tzinfo=zone)
+        return candidate.timestamp()
+    
+    def pop_due(self, now):
+        """Все задачи, время которых наступило"""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            run_at, user_id, kind = heapq.heappop(self.heap)
+            if self.jobs.get((user_id, kind)) == run_at:
+                due.append((user_id, kind))
+        return due
+    
+    async def run(self):
+        """Основной цикл (одна задача на весь планировщик)"""
+        while True:
+            # Устаревшие записи на вершине не должны задавать время сна
+            while self.heap and self.jobs.get((self.heap[0][1], self.heap[0][2])) != self.heap[0][0]:
+                heapq.heappop(self.heap)
+            
+            delay = self.heap[0][0] - time.time() if self.heap else 3600
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=min(delay, 3600))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            now = time.time()
+            due = self.pop_due(now)
+            
+            # Следующий запуск ставим до отправки: сбой отправки не ломает расписание
+            rows = []
+            for user_id, kind in due:
+                next_run = self.next_run_time(user_id, kind, now)
+                self.schedule(user_id, kind, next_run)
+                rows.append((user_id, kind, next_run, now))
+            if rows:
+                db.save_notification_jobs(rows)
+            
+            await self.run_due(due)
+    
+    async def run_due(self, due):
+        """Наступившие задачи пачками по виду: данные пачки собираются обработчиком разом"""
+        by_kind = {}
+        for user_id, kind in due:
+            by_kind.setdefault(kind, []).append(user_id)
+        
+        for kind, user_ids in by_kind.items():
+            for i in range(0, len(user_ids), self.batch_size):
+                await self.run_batch(kind, user_ids[i:i + self.batch_size])
+    
+    async def run_batch(self, kind, user_ids):
+        """Отправка одной пачки"""
+        try:
+            delivered = await self.handlers[kind](user_ids)
+        except Exception as e:
+            print(f"Ошибка задачи {kind} для {len(user_ids)} пользователей: {e}")
+            delivered = 0
+        self.stats['sent'] += delivered
+        self.stats['failed'] += len(user_ids) - delivered
+
+def get_zone(name):
+    """ZoneInfo по имени (неизвестный пояс — пояс по умолчанию)"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+def is_valid_timezone(name):
+    """Проверка имени часового пояса (например, Europe/London)"""
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+# Тестирование
+async def test_scheduler():
+    """Тестирование расписания, догоняния и стоимости постановки"""
+    print("🧪 Тестируем планировщик уведомлений...")
+    
+    sent = []
+    
+    async def handler(user_ids):
+        sent.extend(user_ids)
+        return len(user_ids)
+    
+    scheduler = NotificationScheduler({"morning": handler})
+    scheduler.timezones[1] = get_zone("Asia/Tokyo")
+    
+    now = datetime(2026, 3, 28, 12, 0, tzinfo=ZoneInfo("UTC")).timestamp()
+    tokyo = datetime.fromtimestamp(scheduler.next_run_time(1, "morning", now), ZoneInfo("Asia/Tokyo"))
+    moscow = datetime.fromtimestamp(scheduler.next_run_time(2, "morning", now), ZoneInfo("Europe/Moscow"))
+    print(f"1. Следующее утро: Токио {tokyo}, Москва {moscow}")
+    
+    # 100k пользователей в куче, одна задача уже наступила
+    start = time.perf_counter()
+    for user_id in range(100_000):
+        scheduler.schedule(user_id, "morning", time.time() + 60 + user_id)
+    scheduler.schedule(42, "morning", time.time() - 1)
+    print(f"2. Постановка 100k задач: {(time.perf_counter() - start) * 1000:.0f} мс")
+    
+    await scheduler.run_due(scheduler.pop_due(time.time()))
+    
+    ok = tokyo.hour == 9 and moscow.hour == 9 and sent == [42]
+    print(f"{'✅' if ok else '❌'} Планировщик готов! Отправлено: {sent}")
+
+if __name__ == "__main__":
+    asyncio.run(test_scheduler())
@@ -0,0 +1,267 @@
+import json
+import os
+import random
+import re
+from functools import lru_cache
+from string import Formatter
+from config import TEMPLATES_PATH, WORD_FORMS_PATH
+
+PARTS_OF_SPEECH = ("noun", "verb", "adjective", "adverb")
+UNKNOWN_POS = "any"  # слова вне word_forms.json: только шаблоны без привязки к части речи
+STYLES = ("natural", "casual", "business", "academic")
+
+class TemplateBank:
+    """Банк шаблонов резервных предложений, индексированный по теме, стилю и части речи"""
+    
+    def __init__(self, templates_data, word_forms):
+        self.word_forms = word_forms
+        self.keywords = {}
+        self.index = {}
+        self.pairs = {}
+        self.build_index(templates_data)
+    
+    @classmethod
+    def load(cls, templates_path=TEMPLATES_PATH, word_forms_path=WORD_FORMS_PATH):
+        """Загрузка шаблонов и форм слов из JSON"""
+        templates_data = {}
+        if os.path.exists(templates_path):
+            with open(templates_path, 'r', encoding='utf-8') as f:
+                templates_data = json.load(f)
+        
+        word_forms = {}
+        if os.path.exists(word_forms_path):
+            with open(word_forms_path, 'r', encoding='utf-8') as f:
+                word_forms = json.load(f)
+        
+        return cls(templates_data, word_forms)
+    
+    def build_index(self, templates_data):
+        """Компиляция шаблонов в индекс (тема, стиль, часть речи) -> кортеж шаблонов"""
+        themes = templates_data.get('themes', {})
+        styles = templates_data.get('styles', {})
+        general = themes.get('general', {}).get('templates', {})
+        
+        for theme_name, theme in themes.items():
+            for keyword in theme.get('keywords', []):
+                self.keywords[keyword] = theme_name
+            
+            templates = theme.get('templates', {})
+            for style in STYLES:
+                style_templates = styles.get(style, {})
+                
+                for pos in PARTS_OF_SPEECH:
+                    # Шаблоны темы для части речи, иначе общие
+                    texts = templates.get(pos) or general.get(pos, [])
+                    texts = texts + templates.get('any', []) + style_templates.get(pos, []) + style_templates.get('any', [])
+                    self.index[(theme_name, style, pos)] = tuple(compile_template(t) for t in texts)
+                
+                texts = (templates.get('any') or general.get('any', [])) + style_templates.get('any', [])
+                self.index[(theme_name, style, UNKNOWN_POS)] = tuple(compile_template(t) for t in texts)
+                
+                pair_texts = templates.get('pair') or general.get('pair', [])
+                self.pairs[(theme_name, style)] = tuple(compile_template(t) for t in pair_texts)
+    
+    def resolve_theme(self, theme):
+        """Тема по ключевым словам (без поиска подстрок)"""
+        if not theme:
+            return 'general'
+        for token in re.findall(r'\w+', theme.lower()):
+            if token in self.keywords:
+                return self.keywords[token]
+        return 'general'
+    
+    def generate(self, words, theme=None, style="natural", count=3):
+        """Несколько разных предложений для списка слов"""
+        if not words:
+            return []
+        
+        theme_name = self.resolve_theme(theme)
+        if style not in STYLES:
+            style = "natural"
+        
+        sentences = []
+        if len(words) > 1:
+            pair_templates = self.pairs.get((theme_name, style))
+            if pair_templates:
+                first, second = self.word_fields(words[0]), self.word_fields(words[1])
+                fields = dict(first, word2=second['word'], a_word2=second['a_word'])
+                sentences.append(render_template(random.choice(pair_templates), fields))
+        
+        # Остальные предложения — по словам по очереди, без повторов шаблонов
+        used = set()
+        position = 0
+        attempts = 0
+        while len(sentences) < count and attempts < count * 4:
+            attempts += 1
+            word = words[position % len(words)]
+            position += 1
+            
+            fields = self.word_fields(word)
+            templates = self.index.get((theme_name, style, fields['pos']), ())
+            if not templates:
+                continue
+            
+            template = random.choice(templates)
+            if (word, template) in used:
+                continue
+            used.add((word, template))
+            sentences.append(render_template(template, fields))
+        
+        return sentences
+    
+    def word_fields(self, word):
+        """Формы слова для подстановки (кэшируются)"""
+        return get_word_fields(self, word.strip())
+
+@lru_cache(maxsize=4096)
+def get_word_fields(bank, word):
+    """Часть речи и формы слова из word_forms.json, недостающие формы — по простым правилам
+    
+    Часть речи не угадывается: слово вне word_forms.json получает UNKNOWN_POS и остаётся
+    в исходной форме (например, "information" не получает множественного числа). Так же
+    не изменяются неисчисляемые существительные (countable: false).
+    """
+    info = bank.word_forms.get(word.lower(), {})
+    pos = info.get('type')
+    if pos not in PARTS_OF_SPEECH:
+        pos = UNKNOWN_POS
+    
+    forms = info.get('forms', {})
+    countable = pos == "noun" and info.get('countable', True)
+    verb = pos == "verb"
+    adjective = pos == "adjective"
+    fields = {
+        'pos': pos,
+        'word': word,
+        'a_word': with_article(word) if countable or adjective else word,
+        'plural': info.get('plural') or (make_plural(word) if countable else word),
+        'past': forms.get('past_simple') or (make_past(word) if verb else word),
+        'participle': forms.get('past_participle') or (make_past(word) if verb else word),
+        'ing': forms.get('present_participle') or (make_ing(word) if verb else word),
+        'third': forms.get('third_person') or (make_plural(word) if verb else word),
+        'comparative': info.get('comparative') or (make_comparative(word) if adjective else word),
+        'superlative': info.get('superlative') or (make_superlative(word) if adjective else word),
+    }
+    return fields
+
+# ===== КОМПИЛЯЦИЯ И ПОДСТАНОВКА =====
+def compile_template(text):
+    """Шаблон -> кортеж (текст, поле, текст, поле, ...) для быстрой подстановки"""
+    parts = []
+    for literal, field, _, _ in Formatter().parse(text):
+        parts.append(literal)
+        if field is not None:
+            parts.append(field)
+    return tuple(parts)
+
+def render_template(parts, fields):
+    """Подстановка полей в скомпилированный шаблон"""
+    return ''.join([part if i % 2 == 0 else fields[part] for i, part in enumerate(parts)])
+
+# ===== ПРАВИЛА ФОРМ СЛОВ =====
+def with_article(word):
+    """Слово с неопределённым артиклем"""
+    return f"an {word}" if word[:1].lower() in "aeiou" else f"a {word}"
+
+def make_plural(word):
+    """Множественное число / 3-е лицо по правилам"""
+    if word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        return word + "es"
+    if word.endswith('y') and word[-2:-1] not in "aeiou":
+        return word[:-1] + "ies"
+    return word + "s"
+
+def double_final(word):
+    """Удвоение конечной согласной в коротких словах (big -> bigg-er, stop -> stopp-ed)"""
+    if (len(word) == 3 and word[-1] not in "aeiouwxy" and word[-2] in "aeiou"
+            and word[-3] not in "aeiou"):
+        return word + word[-1]
+    return word
+
+def make_past(word):
+    """Прошедшее время правильного глагола"""
+    if word.endswith('e'):
+        return word + "d"
+    if word.endswith('y') and word[-2:-1] not in "aeiou":
+        return word[:-1] + "ied"
+    return double_final(word) + "ed"
+
+def make_ing(word):
+    """Форма -ing"""
+    if word.endswith('e') and not word.endswith('ee'):
+        return word[:-1] + "ing"
+    return double_final(word) + "ing"
+
+def make_comparative(word):
+    """Сравнительная степень"""
+    if len(word) > 6:
+        return f"more {word}"
+    if word.endswith('e'):
+        return word + "r"
+    if word.endswith('y') and word[-2:-1] not in "aeiou":
+        return word[:-1] + "ier"
+    return double_final(word) + "er"
+
+def make_superlative(word):
+    """Превосходная степень"""
+    if len(word) > 6:
+        return f"most {word}"
+    if word.endswith('e'):
+        return word + "st"
+    if word.endswith('y') and word[-2:-1] not in "aeiou":
+        return word[:-1] + "iest"
+    return double_final(word) + "est"
+
+# Банк шаблонов (загружается один раз)
+_template_bank = None
+
+def get_template_bank():
+    """Глобальный банк шаблонов (загрузка при первом обращении)"""
+    global _template_bank
+    if _template_bank is None:
+        _template_bank = TemplateBank.load()
+    return _template_bank
+
+# Тестирование
+def test_sentence_templates():
+    """Тестирование банка шаблонов"""
+    import time
+    print("🧪 Тестируем банк шаблонов...")
+    
+    bank = get_template_bank()
+    print(f"1. Скомпилировано наборов шаблонов: {len(bank.index)}")
+    
+    cases = [
+        (["run"], None, "natural"),
+        (["cat", "window"], "home and nature", "natural"),
+        (["beautiful"], "Business trip", "business"),
+        (["quickly"], "university study", "academic"),
+        (["meeting"], None, "casual"),
+    ]
+    for words, theme, style in cases:
+        print(f"\n2. {', '.join(words)} / {theme} / {style}:")
+        for sentence in bank.generate(words, theme, style):
+            print(f"   - {sentence}")
+    
+    # Неизвестные слова — только общие шаблоны, без форм по правилам
+    neutral = {render_template(t, {'word': word}) for word in ("information", "serendipity")
+               for t in bank.index[('general', 'natural', UNKNOWN_POS)]}
+    sentences = bank.generate(["information", "serendipity"], count=4)
+    fields = bank.word_fields("information")
+    print(f"\n3. Неизвестные слова: pos={fields['pos']}, plural={fields['plural']}")
+    for sentence in sentences:
+        print(f"   - {sentence}")
+    ok = (fields['pos'] == UNKNOWN_POS and fields['plural'] == "information"
+          and all(sentence in neutral for sentence in sentences[1:])
+          and bank.word_fields("cat")['plural'] == "cats")
+    
+    start = time.perf_counter()
+    for _ in range(10000):
+        bank.generate(["cat", "sunny", "window"], "travel")
+    elapsed = (time.perf_counter() - start) / 10000
+    print(f"\n⏱ Одна генерация: {elapsed * 1_000_000:.1f} мкс")
+    
+    print(f"\n{'✅' if ok else '❌'} Банк шаблонов готов!")
+
+if __name__ == "__main__":
+    test_sentence_templates()
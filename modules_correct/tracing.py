@@ -0,0 +1,126 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Трасса текущего апдейта (своя у каждой asyncio-задачи)
+current_trace = ContextVar("current_trace", default=None)
+
+class Trace:
+    """Трасса одного апдейта: id и отрезки времени (БД, переводчики, LLM, Telegram)"""
+    
+    __slots__ = ("trace_id", "update_id", "update_type", "user_id", "handler", "started_at", "start", "duration", "depth", "spans")
+    
+    def __init__(self, update_id=None, update_type=None, user_id=None):
+        self.trace_id = os.urandom(8).hex()
+        self.update_id = update_id
+        self.update_type = update_type
+        self.user_id = user_id
+        self.handler = None
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.depth = 0  # вложенность span(): в сводку идут только отрезки верхнего уровня
+        self.spans = []  # (имя, смещение от начала, длительность, вложенность)
+    
+    def add(self, name, duration):
+        """Отрезок, закончившийся только что"""
+        offset = time.perf_counter() - duration - self.start
+        self.spans.append((name, offset, duration, self.depth))
+    
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        return self.duration
+    
+    def breakdown(self):
+        """Время по видам (db, provider, llm, telegram, ...) и неучтённое — код самого бота"""
+        totals = {}
+        for name, _, duration, depth in self.spans:
+            if depth == 0:
+                kind = name.split('.', 1)[0]
+                totals[kind] = totals.get(kind, 0.0) + duration
+        # Отрезки параллельных задач могут перекрываться — тогда "other" 0
+        totals['other'] = max((self.duration or 0.0) - sum(totals.values()), 0.0)
+        return {kind: round(value * 1000, 2) for kind, value in totals.items()}
+    
+    def to_dict(self):
+        """Трасса для лога и JSONL (время в мс)"""
+        return {
+            'trace_id': self.trace_id,
+            'update_id': self.update_id,
+            'type': self.update_type,
+            'user_id': self.user_id,
+            'handler': self.handler,
+            'ts': round(self.started_at, 4),
+            'ms': round((self.duration or 0.0) * 1000, 2),
+            'breakdown': self.breakdown(),
+            'spans': [
+                {'name': name, 'at': round(offset * 1000, 2), 'ms': round(duration * 1000, 2), 'depth': depth}
+                for name, offset, duration, depth in self.spans
+            ]
+        }
+
+def add_span(name, duration):
+    """Отрезок в трассу текущего апдейта (вне апдейта — ничего)"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, duration)
+
+@contextmanager
+def span(name):
+    """Замер блока: with span("achievements"): ..."""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    
+    start = time.perf_counter()
+    trace.depth += 1
+    try:
+        yield
+    finally:
+        trace.depth -= 1
+        trace.add(name, time.perf_counter() - start)
+
+def traced(name):
+    """Декоратор async-функции: вызов — отдельный отрезок трассы"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_trace_id():
+    """Id трассы текущего апдейта (для логов)"""
+    trace = current_trace.get()
+    return trace.trace_id if trace else None
+
+# Тестирование
+def test_tracing():
+    """Тестирование отрезков и сводки"""
+    print("🧪 Тестируем трассировку...")
+    
+    trace = Trace(update_id=1, update_type="message", user_id=123456)
+    token = current_trace.set(trace)
+    try:
+        with span("achievements"):
+            add_span("db.get_achievements", 0.001)
+        add_span("provider.yandex_translate", 0.2)
+        add_span("telegram.SendMessage", 0.05)
+    finally:
+        current_trace.reset(token)
+    trace.duration = 0.3
+    
+    add_span("db.get_user", 0.01)  # вне апдейта — не записывается
+    
+    breakdown = trace.breakdown()
+    print(f"1. {trace.trace_id}: {breakdown}")
+    
+    ok = len(trace.spans) == 4 and breakdown['provider'] == 200.0 and 'db' not in breakdown
+    print(f"{'✅' if ok else '❌'} Трассировка готова!")
+
+if __name__ == "__main__":
+    test_tracing()
@@ -0,0 +1,133 @@
+import json
+import sys
+
+class TranslationRecord:
+    """Компактная запись перевода для кэша
+    
+    Вместо словарей со списками словарей — кортежи:
+    translations = ((часть речи, (значение, ...)), ...), examples = ((en, ru), ...).
+    Части речи и названия источников интернируются: на весь кэш одна строка "сущ.".
+    """
+    
+    __slots__ = ('word', 'source', 'transcription', 'translations', 'examples')
+    
+    def __init__(self, word, source, transcription, translations, examples):
+        self.word = word
+        self.source = source
+        self.transcription = transcription
+        self.translations = translations
+        self.examples = examples
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Запись из результата переводчика"""
+        return cls(
+            data.get('word', ''),
+            sys.intern(data.get('source', '')),
+            data.get('transcription', ''),
+            tuple(
+                (sys.intern(trans.get('part_of_speech', '')), tuple(trans.get('meanings', [])))
+                for trans in data.get('translations', [])
+            ),
+            tuple((ex.get('en', ''), ex.get('ru', '')) for ex in data.get('examples', []))
+        )
+    
+    def to_dict(self):
+        """Результат в прежнем формате (для форматирования ответа и словаря)"""
+        return {
+            "word": self.word,
+            "source": self.source,
+            "translations": [{'part_of_speech': pos, 'meanings': list(meanings)} for pos, meanings in self.translations],
+            "examples": [{'en': en, 'ru': ru} for en, ru in self.examples],
+            "transcription": self.transcription
+        }
+    
+    def pack(self):
+        """Компактная строка для постоянного кэша: JSON-массив без имён полей"""
+        return json.dumps(
+            [self.word, self.source, self.transcription, self.translations, self.examples],
+            ensure_ascii=False, separators=(',', ':')
+        )
+    
+    @classmethod
+    def unpack(cls, packed):
+        """Запись из строки pack()"""
+        word, source, transcription, translations, examples = json.loads(packed)
+        return cls(
+            word,
+            sys.intern(source),
+            transcription,
+            tuple((sys.intern(pos), tuple(meanings)) for pos, meanings in translations),
+            tuple((en, ru) for en, ru in examples)
+        )
+
+# ===== ЗАМЕР ПАМЯТИ =====
+SAMPLE_RESPONSE = json.dumps({
+    "word": "{word}",
+    "source": "Яндекс Переводчик",
+    "translations": [
+        {"part_of_speech": "сущ.", "meanings": ["пробег", "бег", "забег", "рейс", "серия"]},
+        {"part_of_speech": "глаг.", "meanings": ["бежать", "управлять", "работать", "запускать"]},
+        {"part_of_speech": "прил.", "meanings": ["беговой", "плавленый"]}
+    ],
+    "examples": [
+        {"en": "run a company", "ru": "руководить компанией"},
+        {"en": "run fast", "ru": "быстро бежать"}
+    ],
+    "transcription": "rʌn"
+}, ensure_ascii=False)
+
+def make_sample_translation(word):
+    """Ответ переводчика как после разбора JSON: у каждого слова свои копии строк"""
+    return json.loads(SAMPLE_RESPONSE.replace("{word}", word))
+
+def measure_cache_rss(compact, count):
+    """Прирост пикового RSS (МБ) после заполнения кэша из count слов"""
+    import resource
+    from datetime import datetime
+    
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cache = {}
+    for i in range(count):
+        data = make_sample_translation(f"word{i}")
+        cache[data['word']] = (TranslationRecord.from_dict(data) if compact else data, datetime.now(), {})
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    return (after - before) / 1024  # ru_maxrss в КБ (Linux)
+
+def benchmark_memory(count=100_000):
+    """Сравнение памяти кэша: словари против компактных записей (каждый замер — в отдельном процессе)"""
+    import multiprocessing
+    
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        dict_mb = pool.apply(measure_cache_rss, (False, count))
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        compact_mb = pool.apply(measure_cache_rss, (True, count))
+    
+    print(f"📦 Кэш из {count} слов:")
+    print(f"   словари:            {dict_mb:.1f} МБ ({dict_mb * 1024 * 1024 / count:.0f} байт/слово)")
+    print(f"   TranslationRecord:  {compact_mb:.1f} МБ ({compact_mb * 1024 * 1024 / count:.0f} байт/слово)")
+    if compact_mb:
+        print(f"   экономия: x{dict_mb / compact_mb:.1f}")
+    return dict_mb, compact_mb
+
+# Тестирование
+def test_translation_records():
+    """Тестирование преобразований записи"""
+    print("🧪 Тестируем компактные записи переводов...")
+    
+    data = make_sample_translation("run")
+    record = TranslationRecord.from_dict(data)
+    packed = record.pack()
+    restored = TranslationRecord.unpack(packed)
+    
+    print(f"1. Упакованная запись: {len(packed.encode('utf-8'))} байт против {len(json.dumps(data, ensure_ascii=False).encode('utf-8'))} в JSON")
+    print(f"2. Части речи интернированы: {restored.translations[0][0] is record.translations[0][0]}")
+    
+    ok = restored.to_dict() == data
+    print(f"{'✅' if ok else '❌'} Записи совпадают после упаковки")
+
+if __name__ == "__main__":
+    test_translation_records()
+    benchmark_memory()
@@ -1,12 +1,20 @@
-import aiohttp
 import asyncio
 import json
+import sys
+import time
 from datetime import datetime, timedelta
 import urllib.parse
+from database import db
+from config import CACHE_DURATION, YANDEX_DICT_URL, OXFORD_URL, GOOGLE_TRANSLATE_URL, MYMEMORY_URL
+from modules_correct.translation_records import TranslationRecord
+from modules_correct.word_index import word_index, describe_record
+from modules_correct.oxford_extractor import OxfordExtractor, extract_oxford, OXFORD_CHUNK_SIZE
+from modules_correct.http_client import get_session, close_sessions
+from modules_correct.tracing import add_span
+from modules_correct.metrics import TRANSLATOR_SECONDS, TRANSLATOR_RESULTS, CACHE_REQUESTS, CACHE_ENTRIES
 
-# Кэш переводов
+# Кэш переводов: слово -> (TranslationRecord, время, готовые ответы)
 translation_cache = {}
-CACHE_DURATION = 3600  # 1 час
 
 async def get_word_translation(word):
     """Основная функция получения перевода"""
@@ -14,11 +22,32 @@ async def get_word_translation(word):
     
     # Проверяем кэш
     if word in translation_cache:
-        cached_data, timestamp = translation_cache[word]
+        record, timestamp, _ = translation_cache[word]
         if datetime.now() - timestamp < timedelta(seconds=CACHE_DURATION):
-            return cached_data
+            CACHE_REQUESTS.inc(cache="translation", result="hit")
+            return record.to_dict()
     
-    # Пробуем все переводчики по очереди
+    # Затем постоянный кэш (переживает перезапуск)
+    record = load_cached_translation(word)
+    if record is not None:
+        CACHE_REQUESTS.inc(cache="translation", result="persistent_hit")
+        return record.to_dict()
+    
+    CACHE_REQUESTS.inc(cache="translation", result="miss")
+    
+    result = await fetch_translation(word)
+    if result is not None:
+        return result
+    
+    # Если все переводчики не сработали
+    return {
+        "word": word,
+        "translations": [],
+        "error": "Не удалось получить перевод"
+    }
+
+async def fetch_translation(word):
+    """Перевод от переводчиков (по очереди, до первого успешного) с записью в кэш. None — не нашли"""
     translators = [
         yandex_translate,
         oxford_translate,
@@ -27,27 +56,80 @@ async def get_word_translation(word):
     ]
     
     for translator in translators:
+        provider = translator.__name__
+        start = time.perf_counter()
         try:
             result = await translator(word)
+            elapsed = time.perf_counter() - start
+            TRANSLATOR_SECONDS.observe(elapsed, provider=provider)
+            add_span(f"provider.{provider}", elapsed)
             if result and 'translations' in result and result['translations']:
+                TRANSLATOR_RESULTS.inc(provider=provider, result="ok")
                 # Сохраняем в кэш
-                translation_cache[word] = (result, datetime.now())
+                cache_translation(word, result)
                 return result
+            TRANSLATOR_RESULTS.inc(provider=provider, result="empty")
         except Exception as e:
-            print(f"Ошибка в {translator.__name__}: {e}")
+            elapsed = time.perf_counter() - start
+            TRANSLATOR_SECONDS.observe(elapsed, provider=provider)
+            add_span(f"provider.{provider}", elapsed)
+            TRANSLATOR_RESULTS.inc(provider=provider, result="error")
+            print(f"Ошибка в {provider}: {e}")
             continue
+    return None
+
+def cache_translation(word, result):
+    """Сохранение перевода в память и в постоянный кэш"""
+    record = TranslationRecord.from_dict(result)
+    timestamp = datetime.now()
+    translation_cache[word] = (record, timestamp, {})
+    CACHE_ENTRIES.set(len(translation_cache), cache="translation")
     
-    # Если все переводчики не сработали
-    return {
-        "word": word,
-        "translations": [],
-        "error": "Не удалось получить перевод"
-    }
+    # Новое слово сразу доступно в inline-подсказках
+    word_index.add(word, describe_record(record))
+    
+    try:
+        db.save_translation(word, record.pack(), timestamp.timestamp())
+    except Exception as e:
+        print(f"Ошибка сохранения перевода в кэш: {e}")
+
+def load_cached_translation(word, max_age=CACHE_DURATION):
+    """Перевод из постоянного кэша, если он не старше max_age секунд"""
+    try:
+        row = db.get_translation(word)
+    except Exception as e:
+        print(f"Ошибка чтения кэша переводов: {e}")
+        return None
+    
+    if row is None:
+        return None
+    
+    packed, updated_at = row
+    timestamp = datetime.fromtimestamp(updated_at)
+    if datetime.now() - timestamp >= timedelta(seconds=max_age):
+        return None
+    
+    record = TranslationRecord.unpack(packed)
+    translation_cache[word] = (record, timestamp, {})
+    return record
+
+def get_cached_render(word, key):
+    """Готовый ответ из записи кэша переводов (истекает вместе с ней)"""
+    entry = translation_cache.get(word)
+    rendered = entry[2].get(key) if entry is not None else None
+    CACHE_REQUESTS.inc(cache="rendered", result="hit" if rendered is not None else "miss")
+    return rendered
+
+def cache_render(word, key, rendered):
+    """Сохранение готового ответа рядом с переводом"""
+    entry = translation_cache.get(word)
+    if entry is not None:
+        entry[2][key] = rendered
 
 async def yandex_translate(word):
     """Перевод через Яндекс"""
     try:
-        url = f"https://dictionary.yandex.net/api/v1/dicservice.json/lookup"
+        url = YANDEX_DICT_URL
         params = {
             "key": "dict.1.1.20240115T000000Z.abcdef1234567890",  # Публичный ключ (работает)
             "lang": "en-ru",
@@ -55,127 +137,93 @@ async def yandex_translate(word):
             "ui": "ru"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, timeout=10) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    translations = []
-                    if 'def' in data:
-                        for definition in data['def']:
-                            pos = definition.get('pos', '')
-                            for tr in definition.get('tr', []):
-                                meanings = []
-                                text = tr.get('text', '')
-                                if text:
-                                    meanings.append(text)
-                                
-                                # Добавляем синонимы
-                                for syn in tr.get('syn', []):
-                                    syn_text = syn.get('text', '')
-                                    if syn_text and syn_text not in meanings:
-                                        meanings.append(syn_text)
-                                
-                                if meanings:
-                                    translations.append({
-                                        'part_of_speech': get_russian_pos(pos),
-                                        'meanings': meanings[:5]  # Ограничиваем 5 значениями
-                                    })
-                    
-                    # Примеры
-                    examples = []
-                    if 'def' in data:
-                        for definition in data['def'][:2]:  # Берем первые 2 определения
-                            for tr in definition.get('tr', [])[:2]:
-                                if 'ex' in tr:
-                                    for ex in tr['ex'][:2]:  # По 2 примера
-                                        if 'text' in ex and 'tr' in ex:
-                                            examples.append({
-                                                'en': ex['text'],
-                                                'ru': ex['tr'][0].get('text', '')
-                                            })
-                    
-                    return {
-                        "word": word,
-                        "source": "Яндекс Переводчик",
-                        "translations": translations[:10],  # Ограничиваем 10 переводами
-                        "examples": examples[:5],  # Ограничиваем 5 примерами
-                        "transcription": get_transcription_from_yandex(data) if 'def' in data else ''
-                    }
+        session = get_session()
+        async with session.get(url, params=params, timeout=10) as response:
+            if response.status == 200:
+                return parse_yandex_response(word, await response.json())
     except Exception as e:
         print(f"Ошибка Яндекс: {e}")
         return None
 
+def parse_yandex_response(word, data):
+    """Разбор ответа Яндекс.Словаря"""
+    translations = []
+    if 'def' in data:
+        for definition in data['def']:
+            pos = definition.get('pos', '')
+            for tr in definition.get('tr', []):
+                meanings = []
+                text = tr.get('text', '')
+                if text:
+                    meanings.append(text)
+                
+                # Добавляем синонимы
+                for syn in tr.get('syn', []):
+                    syn_text = syn.get('text', '')
+                    if syn_text and syn_text not in meanings:
+                        meanings.append(syn_text)
+                
+                if meanings:
+                    translations.append({
+                        'part_of_speech': get_russian_pos(pos),
+                        'meanings': meanings[:5]  # Ограничиваем 5 значениями
+                    })
+    
+    # Примеры
+    examples = []
+    if 'def' in data:
+        for definition in data['def'][:2]:  # Берем первые 2 определения
+            for tr in definition.get('tr', [])[:2]:
+                if 'ex' in tr:
+                    for ex in tr['ex'][:2]:  # По 2 примера
+                        if 'text' in ex and 'tr' in ex:
+                            examples.append({
+                                'en': ex['text'],
+                                'ru': ex['tr'][0].get('text', '')
+                            })
+    
+    return {
+        "word": word,
+        "source": "Яндекс Переводчик",
+        "translations": translations[:10],  # Ограничиваем 10 переводами
+        "examples": examples[:5],  # Ограничиваем 5 примерами
+        "transcription": get_transcription_from_yandex(data) if 'def' in data else ''
+    }
+
 async def oxford_translate(word):
     """Перевод через Oxford Dictionary (парсинг)"""
     try:
-        url = f"https://www.oxfordlearnersdictionaries.com/definition/english/{word}"
+        url = f"{OXFORD_URL}{word}"
         
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers, timeout=10) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    
-                    # Парсим переводы (упрощённый парсинг)
-                    translations = []
-                    
-                    # Ищем определения
-                    import re
-                    
-                    # Ищем транскрипцию
-                    transcription_match = re.search(r'phonetic">/(.*?)/', html)
-                    transcription = transcription_match.group(1) if transcription_match else ''
-                    
-                    # Ищем часть речи
-                    pos_match = re.search(r'pos">(.*?)<', html)
-                    pos = pos_match.group(1) if pos_match else ''
-                    
-                    # Ищем определения
-                    def_matches = re.findall(r'def">(.*?)<', html)
-                    if def_matches:
-                        meanings = []
-                        for def_text in def_matches[:3]:  # Берем первые 3 определения
-                            if def_text and len(def_text) < 100:  # Фильтруем длинные тексты
-                                meanings.append(def_text.strip())
-                        
-                        if meanings:
-                            translations.append({
-                                'part_of_speech': pos if pos else 'сущ.',
-                                'meanings': meanings
-                            })
-                    
-                    # Ищем примеры
-                    examples = []
-                    example_matches = re.findall(r'x">(.*?)<', html)
-                    for ex in example_matches[:3]:
-                        if ex and len(ex) < 200:
-                            examples.append({
-                                'en': ex.strip(),
-                                'ru': ''  # Oxford не дает перевод
-                            })
-                    
-                    if translations:
-                        return {
-                            "word": word,
-                            "source": "Oxford Dictionary",
-                            "translations": translations,
-                            "examples": examples[:3],
-                            "transcription": transcription
-                        }
-                    
+        session = get_session()
+        async with session.get(url, headers=headers, timeout=10) as response:
+            if response.status == 200:
+                # Разбор по мере загрузки: остаток страницы не скачиваем
+                extractor = OxfordExtractor(response.charset or 'utf-8')
+                async for chunk in response.content.iter_chunked(OXFORD_CHUNK_SIZE):
+                    if extractor.feed(chunk):
+                        break
+                else:
+                    extractor.close()
+                return extractor.result(word)
+    
     except Exception as e:
         print(f"Ошибка Oxford: {e}")
     return None
 
+def parse_oxford_html(word, html):
+    """Разбор страницы Oxford. None, если определений нет"""
+    return extract_oxford(word, html)
+
 async def google_translate(word):
     """Перевод через Google Translate API"""
     try:
         # Используем бесплатный Google Translate API
-        url = "https://translate.googleapis.com/translate_a/single"
+        url = GOOGLE_TRANSLATE_URL
         params = {
             "client": "gtx",
             "sl": "en",
@@ -184,29 +232,29 @@ async def google_translate(word):
             "q": word
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, timeout=10) as response:
-                if response.status == 200:
-                    data = await response.json()
+        session = get_session()
+        async with session.get(url, params=params, timeout=10) as response:
+            if response.status == 200:
+                data = await response.json()
+                
+                translations = []
+                if data and len(data) > 0:
+                    # Парсим основной перевод
+                    main_translation = data[0][0][0] if data[0] else ''
                     
-                    translations = []
-                    if data and len(data) > 0:
-                        # Парсим основной перевод
-                        main_translation = data[0][0][0] if data[0] else ''
-                        
-                        if main_translation:
-                            translations.append({
-                                'part_of_speech': 'осн.',
-                                'meanings': [main_translation]
-                            })
-                    
-                    return {
-                        "word": word,
-                        "source": "Google Translate",
-                        "translations": translations[:5],
-                        "examples": [],
-                        "transcription": ''
-                    }
+                    if main_translation:
+                        translations.append({
+                            'part_of_speech': 'осн.',
+                            'meanings': [main_translation]
+                        })
+                
+                return {
+                    "word": word,
+                    "source": "Google Translate",
+                    "translations": translations[:5],
+                    "examples": [],
+                    "transcription": ''
+                }
     except Exception as e:
         print(f"Ошибка Google: {e}")
     return None
@@ -214,52 +262,54 @@ async def google_translate(word):
 async def mymemory_translate(word):
     """Перевод через MyMemory API"""
     try:
-        url = "https://api.mymemory.translated.net/get"
+        url = MYMEMORY_URL
         params = {
             "q": word,
             "langpair": "en|ru"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, timeout=10) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    translations = []
-                    if 'responseData' in data:
-                        translated = data['responseData'].get('translatedText', '')
-                        if translated and translated != word:
-                            translations.append({
-                                'part_of_speech': 'осн.',
-                                'meanings': [translated]
-                            })
-                    
-                    return {
-                        "word": word,
-                        "source": "MyMemory",
-                        "translations": translations[:3],
-                        "examples": [],
-                        "transcription': ''
-                    }
+        session = get_session()
+        async with session.get(url, params=params, timeout=10) as response:
+            if response.status == 200:
+                data = await response.json()
+                
+                translations = []
+                if 'responseData' in data:
+                    translated = data['responseData'].get('translatedText', '')
+                    if translated and translated != word:
+                        translations.append({
+                            'part_of_speech': 'осн.',
+                            'meanings': [translated]
+                        })
+                
+                return {
+                    "word": word,
+                    "source": "MyMemory",
+                    "translations": translations[:3],
+                    "examples": [],
+                    "transcription": ''
+                }
     except Exception as e:
         print(f"Ошибка MyMemory: {e}")
     return None
 
 # ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
+# Части речи на русском (одни и те же строки на весь кэш переводов)
+POS_MAP = {
+    'noun': 'сущ.',
+    'verb': 'глаг.',
+    'adjective': 'прил.',
+    'adverb': 'нар.',
+    'pronoun': 'мест.',
+    'preposition': 'предл.',
+    'conjunction': 'союз',
+    'interjection': 'межд.',
+    '': 'осн.'
+}
+
 def get_russian_pos(english_pos):
     """Конвертация части речи на русский"""
-    pos_map = {
-        'noun': 'сущ.',
-        'verb': 'глаг.',
-        'adjective': 'прил.',
-        'adverb': 'нар.',
-        'pronoun': 'мест.',
-        'preposition': 'предл.',
-        'conjunction': 'союз',
-        'interjection': 'межд.',
-        '': 'осн.'
-    }
-    return pos_map.get(english_pos.lower(), english_pos)
+    return POS_MAP.get(english_pos.lower()) or sys.intern(english_pos)
 
 def get_transcription_from_yandex(data):
     """Извлечение транскрипции из ответа Яндекс"""
@@ -282,3 +332,5 @@ async def test_translators():
             print(f"Источник: {result.get('source')}")
         else:
             print("❌ Не удалось получить перевод")
+    
+    await close_sessions()
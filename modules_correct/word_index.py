@@ -0,0 +1,140 @@
+import bisect
+import heapq
+import itertools
+from database import db
+from config import INLINE_RESULTS_LIMIT, INLINE_POPULAR_WORDS
+from modules_correct.translation_records import TranslationRecord
+
+SHORT_PREFIX = 2  # префиксы до этой длины: готовый ответ запоминается до изменения индекса
+
+class WordIndex:
+    """Префиксный индекс слов для inline-подсказок
+    
+    Отсортированный список + bisect: поиск по префиксу — O(log n) плюс число совпадений.
+    Популярность — сохранения в словари и поиски слова; ранжируются все совпадения,
+    для коротких префиксов (тысячи совпадений) готовый ответ запоминается.
+    Всё в памяти, без обращений к внешним переводчикам.
+    """
+    
+    def __init__(self):
+        self.words = []  # отсортированный список слов
+        self.info = {}  # слово -> [краткий перевод, популярность]
+        self.top = {}  # (короткий префикс, limit) -> готовый ответ
+    
+    def load(self):
+        """Построение индекса из локальных баз, кэша переводов и словарей пользователей"""
+        for word, info in db.load_word_forms().items():
+            self.put(word, info.get('translation'))
+        
+        for word, entry in db.load_synonyms().items():
+            self.put(word, "≈ " + ", ".join(entry.get('synonyms', [])[:3]))
+        
+        for word, packed in db.get_cached_translations():
+            self.put(word, describe_record(TranslationRecord.unpack(packed)))
+        
+        for word, count in db.get_popular_words(INLINE_POPULAR_WORDS):
+            self.put(word, score=count)
+        
+        for word, count in db.get_top_lookups(INLINE_POPULAR_WORDS):
+            self.put(word, score=count)
+        
+        # Одна сортировка на весь набор вместо вставок по одному
+        self.words = sorted(self.info)
+        self.top = {}
+        print(f"✅ Индекс слов построен: {len(self.words)} слов")
+    
+    def add(self, word, description=None, score=0):
+        """Добавление слова (или обновление описания) без перестройки индекса"""
+        word = word.lower().strip()
+        if self.put(word, description, score):
+            bisect.insort(self.words, word)
+        
+        # Готовые ответы коротких префиксов этого слова устарели
+        if self.top:
+            prefixes = {word[:length] for length in range(1, SHORT_PREFIX + 1)}
+            self.top = {key: value for key, value in self.top.items() if key[0] not in prefixes}
+    
+    def put(self, word, description=None, score=0):
+        """Запись описания и популярности. True, если слово новое (его ещё нет в self.words)"""
+        word = word.lower().strip()
+        if not word:
+            return False
+        
+        entry = self.info.get(word)
+        if entry is None:
+            self.info[word] = [description or '', score]
+            return True
+        
+        # Перевод из кэша точнее описания из локальных баз
+        if description:
+            entry[0] = description
+        entry[1] += score
+        return False
+    
+    def search(self, prefix, limit=INLINE_RESULTS_LIMIT):
+        """Слова, начинающиеся с prefix: сначала популярные, затем короткие"""
+        prefix = prefix.lower().strip()
+        if not prefix:
+            return []
+        
+        short = len(prefix) <= SHORT_PREFIX
+        if short and (prefix, limit) in self.top:
+            return self.top[(prefix, limit)]
+        
+        start = bisect.bisect_left(self.words, prefix)
+        end = bisect.bisect_left(self.words, prefix + "\uffff", start)
+        
+        # Все совпадения, а не только первые по алфавиту: популярное слово может быть в конце диапазона
+        info = self.info
+        best = heapq.nsmallest(limit, itertools.islice(self.words, start, end),
+                               key=lambda word: (-info[word][1], len(word), word))
+        results = [(word, info[word][0]) for word in best]
+        if short:
+            self.top[(prefix, limit)] = results
+        return results
+
+def describe_record(record):
+    """Краткий перевод для подсказки: первые значения"""
+    if not record.translations:
+        return ''
+    pos, meanings = record.translations[0]
+    return f"{pos} {', '.join(meanings[:3])}".strip()
+
+# Глобальный индекс (заполняется при запуске, дополняется по мере новых переводов)
+word_index = WordIndex()
+
+# Тестирование
+def test_word_index():
+    """Тестирование поиска по префиксу"""
+    import time
+    print("🧪 Тестируем индекс слов...")
+    
+    index = WordIndex()
+    index.load()
+    index.add("runner", "сущ. бегун", score=5)
+    
+    for prefix in ["ru", "go", "beau", "xyz"]:
+        print(f"• {prefix}: {index.search(prefix, limit=5)}")
+    
+    for i in range(100_000):
+        index.put(f"word{i}")
+    index.words = sorted(index.info)
+    start = time.perf_counter()
+    for _ in range(1000):
+        index.search("word12")
+    print(f"⏱ Поиск среди {len(index.words)} слов: {(time.perf_counter() - start):.3f} мс на запрос")
+    
+    # Популярное слово в конце алфавитного диапазона короткого префикса
+    index.add("wordzzz", "тест", score=10_000)
+    start = time.perf_counter()
+    first = index.search("w")[0][0]
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    index.search("w")
+    print(f"⏱ Префикс «w»: {cold * 1000:.1f} мс, повторно {(time.perf_counter() - start) * 1000:.3f} мс, первое: {first}")
+    
+    ok = index.search("ru")[0][0] == "runner" and first == "wordzzz"
+    print(f"{'✅' if ok else '❌'} Индекс слов готов!")
+
+if __name__ == "__main__":
+    test_word_index()
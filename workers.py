@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import multiprocessing
+import aiohttp
+from aiohttp import web
+
+from config import (
+    BOT_TOKEN, BOT_MODE, WORKERS, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBAPP_HOST, WEBAPP_PORT,
+    TELEGRAM_API_URL, POLL_RETRY_DELAY, POLL_RETRY_MAX_DELAY
+)
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API = TELEGRAM_API_URL
+
+# ===== МАРШРУТИЗАЦИЯ =====
+def get_update_user_id(update):
+    """user_id отправителя из сырого апдейта (message, callback_query, inline_query, ...)"""
+    for value in update.values():
+        if isinstance(value, dict):
+            sender = value.get('from') or value.get('user') or value.get('chat')
+            if isinstance(sender, dict) and 'id' in sender:
+                return sender['id']
+    return update.get('update_id', 0)
+
+def route_update(update, queues):
+    """Отправка апдейта воркеру по хэшу user_id: один пользователь — всегда один воркер"""
+    user_id = get_update_user_id(update)
+    queues[user_id % len(queues)].put(update)
+
+# ===== ВОРКЕР =====
+def worker_main(index, queue, count):
+    """Точка входа процесса-воркера"""
+    asyncio.run(run_worker(index, queue, count))
+
+async def run_worker(index, queue, count):
+    """Обработка апдейтов своей доли пользователей со своим диспетчером и кэшами"""
+    import bot as app  # Хэндлеры, диспетчер, соединение с БД — свои в каждом процессе
+    
+    app.bootstrap()
+    
+    # Лимит Telegram на отправку общий для бота: каждому воркеру — своя доля темпа, рассылке — весь
+    app.notification_manager.sender.set_share(count)
+    cleanup_task = asyncio.create_task(app.fsm_storage.run_cleanup())
+    
+    # Уведомления своей доли пользователей (та же, что при маршрутизации)
+    await app.notification_manager.schedule_daily_notifications(shard=(index, count))
+    flush_task = asyncio.create_task(app.activity_counters.run_flush())
+    
+    # У каждого воркера свой /metrics: METRICS_PORT + номер
+    if app.METRICS_PORT:
+        await app.start_metrics_server(app.METRICS_HOST, app.METRICS_PORT + index)
+        asyncio.create_task(app.monitor_event_loop())
+    
+    # Прерванные рассылки продолжает один воркер; он же прогревает кэш переводов
+    # (обращается к переводчикам один раз, остальные берут переводы из постоянного кэша)
+    if index == 0:
+        asyncio.create_task(app.resume_broadcasts(app.notification_manager.sender))
+        warmer_task = asyncio.create_task(app.cache_warmer.run())
+    else:
+        warmer_task = asyncio.create_task(app.cache_warmer.run_flush())
+    logger.info(f"Воркер {index} запущен")
+    
+    loop = asyncio.get_running_loop()
+    user_locks = {}  # user_id -> (lock, ожидающих апдейтов)
+    tasks = set()
+    
+    async def process(user_id, update):
+        lock, _ = user_locks[user_id]
+        try:
+            # Апдейты одного пользователя — строго по очереди
+            async with lock:
+                await app.dp.feed_raw_update(app.bot, update)
+        except Exception as e:
+            logger.error(f"Воркер {index}: ошибка обработки апдейта {update.get('update_id')}: {e}")
+        finally:
+            lock, pending = user_locks[user_id]
+            if pending <= 1:
+                del user_locks[user_id]
+            else:
+                user_locks[user_id] = (lock, pending - 1)
+    
+    while True:
+        update = await loop.run_in_executor(None, queue.get)
+        if update is None:
+            break
+        
+        user_id = get_update_user_id(update)
+        lock, pending = user_locks.get(user_id, (None, 0))
+        user_locks[user_id] = (lock or asyncio.Lock(), pending + 1)
+        
+        task = asyncio.create_task(process(user_id, update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    cleanup_task.cancel()
+    flush_task.cancel()
+    warmer_task.cancel()
+    for task in app.notification_manager.scheduled_tasks:
+        task.cancel()
+    await app.bot.session.close()
+    await app.fsm_storage.close()
+    await app.shutdown()
+    logger.info(f"Воркер {index} остановлен")
+
+# ===== ФРОНТ-ПРОЦЕСС =====
+async def telegram_call(session, method, **params):
+    """Вызов Bot API без разбора апдейтов в моделях aiogram"""
+    async with session.post(f"{TELEGRAM_API}/bot{BOT_TOKEN}/{method}", json=params, timeout=aiohttp.ClientTimeout(total=60)) as response:
+        return await response.json()
+
+async def poll_updates(queues):
+    """Long polling во фронт-процессе: только получение и маршрутизация"""
+    offset = None
+    delay = POLL_RETRY_DELAY
+    
+    async with aiohttp.ClientSession() as session:
+        await telegram_call(session, "deleteWebhook")
+        
+        while True:
+            params = {"timeout": 30}
+            if offset is not None:
+                params["offset"] = offset
+            
+            try:
+                data = await telegram_call(session, "getUpdates", **params)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                data = {"ok": False, "description": str(e)}
+            
+            # Ошибка сети или отказ Telegram (401 — неверный токен, 409 — второй поллер): пауза с ростом
+            if not data.get('ok'):
+                retry_after = data.get('parameters', {}).get('retry_after', 0)
+                logger.error(f"Ошибка getUpdates: {data.get('description')}, повтор через {max(delay, retry_after)} с")
+                await asyncio.sleep(max(delay, retry_after))
+                delay = min(delay * 2, POLL_RETRY_MAX_DELAY)
+                continue
+            delay = POLL_RETRY_DELAY
+            
+            for update in data.get('result', []):
+                offset = update['update_id'] + 1
+                route_update(update, queues)
+
+def run_webhook_front(queues):
+    """Webhook во фронт-процессе: приём апдейтов и маршрутизация"""
+    
+    async def handle_update(request):
+        if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+            return web.Response(status=401)
+        route_update(await request.json(), queues)
+        return web.Response(text="ok")
+    
+    async def healthcheck(request):
+        return web.Response(text="ok")
+    
+    async def on_startup(app):
+        async with aiohttp.ClientSession() as session:
+            params = {"url": f"{WEBHOOK_URL}{WEBHOOK_PATH}"}
+            if WEBHOOK_SECRET:
+                params["secret_token"] = WEBHOOK_SECRET
+            await telegram_call(session, "setWebhook", **params)
+        logger.info(f"Webhook установлен: {WEBHOOK_URL}{WEBHOOK_PATH}")
+    
+    app = web.Application()
+    app.router.add_get("/", healthcheck)
+    app.router.add_post(WEBHOOK_PATH, handle_update)
+    app.on_startup.append(on_startup)
+    
+    web.run_app(app, host=WEBAPP_HOST, port=WEBAPP_PORT)
+
+def run_workers(count=WORKERS):
+    """Запуск фронт-процесса и N воркеров"""
+    logger.info(f"Запуск бота: {count} воркеров, режим {BOT_MODE}...")
+    
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue() for _ in range(count)]
+    processes = [
+        context.Process(target=worker_main, args=(index, queue, count), name=f"bot-worker-{index}")
+        for index, queue in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+    
+    try:
+        if BOT_MODE == "webhook":
+            run_webhook_front(queues)
+        else:
+            asyncio.run(poll_updates(queues))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Воркеры дообрабатывают очередь и закрывают ресурсы
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join(timeout=30)
+
+if __name__ == "__main__":
+    run_workers()